@@ -1,6 +1,8 @@
 from django.contrib import admin
 
+from . import counters, search
 from .models import Group, Post
+from .paginator import CountedPaginator
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -8,6 +10,23 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    # Без второго COUNT(*) по всей таблице ради «N из M».
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return CountedPaginator(
+            queryset,
+            per_page,
+            orphans,
+            allow_empty_first_page,
+            count=counters.estimate_posts,
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search.filter_posts(queryset, search_term), False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -0,0 +1,32 @@
+from django.urls import path
+
+from . import api_views
+
+urlpatterns = [
+    path('posts/', api_views.IndexPostsView.as_view(), name='api_index'),
+    path(
+        'posts/<int:post_id>/',
+        api_views.PostDetailView.as_view(),
+        name='api_post',
+    ),
+    path(
+        'follow/posts/',
+        api_views.FollowPostsView.as_view(),
+        name='api_follow',
+    ),
+    path(
+        'follow/authors/',
+        api_views.FollowAuthorsView.as_view(),
+        name='api_follow_authors',
+    ),
+    path(
+        'groups/<slug>/posts/',
+        api_views.GroupPostsView.as_view(),
+        name='api_group',
+    ),
+    path(
+        'authors/<str:username>/posts/',
+        api_views.AuthorPostsView.as_view(),
+        name='api_author',
+    ),
+]
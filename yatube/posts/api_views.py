@@ -0,0 +1,170 @@
+'''JSON API лент и постов.
+
+API только читает, кроме массовой подписки ``FollowAuthorsView`` для
+импорта списков контактов. Ответы лент снабжаются ETag, собранным из
+поколений ``feed_cache``: поколение ленты меняется при любом изменении
+её постов и комментариев, поэтому повторный опрос с ``If-None-Match``
+стоит не больше одного индексного запроса и получает 304 без
+сериализации.
+'''
+import abc
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+from django.utils.cache import parse_etags
+from rest_framework import generics, permissions, status
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from . import feed_cache, follows, timeline
+from .models import Group, Post
+from .serializers import FollowAuthorsSerializer, PostSerializer
+
+User = get_user_model()
+
+
+class PostCursorPagination(CursorPagination):
+    ordering = ('-pub_date', '-id')
+    page_size = settings.POSTS_PER_PAGE
+
+
+class FollowCursorPagination(PostCursorPagination):
+    ordering = tuple(f'-{key}' for key in timeline.FEED_KEYS)
+
+
+class ETagMixin(abc.ABC):
+    '''Отвечает 304, если ETag не изменился с прошлого запроса.
+
+    Наследник без ``get_etag_scopes`` не создаётся (``TypeError``), а не
+    отдаёт ETag, который не меняется вместе с лентой.
+    '''
+
+    @abc.abstractmethod
+    def get_etag_scopes(self):
+        '''Ленты ``feed_cache``, от поколений которых зависит ответ.'''
+
+    def get_etag(self):
+        generations = feed_cache.generations(self.get_etag_scopes())
+        parts = [self.request.get_full_path()]
+        parts.extend(
+            f'{scope}={generations[scope]}' for scope in sorted(generations)
+        )
+        digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag()
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (
+            etag in parse_etags(if_none_match) or if_none_match == '*'
+        ):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().get(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+
+class PostListView(ETagMixin, generics.ListAPIView):
+    '''Основа списков постов; ленту задают наследники.'''
+
+    serializer_class = PostSerializer
+    pagination_class = PostCursorPagination
+
+
+class IndexPostsView(PostListView):
+    def get_etag_scopes(self):
+        return ['index']
+
+    def get_queryset(self):
+        return Post.objects.for_feed()
+
+
+class GroupPostsView(PostListView):
+    def get_group(self):
+        if not hasattr(self, '_group'):
+            self._group = get_object_or_404(Group, slug=self.kwargs['slug'])
+        return self._group
+
+    def get_etag_scopes(self):
+        return [f'group:{self.get_group().pk}']
+
+    def get_queryset(self):
+        return Post.objects.for_feed().filter(group=self.get_group())
+
+
+class AuthorPostsView(PostListView):
+    def get_author(self):
+        if not hasattr(self, '_author'):
+            self._author = get_object_or_404(
+                User, username=self.kwargs['username']
+            )
+        return self._author
+
+    def get_etag_scopes(self):
+        return [f'profile:{self.get_author().pk}']
+
+    def get_queryset(self):
+        return Post.objects.for_feed().filter(author=self.get_author())
+
+
+class FollowPostsView(PostListView):
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = FollowCursorPagination
+
+    def get_etag_scopes(self):
+        # Посты авторов и сами подписки сдвигают поколение ленты.
+        return [timeline.scope(self.request.user.pk)]
+
+    def get_queryset(self):
+        return timeline.posts_for(self.request.user).for_feed()
+
+
+class FollowAuthorsView(generics.GenericAPIView):
+    '''Подписка (POST) и отписка (DELETE) сразу на многих авторов.
+
+    Принимает ``{"authors": [имена]}``, неизвестные имена пропускает и
+    отвечает числом изменённых подписок. Все подписки меняются в одной
+    транзакции.
+    '''
+
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = FollowAuthorsSerializer
+
+    def get_author_ids(self):
+        serializer = self.get_serializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        return follows.ids_for(serializer.validated_data['authors'])
+
+    def post(self, request):
+        author_ids = self.get_author_ids()
+        return Response(
+            {'followed': follows.bulk_follow(request.user.pk, author_ids)}
+        )
+
+    def delete(self, request):
+        author_ids = self.get_author_ids()
+        return Response(
+            {
+                'unfollowed': follows.bulk_unfollow(
+                    request.user.pk, author_ids
+                )
+            }
+        )
+
+
+class PostDetailView(ETagMixin, generics.RetrieveAPIView):
+    serializer_class = PostSerializer
+    lookup_url_kwarg = 'post_id'
+
+    def get_etag_scopes(self):
+        author_id = get_object_or_404(
+            Post.objects.values_list('author_id', flat=True),
+            pk=self.kwargs['post_id'],
+        )
+        return [f'profile:{author_id}']
+
+    def get_queryset(self):
+        return Post.objects.for_feed()
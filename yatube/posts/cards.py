@@ -0,0 +1,63 @@
+'''Кэш отрендеренных карточек постов.
+
+Карточка ``posts/post_card.html`` не зависит от читателя, поэтому
+рендерится один раз на версию поста и берётся из кэша для всех лент
+сразу, одним ``get_many`` на страницу. Версия — ``Post.updated`` вместе
+с показанными в карточке данными, которые меняются без сохранения
+поста: числом комментариев, именем автора, названием и адресом группы.
+Кнопка редактирования зависит от читателя и вставляется на место
+``VIEWER_SLOT`` в ``posts/post_item.html``.
+
+Карточку с изображением, для которого ещё не построена миниатюра, не
+кэшируют: иначе она так и показывала бы исходный файл.
+'''
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import thumbnails
+
+CARD_TEMPLATE = 'posts/post_card.html'
+VIEWER_SLOT = '<!-- viewer -->'
+
+
+class Card:
+    '''HTML карточки, разрезанный по месту для персональной части.'''
+
+    def __init__(self, html):
+        head, _, tail = html.partition(VIEWER_SLOT)
+        self.head = mark_safe(head)
+        self.tail = mark_safe(tail)
+
+
+def card_key(post):
+    group = (
+        f'{post.group.title}|{post.group.slug}' if post.group_id else ''
+    )
+    version = (
+        f'{post.pk}|{post.updated.isoformat()}|{post.comment_count}|'
+        f'{post.author.username}|{group}'
+    )
+    return 'post:card:' + hashlib.md5(version.encode()).hexdigest()
+
+
+def render_cards(posts):
+    '''Карточки ``posts`` в том же порядке: пары ``(post, Card)``.'''
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    found = cache.get_many(keys)
+    fresh = {}
+    cards = []
+    for key, post in zip(keys, posts):
+        html = found.get(key)
+        if html is None:
+            html = render_to_string(CARD_TEMPLATE, {'post': post})
+            if thumbnails.is_ready(post.image):
+                fresh[key] = html
+        cards.append((post, Card(html)))
+    if fresh:
+        cache.set_many(fresh, settings.POST_CARD_CACHE_TIMEOUT)
+    return cards
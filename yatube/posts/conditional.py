@@ -0,0 +1,114 @@
+'''Условные GET (ETag и Last-Modified) для лент и страницы поста.
+
+Валидаторы считаются до представления по поколениям лент и суррогатных
+ключей страницы (см. ``feed_cache`` и ``page_cache``): поколение —
+момент последнего изменения, и сигналы сдвигают его при любой правке
+того, что показано на странице. ETag — хеш поколений, адреса и
+читателя, Last-Modified — самое позднее из поколений. В ту же секунду,
+что и последнее изменение, Last-Modified не отдаётся (см.
+``feed_cache.changed_at``), и ответ проверяется только по ETag. Чтобы
+узнать ключи, достаточно найти по индексу строку группы, автора или
+поста; ленту постов представление не выбирает и шаблон не рендерит,
+если клиент прислал совпадающий ``If-None-Match`` или
+``If-Modified-Since``.
+'''
+import functools
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import feed_cache, timeline
+from .models import Group, Post, User
+from .page_cache import generation_scope
+
+
+def validators(request, generations):
+    parts = [request.get_full_path(), str(request.user.pk)]
+    parts += [
+        f'{scope}={generations[scope]}' for scope in sorted(generations)
+    ]
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return quote_etag(digest), feed_cache.changed_at(generations)
+
+
+def condition(scopes):
+    '''Отвечает 304, если поколения ``scopes(request, ...)`` не менялись.
+
+    ``scopes`` возвращает ``None``, когда объекта нет: тогда ответ
+    (обычно 404) строит само представление. Прочитанные поколения
+    остаются в ``request.generations``, чтобы представление не читало
+    их из кэша ещё раз.
+    '''
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            names = scopes(request, *args, **kwargs)
+            if names is None:
+                return view(request, *args, **kwargs)
+            request.generations = feed_cache.generations(names)
+            etag, last_modified = validators(request, request.generations)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.setdefault('ETag', etag)
+            if last_modified is not None:
+                response.setdefault(
+                    'Last-Modified', http_date(last_modified)
+                )
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def index_scopes(request):
+    return ['index']
+
+
+def group_scopes(request, slug):
+    pk = Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    if pk is None:
+        return None
+    return [f'group:{pk}', generation_scope(f'group:{pk}')]
+
+
+def profile_scopes(request, username):
+    pk = (
+        User.objects.filter(username=username)
+        .values_list('pk', flat=True)
+        .first()
+    )
+    if pk is None:
+        return None
+    return [f'profile:{pk}', generation_scope(f'user:{pk}')]
+
+
+def post_scopes(request, username, post_id):
+    row = (
+        Post.objects.filter(pk=post_id)
+        .values_list('author_id', 'group_id')
+        .first()
+    )
+    if row is None:
+        return None
+    author_id, group_id = row
+    keys = [f'post:{post_id}', f'user:{author_id}']
+    if group_id:
+        keys.append(f'group:{group_id}')
+    return [generation_scope(key) for key in keys]
+
+
+def follow_scopes(request):
+    # Посты и подписки читателя сдвигают поколение его ленты (см.
+    # ``timeline``), а не поколения всех его авторов.
+    return [
+        generation_scope(f'user:{request.user.pk}'),
+        timeline.scope(request.user.pk),
+    ]
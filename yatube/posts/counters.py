@@ -0,0 +1,151 @@
+'''Денормализованные счётчики постов, подписчиков и комментариев.
+
+Счётчики меняются атомарным ``UPDATE ... SET x = x + 1`` из сигналов,
+а расхождения исправляет команда ``reconcile_counters``. Число постов в
+лентах (``FeedStats``) заменяет ``COUNT(*)`` в навигации по страницам.
+'''
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, FeedStats, Follow, Post, User, UserStats
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def count_for_users(field, user_ids):
+    model, lookup = USER_COUNTERS[field]
+    rows = (
+        model.objects.filter(**{f'{lookup}__in': user_ids})
+        .values(lookup)
+        .annotate(total=Count('pk'))
+        .values_list(lookup, 'total')
+        .order_by()
+    )
+    return dict(rows)
+
+
+def recount(user_id):
+    values = {
+        field: count_for_users(field, [user_id]).get(user_id, 0)
+        for field in USER_COUNTERS
+    }
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id, defaults=values
+    )
+    return stats
+
+
+def stats_for(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount(user.pk)
+
+
+def refresh(field, user_ids):
+    '''Пересчитывает ``field`` у ``user_ids`` одним UPDATE с подзапросом.
+
+    В отличие от ``change`` не зависит от того, сколько строк на самом
+    деле вставил или удалил конкурирующий запрос.
+    '''
+    model, lookup = USER_COUNTERS[field]
+    total = (
+        model.objects.filter(**{lookup: OuterRef('user_id')})
+        .values(lookup)
+        .annotate(total=Count('pk'))
+        .values('total')
+        .order_by()
+    )
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        **{field: Coalesce(Subquery(total), 0)}
+    )
+
+
+def change(user_id, field, delta):
+    # Если строки ещё нет, её честно посчитает stats_for при чтении.
+    rows = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    rows.update(**{field: F(field) + delta})
+
+
+def change_comment_count(post_id, delta):
+    rows = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        rows = rows.filter(comment_count__gte=-delta)
+    rows.update(comment_count=F('comment_count') + delta)
+
+
+def comment_counts(post_ids):
+    rows = (
+        Comment.objects.filter(post__in=post_ids)
+        .values('post')
+        .annotate(total=Count('pk'))
+        .values_list('post', 'total')
+        .order_by()
+    )
+    return dict(rows)
+
+
+def feed_scopes(group_id):
+    '''Ленты с FeedStats, в которые попадает пост группы ``group_id``.'''
+    return ['index', f'group:{group_id}'] if group_id else ['index']
+
+
+def feed_queryset(scope):
+    name, _, pk = scope.partition(':')
+    if name == 'group':
+        return Post.objects.filter(group_id=pk)
+    return Post.objects.all()
+
+
+def recount_feed(scope):
+    stats, _ = FeedStats.objects.update_or_create(
+        scope=scope,
+        defaults={'posts_count': feed_queryset(scope).count()},
+    )
+    return stats.posts_count
+
+
+def feed_count(scope):
+    '''Число постов ленты из FeedStats, а у ``profile:<id>`` — из UserStats.
+
+    Чтение ничего не пишет: пока строки счётчика нет, посты считаются
+    ``COUNT(*)``, а строку создаст первое изменение ленты.
+    '''
+    name, _, pk = scope.partition(':')
+    if name == 'profile':
+        return stats_for(User(pk=int(pk))).posts_count
+    count = (
+        FeedStats.objects.filter(scope=scope)
+        .values_list('posts_count', flat=True)
+        .first()
+    )
+    if count is None:
+        return feed_queryset(scope).count()
+    return count
+
+
+def change_feeds(scopes, delta):
+    for scope in scopes:
+        rows = FeedStats.objects.filter(scope=scope)
+        if delta < 0:
+            rows = rows.filter(posts_count__gte=-delta)
+        if not rows.update(posts_count=F('posts_count') + delta):
+            recount_feed(scope)
+
+
+def estimate_posts(queryset):
+    '''Число постов в выборке без ``COUNT(*)`` по всей таблице.
+
+    Вся таблица берётся из счётчика ленты ``index``, а отфильтрованная
+    выборка считается точно: обрезанное число сделало бы её последние
+    страницы недоступными.
+    '''
+    if not queryset.query.where:
+        return feed_count('index')
+    return queryset.order_by().count()
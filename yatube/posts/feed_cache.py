@@ -0,0 +1,157 @@
+'''Кэш HTML лент с ключами, версионированными по поколениям.
+
+У каждой ленты (``index``, ``group:<id>``, ``profile:<id>``) есть
+поколение — время последнего изменения. Оно входит в ключ
+закэшированного фрагмента и сдвигается сигналами при любом изменении
+постов и комментариев ленты. Поэтому фрагменты могут жить часами и при
+этом не отдают устаревших данных.
+
+Кэш, заполненный при чтении с отставшей реплики, устаревает не когда
+меняется лента, а когда реплика догоняет основную базу. Поэтому к
+поколениям любой ленты добавляется поколение реплик ``REPLICA_SCOPE``,
+которое сдвигает ``sync_replicas`` после каждой синхронизации.
+'''
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from . import counters, feed_ids
+from .models import Post
+
+FRAGMENT_NAME = 'feed_page'
+FRAGMENT_TEMPLATE = 'posts/feed.html'
+
+REPLICA_SCOPE = 'replicas'
+
+
+def generation_key(scope):
+    return f'feed:generation:{scope}'
+
+
+def generations(scopes):
+    '''Поколения лент и реплик за одно обращение к кэшу.
+
+    Недостающие поколения создаются одним ``set_many``. Поколение,
+    созданное заново после вытеснения ключа, — текущее время: оно не
+    совпадёт ни с одним из тех, под которыми уже лежат фрагменты. Если
+    два процесса создадут его одновременно, останется одно из значений,
+    а кэш, записанный под другим, просто не будет найден.
+    '''
+    keys = {
+        generation_key(scope): scope for scope in [*scopes, REPLICA_SCOPE]
+    }
+    found = cache.get_many(list(keys))
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {scope: found[key] for key, scope in keys.items()}
+
+
+def bump(scopes):
+    # Поколение — момент последнего изменения в наносекундах, поэтому
+    # оно же служит Last-Modified для условных GET (см. ``conditional``).
+    keys = [generation_key(scope) for scope in scopes]
+    now = time.time_ns()
+    found = cache.get_many(keys)
+    cache.set_many(
+        {key: max(now, found.get(key, 0) + 1) for key in keys}, None
+    )
+
+
+def changed_at(generations):
+    '''Время последнего изменения по поколениям, в секундах.
+
+    ``None``, пока не кончилась секунда этого изменения: Last-Modified
+    точен до секунды, и следующее изменение в ту же секунду не сдвинуло
+    бы его, так что клиент с одним ``If-Modified-Since`` получил бы 304
+    на изменившуюся страницу. Изменение позже этой секунды получает
+    поколение не меньше текущего времени, то есть с большей секундой.
+    '''
+    seconds = max(generations.values()) // 1_000_000_000
+    if seconds >= time.time_ns() // 1_000_000_000:
+        return None
+    return seconds
+
+
+def invalidate(*scopes):
+    '''Сбрасывает ленты сейчас и ещё раз после фиксации транзакции.
+
+    Второй сброс нужен, чтобы читатель, успевший закэшировать старые
+    данные между первым сбросом и COMMIT, не закрепил их в кэше.
+    После фиксации первые страницы лент перерисовываются заранее.
+    '''
+    scopes = [scope for scope in scopes if scope]
+    bump(scopes)
+
+    def after_commit():
+        bump(scopes)
+        for scope in scopes:
+            warm(scope)
+
+    transaction.on_commit(after_commit)
+
+
+def post_scopes(author_id, *group_ids):
+    scopes = ['index', f'profile:{author_id}']
+    scopes += [f'group:{pk}' for pk in set(group_ids) if pk]
+    return scopes
+
+
+def vary_on(scope, viewer_id=None, after=None, before=None, page=None,
+            skip=None, last=None):
+    versions = generations([scope])
+    parts = (
+        scope, versions[scope], versions[REPLICA_SCOPE], viewer_id or 0,
+        after, before, page, skip, last,
+    )
+    return ':'.join(str(part or '') for part in parts)
+
+
+class Fragment:
+    '''Параметры тега ``{% cache %}`` для фрагмента ленты.'''
+
+    def __init__(self, request, scope):
+        self.timeout = settings.FEED_CACHE_TIMEOUT
+        self.key = vary_on(
+            scope,
+            request.user.pk,
+            request.GET.get('after'),
+            request.GET.get('before'),
+            request.GET.get('page'),
+            request.GET.get('skip'),
+            request.GET.get('last'),
+        )
+
+
+def scope_queryset(scope):
+    name, _, pk = scope.partition(':')
+    posts = Post.objects.for_feed()
+    if name == 'group':
+        return posts.filter(group_id=pk)
+    if name == 'profile':
+        return posts.filter(author_id=pk)
+    return posts
+
+
+def warm(scope):
+    '''Заранее рендерит первую страницу ленты для анонимного читателя.'''
+    page = feed_ids.FeedPaginator(
+        scope_queryset(scope),
+        settings.POSTS_PER_PAGE,
+        feed_ids.list_key(scope),
+        count=lambda: counters.feed_count(scope),
+    ).first_page()
+    html = render_to_string(
+        FRAGMENT_TEMPLATE, {'page': page, 'user': AnonymousUser()}
+    )
+    cache.set(
+        make_template_fragment_key(FRAGMENT_NAME, [vary_on(scope)]),
+        html,
+        settings.FEED_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,342 @@
+'''Закэшированные списки id лент и сборка постов из кэша объектов.
+
+Для лент ``index``, ``group:<id>`` и ``profile:<id>`` в кэше лежит
+список не длиннее ``FEED_IDS_LENGTH`` самых новых постов: кортежи
+``(pub_date, id, author_id, group_id)`` от новых к старым. Сигналы
+правят списки на месте при создании и удалении поста и при переносе его
+в другую группу, поэтому после нового поста лента не перечитывается из
+БД. Ключ списка включает версию ленты: каждая правка сдвигает её
+атомарным ``incr`` и кладёт исправленный список под новым ключом, а
+читатель строит список под версией, прочитанной до запроса к БД. Так
+список, выбранный до COMMIT поста и записанный после правки, остаётся
+под старым ключом и никому не отдаётся.
+
+Список ленты подписок на месте не правится: его ключ включает поколение
+ленты читателя (см. ``timeline`` и ``conditional.follow_scopes``), и
+после любого её изменения список строится заново одним запросом по
+индексу ``TimelineEntry``.
+
+Страница ленты — срез списка. Посты, их авторы и группы берутся из кэша
+объектов одним ``get_many``, промахи — одним ``in_bulk`` на модель, и
+найденное сразу кладётся в кэш. Курсор за пределами обрезанного списка
+и ``last=1`` для длинной ленты читаются из БД, как раньше.
+'''
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.functional import cached_property
+
+from .models import Group, Post, User
+from .paginator import CursorPaginator, decode_cursor
+
+# Поля, которые показывает карточка поста: кэш объектов не хранит
+# остального, в том числе хешей паролей.
+OBJECT_QUERYSETS = {
+    Post: lambda: Post.objects.all(),
+    User: lambda: User.objects.only(
+        'id', 'username', 'first_name', 'last_name'
+    ),
+    Group: lambda: Group.objects.only('id', 'title', 'slug'),
+}
+
+
+def _key(scope, version):
+    return f'feed:ids:{scope}:{version}'
+
+
+def _version_key(scope):
+    return f'feed:ids:version:{scope}'
+
+
+def _version(scope):
+    key = _version_key(scope)
+    value = cache.get(key)
+    if value is None:
+        # Как у поколений лент: версия, созданная заново после
+        # вытеснения ключа, не совпадёт с прежними.
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def _next_version(scope):
+    try:
+        return cache.incr(_version_key(scope))
+    except ValueError:
+        return _version(scope)
+
+
+def list_key(scope):
+    '''Ключ списка ленты при её текущей версии.
+
+    Читается до запроса к БД: список, построенный по этому ключу,
+    верен для этой версии, даже если запрос закончится после правки.
+    '''
+    return _key(scope, _version(scope))
+
+
+def follow_key(user_id, generations):
+    '''Ключ списка ленты подписок при этих поколениях её лент.'''
+    return _key(f'follow:{user_id}', max(generations.values()))
+
+
+def object_key(model, pk):
+    return f'obj:{model._meta.model_name}:{pk}'
+
+
+def entry(post):
+    return post.pub_date, post.pk, post.author_id, post.group_id
+
+
+def _older(entries, key):
+    # Позиция первой записи старше ``key = (дата, id)``. Список
+    # короткий, и линейный проход по нему дешевле любого запроса.
+    for position, (pub_date, pk, _, _) in enumerate(entries):
+        if (pub_date, pk) < key:
+            return position
+    return len(entries)
+
+
+def _not_newer(entries, key):
+    # Позиция первой записи не новее ``key``.
+    for position, (pub_date, pk, _, _) in enumerate(entries):
+        if (pub_date, pk) <= key:
+            return position
+    return len(entries)
+
+
+def _insert(ids, new):
+    entries, complete = ids
+    entries = [item for item in entries if item[1] != new[1]]
+    entries.insert(_older(entries, new[:2]), new)
+    if len(entries) > settings.FEED_IDS_LENGTH:
+        return entries[: settings.FEED_IDS_LENGTH], False
+    return entries, complete
+
+
+def _remove(ids, pk):
+    entries, complete = ids
+    return [item for item in entries if item[1] != pk], complete
+
+
+def _update(scopes, change):
+    for scope in scopes:
+        version = _version(scope)
+        new = _next_version(scope)
+        if new != version + 1:
+            # Между чтением версии и ``incr`` список правил кто-то ещё
+            # или ключ версии вытеснен: безопаснее оставить список
+            # ненайденным, чем потерять чужую правку, — следующий
+            # читатель построит его заново.
+            continue
+        ids = cache.get(_key(scope, version))
+        if ids is not None:
+            cache.set(
+                _key(scope, new), change(ids), settings.FEED_IDS_CACHE_TIMEOUT
+            )
+
+
+def _update_twice(scopes, change):
+    # Как ``feed_cache.invalidate``: правка повторяется после COMMIT,
+    # если читатель успел построить список из БД до фиксации поста.
+    # Обе правки идемпотентны.
+    _update(scopes, change)
+    transaction.on_commit(lambda: _update(scopes, change))
+
+
+def add(post, *scopes):
+    '''Вставляет пост в списки его лент или обновляет его запись там.'''
+    scopes = scopes or _scopes(post.author_id, post.group_id)
+    new = entry(post)
+    _update_twice(scopes, lambda ids: _insert(ids, new))
+
+
+def remove(post, *scopes):
+    scopes = scopes or _scopes(post.author_id, post.group_id)
+    _update_twice(scopes, lambda ids: _remove(ids, post.pk))
+
+
+def move(post, previous_group_id):
+    '''Пост перенесён из группы ``previous_group_id`` в ``post.group``.'''
+    if previous_group_id:
+        remove(post, f'group:{previous_group_id}')
+    # Запись в главной и профиле помнит группу поста.
+    add(post)
+
+
+def _scopes(author_id, group_id):
+    scopes = ['index', f'profile:{author_id}']
+    if group_id:
+        scopes.append(f'group:{group_id}')
+    return scopes
+
+
+def forget(*scopes):
+    '''Выбрасывает списки лент: следующий читатель построит их из БД.'''
+    for scope in scopes:
+        _next_version(scope)
+
+
+def forget_objects(model, *pks):
+    '''Сбрасывает объекты в кэше сейчас и ещё раз после COMMIT.'''
+    keys = [object_key(model, pk) for pk in pks]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def hydrate(entries):
+    '''Посты записей ``entries`` с авторами и группами, в том же порядке.
+
+    Все объекты страницы запрашиваются из кэша одним ``get_many``,
+    промахи — одним ``in_bulk`` на модель из основной базы: объекты
+    живут в кэше долго, и отставшая реплика закрепила бы в нём старые
+    строки. Пост, которого уже нет в БД, пропускается.
+    '''
+    wanted = {}
+    for _, pk, author_id, group_id in entries:
+        objects = ((Post, pk), (User, author_id), (Group, group_id))
+        for model, value in objects:
+            if value is not None:
+                wanted[object_key(model, value)] = (model, value)
+    found = cache.get_many(list(wanted))
+    missing = {}
+    for key, (model, pk) in wanted.items():
+        if key not in found:
+            missing.setdefault(model, []).append(pk)
+    fresh = {}
+    for model, pks in missing.items():
+        objects = OBJECT_QUERYSETS[model]().using(DEFAULT_DB_ALIAS)
+        for pk, obj in objects.in_bulk(pks).items():
+            fresh[object_key(model, pk)] = obj
+    if fresh:
+        cache.set_many(fresh, settings.OBJECT_CACHE_TIMEOUT)
+        found.update(fresh)
+
+    posts = []
+    for _, pk, _, _ in entries:
+        post = found.get(object_key(Post, pk))
+        if post is None:
+            continue
+        # Если запись списка отстала от поста, автор или группа
+        # догрузятся обычным запросом при обращении.
+        author = found.get(object_key(User, post.author_id))
+        if author is not None:
+            post.author = author
+        group = found.get(object_key(Group, post.group_id))
+        if group is not None:
+            post.group = group
+        posts.append(post)
+    return posts
+
+
+class FeedPaginator(CursorPaginator):
+    '''``CursorPaginator``, читающий страницы из списка id в кэше.
+
+    Список по ключу ``ids_key`` строится из ``queryset`` при первом
+    обращении, как и объекты в ``hydrate``, по основной базе, и
+    добавляется в кэш, только если ключ ещё свободен. Страницы, целиком
+    лежащие в списке, собираются ``hydrate`` без запросов к
+    ``queryset``; остальные выбираются из БД родительским классом, так
+    что курсоры и ссылки у обоих путей общие.
+    '''
+
+    def __init__(self, queryset, per_page, ids_key, **kwargs):
+        super().__init__(queryset, per_page, **kwargs)
+        self.ids_key = ids_key
+
+    @cached_property
+    def ids(self):
+        ids = cache.get(self.ids_key)
+        if ids is None:
+            length = settings.FEED_IDS_LENGTH
+            entries = list(
+                self.ordered(self.queryset)
+                .using(DEFAULT_DB_ALIAS)
+                .values_list(
+                    self.date_key, self.id_key, 'author_id', 'group_id'
+                )[: length + 1]
+            )
+            ids = entries[:length], len(entries) <= length
+            cache.add(self.ids_key, ids, settings.FEED_IDS_CACHE_TIMEOUT)
+        return ids
+
+    def _rows(self, entries):
+        posts = hydrate(entries)
+        for post in posts:
+            # Лента подписок сортирует по аннотациям, равным дате и id
+            # поста; курсор страницы читает их.
+            setattr(post, self.date_key, post.pub_date)
+            setattr(post, self.id_key, post.pk)
+        return posts
+
+    def first_page(self):
+        entries, _ = self.ids
+        window = entries[: self.per_page + 1]
+        return self._page(
+            self._rows(window[: self.per_page]),
+            has_next=len(window) > self.per_page,
+            has_previous=False,
+        )
+
+    def page_after(self, token, skip=0, number=None):
+        entries, complete = self.ids
+        start = _older(entries, decode_cursor(token)) + skip * self.per_page
+        window = entries[start: start + self.per_page + 1]
+        if len(window) <= self.per_page and not complete:
+            return super().page_after(token, skip, number)
+        return self._page(
+            self._rows(window[: self.per_page]),
+            has_next=len(window) > self.per_page,
+            has_previous=True,
+            number=number,
+        )
+
+    def page_before(self, token, skip=0, number=None):
+        entries, complete = self.ids
+        boundary = _not_newer(entries, decode_cursor(token))
+        if boundary == len(entries) and not complete:
+            # Курсор старше конца списка: между ними есть посты,
+            # которых в списке нет.
+            return super().page_before(token, skip, number)
+        end = boundary - skip * self.per_page
+        if end <= 0:
+            return self.first_page()
+        window = entries[max(0, end - self.per_page - 1): end]
+        return self._page(
+            self._rows(window[-self.per_page:]),
+            has_next=True,
+            has_previous=len(window) > self.per_page,
+            number=number,
+        )
+
+    def last_page(self):
+        entries, complete = self.ids
+        if not complete:
+            return super().last_page()
+        size = self.per_page
+        if self.count:
+            size = self.count - (self.num_pages - 1) * self.per_page
+        window = entries[-(size + 1):]
+        return self._page(
+            self._rows(window[-size:]),
+            has_next=False,
+            has_previous=len(window) > size,
+            number=self.num_pages,
+        )
+
+    def page_number(self, number):
+        entries, complete = self.ids
+        offset = (number - 1) * self.per_page
+        window = entries[offset: offset + self.per_page + 1]
+        if len(window) <= self.per_page and not complete:
+            return super().page_number(number)
+        if not window and number > 1:
+            return self.first_page()
+        return self._page(
+            self._rows(window[: self.per_page]),
+            has_next=len(window) > self.per_page,
+            has_previous=number > 1,
+            number=number,
+        )
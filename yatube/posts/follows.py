@@ -0,0 +1,174 @@
+'''Подписки: кэш множества авторов читателя и идемпотентная запись.
+
+``authors`` держит в кэше множество id авторов, на которых подписан
+пользователь, поэтому «подписан ли X на Y» проверяется в памяти, а не
+запросом к ``Follow`` на каждый профиль. Множество сбрасывается при
+любом изменении подписок пользователя: сигналами для записей через ORM и
+явно функциями этого модуля.
+
+``follow`` и ``unfollow`` пишут одним запросом (``INSERT OR IGNORE`` и
+``DELETE``) и по числу затронутых строк понимают, изменилось ли что-то,
+поэтому двойной клик не даёт ни ошибки, ни второго пересчёта счётчиков.
+``bulk_follow`` и ``bulk_unfollow`` меняют тысячи подписок в одной
+транзакции: счётчики пересчитываются подзапросом, а лента подписок
+собирается заново одним ``INSERT ... SELECT``.
+'''
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+
+from . import counters, page_cache, timeline
+from .models import Follow, User
+
+BATCH_SIZE = 400
+
+
+def cache_key(user_id):
+    return f'follows:{user_id}'
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), BATCH_SIZE):
+        yield values[start: start + BATCH_SIZE]
+
+
+def ids_for(usernames):
+    '''id пользователей с этими именами; неизвестные имена пропускаются.'''
+    ids = []
+    for chunk in _chunks(set(usernames)):
+        ids.extend(
+            User.objects.filter(username__in=chunk).values_list(
+                'pk', flat=True
+            )
+        )
+    return ids
+
+
+def authors(user_id):
+    '''Множество id авторов, на которых подписан ``user_id``.'''
+    key = cache_key(user_id)
+    found = cache.get(key)
+    if found is None:
+        # Множество живёт в кэше долго, поэтому читается из основной
+        # базы: отставшая реплика закрепила бы старые подписки.
+        found = frozenset(
+            Follow.objects.using(DEFAULT_DB_ALIAS)
+            .filter(user_id=user_id)
+            .values_list('author_id', flat=True)
+        )
+        cache.set(key, found, settings.FOLLOWS_CACHE_TIMEOUT)
+    return found
+
+
+def is_following(user, author_id):
+    if not user.is_authenticated:
+        return False
+    return author_id in authors(user.pk)
+
+
+def invalidate(*user_ids):
+    '''Сбрасывает множества сейчас и ещё раз после фиксации транзакции.'''
+    keys = [cache_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _changed(user_id, author_ids):
+    invalidate(user_id)
+    page_cache.purge(
+        f'user:{user_id}', *(f'user:{pk}' for pk in author_ids)
+    )
+
+
+def _insert(user_id, author_ids):
+    '''Вставляет подписки, пропуская существующие; число новых строк.'''
+    connection = connections[router.db_for_write(Follow)]
+    ops = connection.ops
+    quote = ops.quote_name
+    statement = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{quote(Follow._meta.db_table)} '
+        f'({quote("user_id")}, {quote("author_id")}) VALUES '
+    )
+    suffix = ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    inserted = 0
+    with connection.cursor() as cursor:
+        for chunk in _chunks(author_ids):
+            values = ', '.join(['(%s, %s)'] * len(chunk))
+            params = [value for pk in chunk for value in (user_id, pk)]
+            cursor.execute(f'{statement}{values} {suffix}', params)
+            inserted += cursor.rowcount
+    return inserted
+
+
+def _delete(user_id, author_ids):
+    rows = Follow.objects.filter(user_id=user_id, author_id__in=author_ids)
+    # Без сигналов и сборщика каскадов: один DELETE.
+    return rows._raw_delete(router.db_for_write(Follow))
+
+
+@transaction.atomic
+def follow(user_id, author_id):
+    '''Подписывает, если ещё не подписан; True, если подписка появилась.'''
+    if user_id == author_id or not _insert(user_id, [author_id]):
+        return False
+    counters.change(author_id, 'followers_count', 1)
+    counters.change(user_id, 'following_count', 1)
+    timeline.follow(user_id, author_id)
+    _changed(user_id, [author_id])
+    return True
+
+
+@transaction.atomic
+def unfollow(user_id, author_id):
+    '''Отписывает, если подписан; True, если подписка была.'''
+    if not _delete(user_id, [author_id]):
+        return False
+    counters.change(author_id, 'followers_count', -1)
+    counters.change(user_id, 'following_count', -1)
+    timeline.unfollow(user_id, author_id)
+    _changed(user_id, [author_id])
+    return True
+
+
+@transaction.atomic
+def bulk_follow(user_id, author_ids):
+    '''Подписывает на всех существующих авторов ``author_ids`` сразу.
+
+    Возвращает число новых подписок.
+    '''
+    db = router.db_for_write(Follow)
+    new = []
+    for chunk in _chunks(set(author_ids) - {user_id}):
+        new.extend(
+            User.objects.using(db)
+            .filter(pk__in=chunk)
+            .exclude(following__user_id=user_id)
+            .values_list('pk', flat=True)
+        )
+    inserted = _insert(user_id, new) if new else 0
+    if not inserted:
+        return 0
+    counters.refresh('following_count', [user_id])
+    for chunk in _chunks(new):
+        counters.refresh('followers_count', chunk)
+        timeline.mark_pulled(chunk)
+    timeline.rebuild(user_id)
+    _changed(user_id, new)
+    return inserted
+
+
+@transaction.atomic
+def bulk_unfollow(user_id, author_ids):
+    '''Отписывает от ``author_ids`` сразу; возвращает число отписок.'''
+    author_ids = list(set(author_ids))
+    deleted = sum(_delete(user_id, chunk) for chunk in _chunks(author_ids))
+    if not deleted:
+        return 0
+    counters.refresh('following_count', [user_id])
+    for chunk in _chunks(author_ids):
+        counters.refresh('followers_count', chunk)
+        timeline.unfollow(user_id, *chunk)
+    _changed(user_id, author_ids)
+    return deleted
@@ -1,5 +1,8 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
 
+from . import images
 from .models import Comment, Post
 
 
@@ -13,6 +16,41 @@ class PostForm(forms.ModelForm):
             'image': 'Выберите изображение',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not image or image == self.initial.get('image'):
+            return image
+
+        try:
+            processed = images.downscale(
+                image,
+                max_side=settings.POST_IMAGE_MAX_SIDE,
+                image_format=settings.POST_IMAGE_FORMAT,
+                quality=settings.POST_IMAGE_QUALITY,
+                max_pixels=settings.POST_IMAGE_MAX_PIXELS,
+            )
+        except images.ImageTooLarge:
+            raise forms.ValidationError(
+                'Изображение слишком большое, загрузите JPEG или '
+                'уменьшите его'
+            )
+        except images.InvalidImage:
+            raise forms.ValidationError('Не удалось прочитать изображение')
+        if processed is None:
+            image.seek(0)
+            return image
+
+        return InMemoryUploadedFile(
+            processed,
+            field_name='image',
+            name=images.replace_extension(
+                image.name, settings.POST_IMAGE_FORMAT
+            ),
+            content_type=f'image/{settings.POST_IMAGE_FORMAT.lower()}',
+            size=processed.getbuffer().nbytes,
+            charset=None,
+        )
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
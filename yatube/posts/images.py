@@ -0,0 +1,75 @@
+'''Обработка загружаемых изображений постов с ограниченной памятью.
+
+JPEG декодируется сразу в уменьшенном масштабе (draft mode libjpeg:
+1/2, 1/4 или 1/8), поэтому фотография на 40 мегапикселей никогда не
+разворачивается в память целиком. Остальные форматы декодируются
+полностью, и для них действует ограничение по числу пикселей.
+'''
+import io
+import os
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+ORIENTATION_TAG = 0x0112
+
+EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp', 'PNG': '.png'}
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def target_size(size, max_side):
+    width, height = size
+    ratio = min(1, max_side / max(width, height))
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+def downscale(fp, max_side, image_format, quality, max_pixels):
+    '''Уменьшает изображение и перекодирует его в ``image_format``.
+
+    Возвращает ``io.BytesIO`` с результатом или ``None``, если файл
+    можно сохранить как есть (например, небольшой анимированный GIF).
+    '''
+    try:
+        image = Image.open(fp)
+    except (UnidentifiedImageError, OSError) as error:
+        raise InvalidImage(str(error))
+
+    with image:
+        orientation = image.getexif().get(ORIENTATION_TAG, 1)
+        fits = max(image.size) <= max_side
+        if image.format == 'GIF' and fits:
+            return None
+        if image.format == image_format and fits and orientation == 1:
+            return None
+
+        size = target_size(image.size, max_side)
+        if image.format == 'JPEG':
+            image.draft('RGB', size)
+        elif image.width * image.height > max_pixels:
+            raise ImageTooLarge(image.size)
+
+        image.thumbnail(size, reducing_gap=2.0)
+        image = ImageOps.exif_transpose(image)
+
+        has_alpha = image.mode in ('RGBA', 'LA') or (
+            image.mode == 'P' and 'transparency' in image.info
+        )
+        if image_format == 'JPEG' or not has_alpha:
+            image = image.convert('RGB')
+        else:
+            image = image.convert('RGBA')
+
+        result = io.BytesIO()
+        image.save(result, image_format, quality=quality, optimize=True)
+    result.seek(0)
+    return result
+
+
+def replace_extension(name, image_format):
+    return os.path.splitext(name)[0] + EXTENSIONS[image_format]
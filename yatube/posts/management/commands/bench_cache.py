@@ -0,0 +1,183 @@
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from .bench_views import percentile
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'filebased': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'yatube.backends.sqlite_cache.SQLiteCache',
+}
+
+# Размеры значений как у ленты: фрагмент страницы и карточки постов.
+FRAGMENT_BYTES = 8 * 1024
+CARD_BYTES = 1024
+CARDS_PER_PAGE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает бэкенды кэша на нагрузке лент: несколько процессов, '
+        'как воркеры gunicorn, читают поколения лент, фрагменты страниц '
+        'и карточки постов через get_many и изредка сбрасывают '
+        'поколения. Для каждого бэкенда считаются запросы в секунду, '
+        'p50/p99, доля попаданий во фрагменты и доля устаревших ответов '
+        '— поколение старше последнего сброса в любом процессе. '
+        'Основной кэш не используется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--scopes', type=int, default=200)
+        parser.add_argument('--write-ratio', type=float, default=0.02)
+        parser.add_argument(
+            '--backends', default=','.join(BACKENDS),
+            help='Бэкенды через запятую: ' + ', '.join(BACKENDS),
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='bench_cache.json')
+
+    def handle(self, *args, **options):
+        backends = options['backends'].split(',')
+        unknown = set(backends) - set(BACKENDS)
+        if unknown:
+            raise CommandError(f'Неизвестные бэкенды: {unknown}')
+        results = {}
+        for name in backends:
+            directory = tempfile.mkdtemp(prefix='bench_cache_')
+            try:
+                results[name] = self.run_backend(name, directory, options)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            self.report(name, results[name])
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'meta': {
+                        key: options[key]
+                        for key in (
+                            'processes', 'seconds', 'scopes', 'write_ratio'
+                        )
+                    },
+                    'backends': results,
+                },
+                file,
+                ensure_ascii=False,
+                indent=2,
+            )
+        self.stdout.write(f'Результат записан в {options["output"]}')
+
+    @staticmethod
+    def cache_config(name, directory):
+        location = {
+            'locmem': f'bench-{os.getpid()}',
+            'filebased': directory,
+            'sqlite': os.path.join(directory, 'cache.sqlite3'),
+        }[name]
+        return BACKENDS[name], location, {
+            'TIMEOUT': None,
+            'OPTIONS': {'MAX_ENTRIES': 1_000_000},
+        }
+
+    def run_backend(self, name, directory, options):
+        context = multiprocessing.get_context('fork')
+        # Последнее поколение каждой ленты, записанное любым процессом.
+        latest = context.Array('q', options['scopes'], lock=False)
+        results = context.Queue()
+        config = self.cache_config(name, directory)
+        deadline = time.time() + options['seconds']
+        workers = [
+            context.Process(
+                target=work,
+                args=(config, latest, results, deadline, seed, options),
+            )
+            for seed in range(
+                options['seed'], options['seed'] + options['processes']
+            )
+        ]
+        for worker in workers:
+            worker.start()
+        samples, hits, stale = [], 0, 0
+        for _ in workers:
+            worker_samples, worker_hits, worker_stale = results.get()
+            samples.extend(worker_samples)
+            hits += worker_hits
+            stale += worker_stale
+        for worker in workers:
+            worker.join()
+        if not samples:
+            return {'requests': 0}
+        return {
+            'requests': len(samples),
+            'requests_per_second': round(
+                len(samples) / options['seconds'], 1
+            ),
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p99_ms': round(percentile(samples, 99), 3),
+            'mean_ms': round(statistics.mean(samples), 3),
+            'fragment_hit_ratio': round(hits / len(samples), 3),
+            'stale_ratio': round(stale / len(samples), 4),
+        }
+
+    def report(self, name, result):
+        if not result['requests']:
+            self.stdout.write(f'{name:>10}: нет запросов')
+            return
+        self.stdout.write(
+            f'{name:>10}: {result["requests_per_second"]:>9.1f} зап/с  '
+            f'p50 {result["p50_ms"]:>6.3f} мс  '
+            f'p99 {result["p99_ms"]:>7.3f} мс  '
+            f'попаданий {result["fragment_hit_ratio"]:.1%}  '
+            f'устаревших {result["stale_ratio"]:.2%}'
+        )
+
+
+def work(config, latest, results, deadline, seed, options):
+    '''Процесс-воркер: свой экземпляр бэкенда, как у воркера gunicorn.'''
+    backend, location, params = config
+    cache = import_string(backend)(location, params)
+    rng = random.Random(seed)
+    scopes = range(options['scopes'])
+    # Популярность лент убывает как 1/n: главная читается чаще групп.
+    weights = [1 / (scope + 1) for scope in scopes]
+    fragment = b'x' * FRAGMENT_BYTES
+    card = b'x' * CARD_BYTES
+    samples, hits, stale = [], 0, 0
+    while time.time() < deadline:
+        scope = rng.choices(scopes, weights)[0]
+        started = time.perf_counter()
+        if rng.random() < options['write_ratio']:
+            generation = time.time_ns()
+            cache.set(f'feed:generation:{scope}', generation)
+            latest[scope] = max(latest[scope], generation)
+        generation = cache.get(f'feed:generation:{scope}')
+        if generation is None:
+            generation = time.time_ns()
+            cache.set(f'feed:generation:{scope}', generation)
+        if generation < latest[scope]:
+            stale += 1
+        key = f'feed:fragment:{scope}:{generation}'
+        if cache.get(key) is None:
+            cache.set(key, fragment)
+        else:
+            hits += 1
+        card_keys = [
+            f'post:card:{scope}:{number}' for number in range(CARDS_PER_PAGE)
+        ]
+        found = cache.get_many(card_keys)
+        missing = {key: card for key in card_keys if key not in found}
+        if missing:
+            cache.set_many(missing)
+        samples.append((time.perf_counter() - started) * 1000)
+    results.put((samples, hits, stale))
+    cache.close()
@@ -0,0 +1,88 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from posts.models import Post
+from posts.paginator import CursorPaginator, encode_cursor
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время открытия глубоких страниц ленты для '
+        'OFFSET-паджинатора и keyset-паджинатора. Тестовые данные '
+        'создаются в транзакции и откатываются по завершении.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--per-page', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--pages', default='1,10,100,1000',
+            help='Номера страниц через запятую',
+        )
+
+    def handle(self, *args, **options):
+        per_page = options['per_page']
+        pages = [int(number) for number in options['pages'].split(',')]
+        with transaction.atomic():
+            self.seed(options['posts'])
+            queryset = Post.objects.all()
+            self.stdout.write(
+                f'{"page":>6} {"offset, ms":>12} {"keyset, ms":>12}'
+            )
+            for number in pages:
+                offset_ms = self.measure(
+                    lambda: self.offset_page(queryset, per_page, number),
+                    options['repeat'],
+                )
+                token = self.cursor_for(queryset, per_page, number)
+                keyset_ms = self.measure(
+                    lambda: self.keyset_page(queryset, per_page, token),
+                    options['repeat'],
+                )
+                self.stdout.write(
+                    f'{number:>6} {offset_ms:>12.2f} {keyset_ms:>12.2f}'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        author = User.objects.create(username='bench_pagination')
+        Post.objects.bulk_create(
+            Post(text=f'Пост №{i}', author=author) for i in range(count)
+        )
+
+    @staticmethod
+    def measure(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000
+
+    @staticmethod
+    def offset_page(queryset, per_page, number):
+        page = Paginator(queryset, per_page).page(number)
+        return list(page.object_list)
+
+    @staticmethod
+    def keyset_page(queryset, per_page, token):
+        paginator = CursorPaginator(queryset, per_page)
+        if token is None:
+            return list(paginator.first_page())
+        return list(paginator.page_after(token))
+
+    @staticmethod
+    def cursor_for(queryset, per_page, number):
+        if number == 1:
+            return None
+        boundary = queryset.order_by('-pub_date', '-id')[
+            (number - 1) * per_page - 1
+        ]
+        return encode_cursor(boundary)
@@ -0,0 +1,167 @@
+import json
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import get_template
+from django.utils import timezone
+
+from posts import markup
+from posts.models import Comment, Group, Post
+
+from .bench_views import percentile
+
+User = get_user_model()
+
+# Шаблоны страницы и выражение, которое в них выводит готовый HTML.
+TEMPLATES = {
+    'posts/post_card.html': (
+        'post.text_html|safe', 'post.text|linebreaksbr'
+    ),
+    'posts/comment_list.html': (
+        'item.text_html|safe', 'item.text|linebreaksbr'
+    ),
+}
+
+WORDS = (
+    'лента пост группа автор подписка комментарий <b>разметка</b> '
+    'ссылка & "кавычки" текст'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время рендеринга страницы ленты и комментариев с '
+        'готовым HTML в text_html и с фильтром linebreaksbr, как было '
+        'раньше. Шаблоны «до» получаются из текущих заменой выражения, '
+        'поэтому остальная разметка у вариантов общая. Посты и '
+        'комментарии создаются в памяти, база не используется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=settings.POSTS_PER_PAGE
+        )
+        parser.add_argument(
+            '--comments', type=int, default=settings.COMMENTS_PER_PAGE
+        )
+        parser.add_argument(
+            '--words', type=int, default=1000,
+            help='Длина текста поста в словах',
+        )
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='bench_render.json')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        posts, comments = self.page(rng, options)
+        results = {}
+        for variant in ('linebreaksbr', 'text_html'):
+            templates = self.templates(variant)
+            samples = self.measure(
+                lambda: self.render(templates, posts, comments),
+                options['repeat'],
+            )
+            results[variant] = {
+                'p50_ms': round(percentile(samples, 50), 3),
+                'p99_ms': round(percentile(samples, 99), 3),
+                'mean_ms': round(statistics.mean(samples), 3),
+            }
+            self.stdout.write(
+                f'{variant:>12}: '
+                f'p50 {results[variant]["p50_ms"]:>8.3f} мс  '
+                f'p99 {results[variant]["p99_ms"]:>8.3f} мс'
+            )
+        before, after = results['linebreaksbr'], results['text_html']
+        speedup = before['p50_ms'] / after['p50_ms']
+        self.stdout.write(f'Ускорение по p50: {speedup:.1f}x')
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'meta': {
+                        key: options[key]
+                        for key in ('posts', 'comments', 'words', 'repeat')
+                    },
+                    'variants': results,
+                    'speedup_p50': round(speedup, 2),
+                },
+                file,
+                ensure_ascii=False,
+                indent=2,
+            )
+        self.stdout.write(f'Результат записан в {options["output"]}')
+
+    @staticmethod
+    def text(rng, words):
+        lines = []
+        while words > 0:
+            length = min(words, rng.randint(5, 40))
+            lines.append(' '.join(rng.choices(WORDS, k=length)))
+            words -= length
+        return '\n'.join(lines)
+
+    def page(self, rng, options):
+        author = User(pk=1, username='bench_render')
+        group = Group(pk=1, title='Группа', slug='bench-render')
+        now = timezone.now()
+        posts = markup.fill(
+            Post(
+                pk=number,
+                text=self.text(rng, options['words']),
+                author=author,
+                group=group,
+                pub_date=now,
+                updated=now,
+                comment_count=options['comments'],
+            )
+            for number in range(1, options['posts'] + 1)
+        )
+        comments = markup.fill(
+            Comment(
+                pk=number,
+                text=self.text(rng, options['words'] // 10),
+                author=author,
+                post=posts[0],
+                created=now,
+            )
+            for number in range(1, options['comments'] + 1)
+        )
+        return posts, comments
+
+    @staticmethod
+    def templates(variant):
+        compiled = {}
+        for name, (stored, filtered) in TEMPLATES.items():
+            template = get_template(name)
+            if variant == 'linebreaksbr':
+                source = template.template.source
+                if stored not in source:
+                    raise CommandError(f'{name}: нет выражения {stored}')
+                template = template.backend.from_string(
+                    source.replace(stored, filtered)
+                )
+            compiled[name] = template
+        return compiled
+
+    @staticmethod
+    def render(templates, posts, comments):
+        card = templates['posts/post_card.html']
+        for post in posts:
+            card.render({'post': post})
+        templates['posts/comment_list.html'].render(
+            {'post': posts[0], 'comments': comments}
+        )
+
+    @staticmethod
+    def measure(func, repeat):
+        func()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
@@ -0,0 +1,87 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+User = get_user_model()
+
+WORDS = (
+    'город река погода новости музыка кино книга футбол школа работа '
+    'отпуск море горы кошка собака кофе завтрак ужин праздник друзья '
+    'программирование питон джанго база данных сервер поиск индекс '
+    'весна лето осень зима утро вечер ночь дорога поезд самолёт'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по постам через FTS5 и через LIKE. Тестовые '
+        'посты создаются в транзакции и откатываются по завершении.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument(
+            '--queries', default='питон,самолёт,прог,кошка собака',
+            help='Поисковые запросы через запятую',
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Полнотекстовый поиск доступен только в SQLite')
+        queries = options['queries'].split(',')
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.seed(options['posts'])
+            self.stdout.write(
+                f'Создано {options["posts"]} постов за '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+            self.stdout.write(
+                f'{"query":>16} {"like, ms":>12} {"fts5, ms":>12}'
+            )
+            for query in queries:
+                like_ms = self.measure(
+                    lambda: self.like_page(query), options['repeat']
+                )
+                fts_ms = self.measure(
+                    lambda: self.fts_page(query), options['repeat']
+                )
+                self.stdout.write(
+                    f'{query:>16} {like_ms:>12.2f} {fts_ms:>12.2f}'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        author = User.objects.create(username='bench_search')
+        rng = random.Random(0)
+        Post.objects.bulk_create(
+            Post(text=' '.join(rng.choices(WORDS, k=30)), author=author)
+            for _ in range(count)
+        )
+
+    @staticmethod
+    def measure(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000
+
+    @staticmethod
+    def like_page(query):
+        posts = Post.objects.for_feed()
+        for word in query.split():
+            posts = posts.filter(text__icontains=word)
+        return list(posts.order_by('-pub_date', '-id')[:10])
+
+    @staticmethod
+    def fts_page(query):
+        return list(search.SearchPaginator(query, 10).first_page())
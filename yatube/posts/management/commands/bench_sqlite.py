@@ -0,0 +1,213 @@
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db import transaction
+from django.db.models import F
+
+from posts.models import Comment, Post
+
+from .bench_views import percentile
+
+# Исходный профиль: стандартный бэкенд, журнал отката, новое соединение
+# на каждый запрос. Продакшен-профиль берётся из настроек.
+PROFILES = {
+    'baseline': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'OPTIONS': {},
+        'CONN_MAX_AGE': 0,
+        'journal_mode': 'DELETE',
+    },
+    'production': {
+        'ENGINE': 'yatube.backends.sqlite3',
+        'OPTIONS': settings.SQLITE_OPTIONS,
+        'CONN_MAX_AGE': 600,
+        'journal_mode': 'WAL',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает копию базы параллельными читателями ленты и '
+        'писателями комментариев и сравнивает исходный и продакшен-'
+        'профили SQLite: пропускную способность, p50/p99 и число ошибок '
+        '«database is locked». Основная база не меняется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument(
+            '--profiles', default=','.join(PROFILES),
+            help='Профили через запятую: ' + ', '.join(PROFILES),
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='bench_sqlite.json')
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'].split(',')
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f'Неизвестные профили: {unknown}')
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('Бенчмарк рассчитан на SQLite')
+        self.post_ids = list(
+            Post.objects.values_list('pk', 'author_id')[:10000]
+        )
+        if not self.post_ids:
+            raise CommandError('В базе нет постов, запустите seed_yatube')
+        directory = tempfile.mkdtemp(prefix='bench_sqlite_')
+        try:
+            results = {
+                profile: self.run_profile(profile, directory, options)
+                for profile in profiles
+            }
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'meta': {
+                        'readers': options['readers'],
+                        'writers': options['writers'],
+                        'seconds': options['seconds'],
+                        'posts': len(self.post_ids),
+                        'sqlite': sqlite3.sqlite_version,
+                    },
+                    'profiles': results,
+                },
+                file,
+                ensure_ascii=False,
+                indent=2,
+            )
+        self.stdout.write(f'Результат записан в {options["output"]}')
+
+    def run_profile(self, profile, directory, options):
+        alias = f'bench_{profile}'
+        path = os.path.join(directory, f'{profile}.sqlite3')
+        self.copy_database(path, PROFILES[profile]['journal_mode'])
+        connections.databases[alias] = {
+            'ENGINE': PROFILES[profile]['ENGINE'],
+            'NAME': path,
+            'OPTIONS': PROFILES[profile]['OPTIONS'],
+            'CONN_MAX_AGE': PROFILES[profile]['CONN_MAX_AGE'],
+        }
+        samples = {'read': [], 'write': []}
+        errors = {'read': 0, 'write': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+        workers = [
+            threading.Thread(
+                target=self.work,
+                args=(alias, kind, deadline, samples, errors, lock, seed),
+            )
+            for seed, kind in enumerate(
+                ['read'] * options['readers'] + ['write'] * options['writers'],
+                start=options['seed'],
+            )
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        del connections.databases[alias]
+        result = {
+            kind: self.summarize(samples[kind], errors[kind], options)
+            for kind in samples
+        }
+        self.report(profile, result)
+        return result
+
+    @staticmethod
+    def copy_database(path, journal_mode):
+        source = connections[DEFAULT_DB_ALIAS]
+        source.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            source.connection.backup(target)
+            target.execute(f'PRAGMA journal_mode = {journal_mode}')
+        finally:
+            target.close()
+
+    def work(self, alias, kind, deadline, samples, errors, lock, seed):
+        rng = random.Random(seed)
+        operation = self.read if kind == 'read' else self.write
+        connection = connections[alias]
+        local_samples, local_errors = [], 0
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    operation(alias, rng)
+                except OperationalError:
+                    local_errors += 1
+                else:
+                    local_samples.append(
+                        (time.perf_counter() - started) * 1000
+                    )
+                # Граница запроса: Django закрывает соединение, если
+                # CONN_MAX_AGE истёк или равен нулю.
+                connection.close_if_unusable_or_obsolete()
+        finally:
+            connection.close()
+        with lock:
+            samples[kind].extend(local_samples)
+            errors[kind] += local_errors
+
+    @staticmethod
+    def read(alias, rng):
+        list(
+            Post.objects.using(alias)
+            .for_feed()
+            .order_by('-pub_date', '-id')[: settings.POSTS_PER_PAGE]
+        )
+
+    def write(self, alias, rng):
+        # Как add_comment: сначала чтение поста, затем запись, в одной
+        # транзакции. Сигналы не нужны, поэтому bulk_create и update.
+        post_id, author_id = rng.choice(self.post_ids)
+        with transaction.atomic(using=alias):
+            Post.objects.using(alias).filter(pk=post_id).exists()
+            Comment.objects.using(alias).bulk_create(
+                [Comment(post_id=post_id, author_id=author_id, text='bench')]
+            )
+            Post.objects.using(alias).filter(pk=post_id).update(
+                comment_count=F('comment_count') + 1
+            )
+
+    @staticmethod
+    def summarize(samples, errors, options):
+        if not samples:
+            return {'ops': 0, 'ops_per_second': 0, 'errors': errors}
+        return {
+            'ops': len(samples),
+            'ops_per_second': round(len(samples) / options['seconds'], 1),
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p99_ms': round(percentile(samples, 99), 2),
+            'mean_ms': round(statistics.mean(samples), 2),
+            'errors': errors,
+        }
+
+    def report(self, profile, result):
+        for kind, summary in result.items():
+            line = (
+                f'{profile:>10} {kind:>5}: '
+                f'{summary["ops_per_second"]:>8.1f} оп/с  '
+            )
+            if summary['ops']:
+                line += (
+                    f'p50 {summary["p50_ms"]:>7.2f} мс  '
+                    f'p99 {summary["p99_ms"]:>8.2f} мс  '
+                )
+            self.stdout.write(line + f'ошибок {summary["errors"]}')
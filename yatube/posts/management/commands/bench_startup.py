@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_views import REMOTE_ADDR
+
+# Настройки и переменные окружения каждого варианта запуска воркера.
+VARIANTS = {
+    'dev': {'DJANGO_SETTINGS_MODULE': 'yatube.settings'},
+    'production': {
+        'DJANGO_SETTINGS_MODULE': 'yatube.settings_production',
+        'YATUBE_WARM_UP': '0',
+    },
+    'warm': {
+        'DJANGO_SETTINGS_MODULE': 'yatube.settings_production',
+        'YATUBE_WARM_UP': '1',
+    },
+}
+
+# Выполняется в новом интерпретаторе: загружает yatube.wsgi, как воркер
+# gunicorn, и дважды запрашивает каждый адрес через WSGI-приложение.
+WORKER = '''
+import json
+import sys
+import time
+import wsgiref.util
+
+started = time.perf_counter()
+import yatube.wsgi
+result = {
+    'import_ms': (time.perf_counter() - started) * 1000,
+    'modules': len(sys.modules),
+    'requests': {},
+}
+
+
+def request(path):
+    environ = {'PATH_INFO': path, 'REMOTE_ADDR': sys.argv[2]}
+    wsgiref.util.setup_testing_defaults(environ)
+    statuses = []
+    started = time.perf_counter()
+    body = yatube.wsgi.application(
+        environ, lambda status, headers, exc_info=None: statuses.append(status)
+    )
+    b''.join(body)
+    body.close()
+    return (time.perf_counter() - started) * 1000, int(statuses[0][:3])
+
+
+for path in json.loads(sys.argv[1]):
+    first_ms, status = request(path)
+    second_ms, _ = request(path)
+    result['requests'][path] = {
+        'status': status, 'first_ms': first_ms, 'second_ms': second_ms,
+    }
+print(json.dumps(result))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет холодный старт воркера: время загрузки yatube.wsgi '
+        '(вместе с прогревом), число импортированных модулей и время '
+        'первого и второго запроса к каждому адресу. Каждый прогон — '
+        'новый процесс с пустым кэшем во временном файле; варианты: '
+        'настройки разработки, продакшен без прогрева и с прогревом. '
+        'Печатаются медианы по прогонам, результат пишется в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument(
+            '--paths', default='/',
+            help='Адреса через запятую, например /,/group/slug/',
+        )
+        parser.add_argument(
+            '--variants', default=','.join(VARIANTS),
+            help='Варианты через запятую: ' + ', '.join(VARIANTS),
+        )
+        parser.add_argument('--output', default='bench_startup.json')
+
+    def handle(self, *args, **options):
+        variants = options['variants'].split(',')
+        unknown = set(variants) - set(VARIANTS)
+        if unknown:
+            raise CommandError(f'Неизвестные варианты: {unknown}')
+        paths = options['paths'].split(',')
+        results = {}
+        for name in variants:
+            runs = [
+                self.run_worker(VARIANTS[name], paths)
+                for _ in range(options['runs'])
+            ]
+            results[name] = self.summarize(runs, paths)
+            self.report(name, results[name])
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'meta': {'runs': options['runs'], 'paths': paths},
+                    'variants': results,
+                },
+                file,
+                ensure_ascii=False,
+                indent=2,
+            )
+        self.stdout.write(f'Результат записан в {options["output"]}')
+
+    @staticmethod
+    def run_worker(variant, paths):
+        directory = tempfile.mkdtemp(prefix='bench_startup_')
+        env = dict(
+            os.environ,
+            YATUBE_CACHE_PATH=os.path.join(directory, 'cache.sqlite3'),
+            **variant,
+        )
+        started = time.perf_counter()
+        try:
+            process = subprocess.run(
+                [
+                    sys.executable, '-c', WORKER,
+                    json.dumps(paths), REMOTE_ADDR,
+                ],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        if process.returncode:
+            raise CommandError(process.stderr)
+        result = json.loads(process.stdout.splitlines()[-1])
+        result['process_ms'] = (time.perf_counter() - started) * 1000
+        return result
+
+    @staticmethod
+    def summarize(runs, paths):
+        def median(values):
+            return round(statistics.median(values), 2)
+
+        return {
+            'process_ms': median(run['process_ms'] for run in runs),
+            'import_ms': median(run['import_ms'] for run in runs),
+            'modules': median(run['modules'] for run in runs),
+            'requests': {
+                path: {
+                    'status': runs[0]['requests'][path]['status'],
+                    'first_ms': median(
+                        run['requests'][path]['first_ms'] for run in runs
+                    ),
+                    'second_ms': median(
+                        run['requests'][path]['second_ms'] for run in runs
+                    ),
+                }
+                for path in paths
+            },
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:>10}: процесс {result["process_ms"]:>8.1f} мс  '
+            f'загрузка {result["import_ms"]:>7.1f} мс  '
+            f'модулей {result["modules"]:>5.0f}'
+        )
+        for path, timings in result['requests'].items():
+            self.stdout.write(
+                f'{"":>12}{path} [{timings["status"]}]: '
+                f'первый {timings["first_ms"]:>7.1f} мс  '
+                f'второй {timings["second_ms"]:>6.1f} мс'
+            )
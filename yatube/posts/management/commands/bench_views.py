@@ -0,0 +1,231 @@
+import json
+import math
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+VIEWS = ('index', 'group_posts', 'profile', 'post', 'follow_index')
+
+# Обработчик прогресса SQLite вызывается раз в столько инструкций VM.
+VM_STEP = 10
+
+# Адрес вне INTERNAL_IPS, чтобы debug toolbar не встраивался в ответы.
+REMOTE_ADDR = '192.0.2.1'
+
+
+def percentile(values, percent):
+    '''Перцентиль методом ближайшего ранга.'''
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет ленты и страницу поста через тестовый клиент и '
+        'измеряет p50/p95/p99 времени ответа, число запросов к БД и '
+        'объём работы SQLite на запрос. Результат пишется в JSON, '
+        'который удобно сравнивать между коммитами. Данные берутся из '
+        'текущей базы, наполните её командой seed_yatube.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--views', default=','.join(VIEWS),
+            help='Представления через запятую: ' + ', '.join(VIEWS),
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='bench_views.json')
+
+    def handle(self, *args, **options):
+        views = options['views'].split(',')
+        unknown = set(views) - set(VIEWS)
+        if unknown:
+            raise CommandError(f'Неизвестные представления: {unknown}')
+        if not Post.objects.exists():
+            raise CommandError('В базе нет постов, запустите seed_yatube')
+        self.rng = random.Random(options['seed'])
+        self.prepare_targets()
+        self.track_vm_steps()
+        results = {}
+        for view in views:
+            if not self.has_targets(view):
+                self.stdout.write(f'{view}: нет данных, пропущено')
+                continue
+            for _ in range(options['warmup']):
+                self.request(view)
+            samples = [
+                self.measure(view, options['cold'])
+                for _ in range(options['requests'])
+            ]
+            results[view] = self.summarize(samples)
+            self.report(view, results[view])
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(
+                {'meta': self.meta(options), 'views': results},
+                file,
+                ensure_ascii=False,
+                indent=2,
+            )
+        self.stdout.write(f'Результат записан в {options["output"]}')
+
+    def prepare_targets(self):
+        # Популярные авторы и группы запрашиваются чаще, как в жизни:
+        # выборка ведётся с весами по числу постов.
+        self.authors = list(
+            User.objects.annotate(total=Count('posts'))
+            .filter(total__gt=0)
+            .values_list('username', 'total')
+        )
+        self.groups = list(
+            Group.objects.annotate(total=Count('posts'))
+            .filter(total__gt=0)
+            .values_list('slug', 'total')
+        )
+        self.posts = list(
+            Post.objects.order_by('-pk')
+            .values_list('pk', 'author__username')[:10000]
+        )
+        readers = (
+            Follow.objects.values('user')
+            .annotate(total=Count('pk'))
+            .order_by('-total')
+            .values_list('user', flat=True)[:20]
+        )
+        self.readers = []
+        for user in User.objects.filter(pk__in=list(readers)):
+            client = Client(REMOTE_ADDR=REMOTE_ADDR)
+            client.force_login(user)
+            self.readers.append(client)
+        self.anonymous = Client(REMOTE_ADDR=REMOTE_ADDR)
+
+    def weighted(self, items):
+        names, weights = zip(*items)
+        return self.rng.choices(names, weights=weights)[0]
+
+    def target(self, view):
+        client = self.anonymous
+        if view == 'index':
+            url = reverse('index')
+        elif view == 'group_posts':
+            url = reverse('group_posts', args=[self.weighted(self.groups)])
+        elif view == 'profile':
+            url = reverse('profile', args=[self.weighted(self.authors)])
+        elif view == 'post':
+            pk, username = self.rng.choice(self.posts)
+            url = reverse('post', args=[username, pk])
+        else:
+            url = reverse('follow_index')
+            client = self.rng.choice(self.readers)
+        return client, url
+
+    def has_targets(self, view):
+        return bool({
+            'group_posts': self.groups,
+            'profile': self.authors,
+            'follow_index': self.readers,
+        }.get(view, self.posts))
+
+    def request(self, view):
+        client, url = self.target(view)
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}')
+        return response
+
+    def measure(self, view, cold):
+        if cold:
+            cache.clear()
+        self.steps = 0
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = self.request(view)
+            elapsed = time.perf_counter() - started
+        steps = self.steps * VM_STEP if self.tracks_vm else None
+        hit = response.get('X-Cache') == 'HIT'
+        return elapsed * 1000, len(context), steps, hit
+
+    def track_vm_steps(self):
+        # Число инструкций виртуальной машины SQLite — переносимая между
+        # машинами оценка работы запроса: растёт с числом прочитанных
+        # строк и страниц индекса, но не зависит от скорости диска.
+        self.steps = 0
+        self.tracks_vm = connection.vendor == 'sqlite'
+        if not self.tracks_vm:
+            return
+        connection.ensure_connection()
+        connection.connection.set_progress_handler(self.count_step, VM_STEP)
+
+    def count_step(self):
+        self.steps += 1
+        return 0
+
+    def summarize(self, samples):
+        latencies, queries, steps, hits = zip(*samples)
+        return {
+            'requests': len(samples),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.mean(latencies), 2),
+            'queries_mean': round(statistics.mean(queries), 2),
+            'queries_max': max(queries),
+            'vm_steps_mean': (
+                round(statistics.mean(steps)) if None not in steps else None
+            ),
+            'page_cache_hit_ratio': round(sum(hits) / len(hits), 3),
+        }
+
+    def report(self, view, result):
+        steps = result['vm_steps_mean']
+        self.stdout.write(
+            f'{view:>13}: p50 {result["p50_ms"]:>8.2f} мс  '
+            f'p95 {result["p95_ms"]:>8.2f} мс  '
+            f'p99 {result["p99_ms"]:>8.2f} мс  '
+            f'запросов {result["queries_mean"]:>5.1f}  '
+            f'VM {"-" if steps is None else steps:>9}  '
+            f'кэш страниц {result["page_cache_hit_ratio"]:.0%}'
+        )
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+        except OSError:
+            commit = ''
+        return {
+            'commit': commit,
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'cold': options['cold'],
+            'seed': options['seed'],
+            'posts': Post.objects.count(),
+            'users': User.objects.count(),
+            'follows': Follow.objects.count(),
+        }
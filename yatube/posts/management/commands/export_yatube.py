@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в JSONL (.gz — со сжатием). Строки читаются из базы порциями и '
+        'сразу пишутся в файл, поэтому память не растёт с объёмом данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Файл или «-» для stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        report = self.stderr.write
+        if options['output'] == '-':
+            transfer.export(sys.stdout, options['chunk_size'], report)
+            return
+        with transfer.open_file(options['output'], 'w') as stream:
+            transfer.export(stream, options['chunk_size'], report)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит миниатюры всех геометрий для уже загруженных изображений '
+        'постов. Готовые миниатюры пропускаются.'
+    )
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image='')
+            .exclude(image__isnull=True)
+            .values_list('image', flat=True)
+            .distinct()
+        )
+        count = 0
+        for name in names.iterator():
+            thumbnails.enqueue(name)
+            count += 1
+        thumbnails.wait()
+        self.stdout.write(f'Обработано изображений: {count}')
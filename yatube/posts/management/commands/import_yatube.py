@@ -0,0 +1,52 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает JSONL, выгруженный export_yatube, пачками через '
+        'bulk_create. После каждой пачки сохраняется контрольная точка, '
+        'и прерванный импорт продолжается с того же места повторным '
+        'запуском. В конце пересчитываются счётчики и ленты подписок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл JSONL или JSONL.gz')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки (по умолчанию <input>.checkpoint)',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Игнорировать контрольную точку и начать заново',
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики и ленты подписок после импорта',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        importer = transfer.Importer(
+            options['input'],
+            options['batch_size'],
+            checkpoint=options['checkpoint'],
+            restart=options['restart'],
+            report=self.stdout.write,
+        )
+        if importer.resumed_from:
+            self.stdout.write(
+                f'Продолжение со строки {importer.resumed_from + 1}'
+            )
+        importer.run()
+        if options['skip_rebuild']:
+            return
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_timelines', stdout=self.stdout)
+        # Новые авторы получили свежие pk, а вот ленты и страницы
+        # существовавших могли закэшироваться до импорта.
+        transfer.invalidate_feeds(importer.merged('user'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересоздаёт триггеры и заново строит FTS5-индекс постов из '
+        'posts_post. Нужна после ручных правок базы в обход SQLite.'
+    )
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Полнотекстовый поиск доступен только в SQLite')
+        with connection.schema_editor() as schema_editor:
+            search.install(schema_editor)
+        search.rebuild()
+        self.stdout.write('Поисковый индекс перестроен')
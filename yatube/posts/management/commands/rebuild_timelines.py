@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет ленты подписок заново из Follow и Post и обрезает их '
+        'до TIMELINE_LENGTH записей. Запускайте после миграции и по '
+        'расписанию, чтобы ленты не разрастались.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username', action='append', dest='usernames',
+            help='Перестроить ленты только указанных пользователей',
+        )
+        parser.add_argument(
+            '--trim-only', action='store_true',
+            help='Только обрезать ленты, не перестраивая их',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько лент обрабатывать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        if not options['trim_only']:
+            pulled = timeline.mark_pulled()
+            if pulled:
+                self.stdout.write(f'Новых PulledAuthor: {pulled}')
+        users = User.objects.filter(follower__isnull=False).distinct()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        update = timeline.trim if options['trim_only'] else timeline.rebuild
+        user_ids = list(users.values_list('pk', flat=True))
+        size = options['batch_size']
+        # Фиксация на каждого читателя упирается в fsync, а не в запросы.
+        for start in range(0, len(user_ids), size):
+            with transaction.atomic():
+                for user_id in user_ids[start: start + size]:
+                    update(user_id)
+        self.stdout.write(f'Обработано лент: {len(user_ids)}')
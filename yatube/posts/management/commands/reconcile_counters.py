@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts import counters, feed_ids
+from posts.models import FeedStats, Post, UserStats
+
+User = get_user_model()
+
+
+def batches(queryset, size):
+    '''Первичные ключи queryset пачками по size, без OFFSET.'''
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:size]
+        )
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет денормализованные счётчики UserStats, FeedStats и '
+        'Post.comment_count с реальными данными и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        size = options['batch_size']
+        fixed_users = sum(
+            self.reconcile_users(pks)
+            for pks in batches(User.objects.all(), size)
+        )
+        fixed_posts = sum(
+            self.reconcile_posts(pks)
+            for pks in batches(Post.objects.all(), size)
+        )
+        fixed_feeds = self.reconcile_feeds()
+        self.stdout.write(
+            f'Исправлено пользователей: {fixed_users}, '
+            f'постов: {fixed_posts}, лент: {fixed_feeds}'
+        )
+
+    @transaction.atomic
+    def reconcile_users(self, user_ids):
+        actual = {
+            field: counters.count_for_users(field, user_ids)
+            for field in counters.USER_COUNTERS
+        }
+        existing = UserStats.objects.in_bulk(user_ids)
+        fixed = 0
+        for user_id in user_ids:
+            values = {
+                field: totals.get(user_id, 0)
+                for field, totals in actual.items()
+            }
+            stats = existing.get(user_id)
+            if stats is None:
+                UserStats.objects.create(user_id=user_id, **values)
+            elif any(getattr(stats, f) != v for f, v in values.items()):
+                UserStats.objects.filter(user_id=user_id).update(**values)
+            else:
+                continue
+            fixed += 1
+        return fixed
+
+    @transaction.atomic
+    def reconcile_posts(self, post_ids):
+        actual = counters.comment_counts(post_ids)
+        fixed = 0
+        stored = Post.objects.filter(pk__in=post_ids).values_list(
+            'pk', 'comment_count'
+        )
+        for post_id, comment_count in stored:
+            if comment_count != actual.get(post_id, 0):
+                Post.objects.filter(pk=post_id).update(
+                    comment_count=actual.get(post_id, 0)
+                )
+                feed_ids.forget_objects(Post, post_id)
+                fixed += 1
+        return fixed
+
+    @transaction.atomic
+    def reconcile_feeds(self):
+        groups = (
+            Post.objects.exclude(group=None)
+            .values('group')
+            .annotate(total=Count('pk'))
+            .values_list('group', 'total')
+            .order_by()
+        )
+        actual = {f'group:{pk}': total for pk, total in groups}
+        actual['index'] = Post.objects.count()
+        stored = dict(FeedStats.objects.values_list('scope', 'posts_count'))
+        FeedStats.objects.exclude(scope__in=actual).delete()
+        fixed = 0
+        for scope, total in actual.items():
+            if stored.get(scope) != total:
+                FeedStats.objects.update_or_create(
+                    scope=scope, defaults={'posts_count': total}
+                )
+                fixed += 1
+        return fixed
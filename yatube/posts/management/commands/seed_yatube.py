@@ -0,0 +1,267 @@
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from posts import markup, transfer
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+WORDS = (
+    'город река погода новости музыка кино книга футбол школа работа '
+    'отпуск море горы кошка собака кофе завтрак ужин праздник друзья '
+    'программирование питон джанго база данных сервер поиск индекс '
+    'весна лето осень зима утро вечер ночь дорога поезд самолёт'
+).split()
+
+
+class Zipf:
+    '''Выбор из ``population`` с вероятностью, обратной ``rank ** s``.
+
+    Первые элементы популярнее остальных: немногие авторы пишут
+    большую часть постов и собирают большую часть подписчиков.
+    '''
+
+    def __init__(self, population, s, rng):
+        self.population = population
+        self.rng = rng
+        weights = (1 / rank ** s for rank in range(1, len(population) + 1))
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def __call__(self, k=1):
+        return self.rng.choices(
+            self.population, cum_weights=self.cum_weights, k=k
+        )
+
+    def stream(self, total):
+        while total > 0:
+            size = min(total, BATCH_SIZE)
+            yield from self(size)
+            total -= size
+
+    def distinct(self, k):
+        k = min(k, len(self.population))
+        if k > len(self.population) // 2:
+            # Выборка без повторов из хвоста распределения слишком долгая.
+            return set(self.rng.sample(self.population, k))
+        chosen = set()
+        while len(chosen) < k:
+            chosen.update(self(k - len(chosen)))
+        return chosen
+
+
+def batched(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими данными с реалистичным перекосом: '
+        'авторы постов, подписки и комментарии распределены по Ципфу. '
+        'Строки вставляются пачками через bulk_create, после чего '
+        'пересчитываются счётчики и ленты подписок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--comments-per-post', type=float, default=2)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней распределить даты постов',
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа; 0 — равномерно',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имён пользователей и slug групп',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь')
+        if User.objects.filter(
+            username__startswith=f'{options["prefix"]}_'
+        ).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {options["prefix"]} уже есть, '
+                'укажите другой --prefix'
+            )
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.zipf = options['zipf']
+        self.prefix = options['prefix']
+        started = time.perf_counter()
+        with transfer.keep_auto_now():
+            users = self.timed('users', self.create_users, options['users'])
+            groups = self.timed(
+                'groups', self.create_groups, options['groups']
+            )
+            posts = self.timed(
+                'posts',
+                self.create_posts,
+                users,
+                groups,
+                options['posts'],
+                options['days'],
+            )
+            self.timed(
+                'follows',
+                self.create_follows,
+                users,
+                options['follows_per_user'],
+            )
+            self.timed(
+                'comments',
+                self.create_comments,
+                users,
+                posts,
+                options['comments_per_post'],
+                options['days'],
+            )
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_timelines', stdout=self.stdout)
+        # bulk_create минует сигналы: закэшированные до генерации ленты
+        # и страницы иначе показывали бы прежние данные. Профили
+        # сгенерированных пользователей с новыми pk в кэше быть не могут,
+        # и прогревать тысячи их лент незачем.
+        transfer.invalidate_feeds([])
+        self.stdout.write(
+            f'Готово за {time.perf_counter() - started:.1f} с'
+        )
+
+    def timed(self, label, create, *args):
+        started = time.perf_counter()
+        result = create(*args)
+        seconds = time.perf_counter() - started
+        self.stdout.write(f'{label}: {seconds:.1f} с')
+        return result
+
+    def insert(self, model, objects):
+        for batch in batched(objects):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+
+    def ids(self, model, **filters):
+        return list(
+            model.objects.filter(**filters)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+    def create_users(self, count):
+        # Один хеш на всех: make_password на каждого занял бы минуты.
+        password = make_password(None)
+        joined = timezone.now()
+        self.insert(
+            User,
+            (
+                User(
+                    username=f'{self.prefix}_{number}',
+                    password=password,
+                    date_joined=joined,
+                )
+                for number in range(count)
+            ),
+        )
+        return self.ids(User, username__startswith=f'{self.prefix}_')
+
+    def create_groups(self, count):
+        self.insert(
+            Group,
+            (
+                Group(
+                    title=f'Группа {number}',
+                    slug=f'{self.prefix}-{number}',
+                    description='Синтетическая группа',
+                )
+                for number in range(count)
+            ),
+        )
+        return self.ids(Group, slug__startswith=f'{self.prefix}-')
+
+    def text(self):
+        return ' '.join(self.rng.choices(WORDS, k=self.rng.randint(5, 60)))
+
+    def create_posts(self, users, groups, count, days):
+        authors = Zipf(users, self.zipf, self.rng)
+        group_of = Zipf(groups, self.zipf, self.rng) if groups else None
+        first_pk = (
+            Post.objects.order_by('-pk').values_list('pk', flat=True).first()
+            or 0
+        )
+
+        def posts():
+            for number, author_id in enumerate(authors.stream(count)):
+                with_group = group_of and self.rng.random() < 0.7
+                text = self.text()
+                yield Post(
+                    text=text,
+                    text_html=markup.render(text),
+                    author_id=author_id,
+                    group_id=group_of()[0] if with_group else None,
+                    pub_date=self.published(number, count, days),
+                )
+
+        self.insert(Post, posts())
+        return self.ids(Post, pk__gt=first_pk)
+
+    def published(self, number, count, days):
+        # Даты растут вместе с pk, как у постов, написанных по очереди.
+        return self.now - timedelta(days=days) * (count - number) / count
+
+    def create_follows(self, users, per_user):
+        # Популярные авторы собирают подписчиков быстрее остальных.
+        authors = Zipf(users, self.zipf, self.rng)
+
+        def follows():
+            for user_id in users:
+                chosen = authors.distinct(per_user + 1)
+                chosen.discard(user_id)
+                for author_id in itertools.islice(chosen, per_user):
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        self.insert(Follow, follows())
+
+    def create_comments(self, users, posts, per_post, days):
+        # Больше всего комментариев у свежих постов популярных авторов.
+        count = len(posts)
+        commented = Zipf(range(count - 1, -1, -1), self.zipf, self.rng)
+        commenters = Zipf(users, self.zipf, self.rng)
+
+        def comments():
+            for number in commented.stream(round(count * per_post)):
+                published = self.published(number, count, days)
+                text = self.text()
+                yield Comment(
+                    text=text,
+                    text_html=markup.render(text),
+                    author_id=commenters()[0],
+                    post_id=posts[number],
+                    created=published + (self.now - published) * (
+                        self.rng.random() ** 4
+                    ),
+                )
+
+        if posts:
+            self.insert(Comment, comments())
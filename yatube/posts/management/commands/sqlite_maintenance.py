@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит журнал WAL в базу и выполняет PRAGMA optimize. '
+        'Запускайте по расписанию: при постоянных читателях '
+        'автоматический checkpoint не успевает, и журнал растёт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--checkpoint', default='TRUNCATE', choices=CHECKPOINT_MODES,
+            help='Режим wal_checkpoint; TRUNCATE обрезает журнал до нуля',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not hasattr(connection, 'maintain'):
+            raise CommandError(
+                f'{connection.alias}: нужен бэкенд yatube.backends.sqlite3'
+            )
+        busy, log, checkpointed = connection.maintain(options['checkpoint'])
+        if busy:
+            self.stderr.write(
+                'Checkpoint не завершён: базу держат другие соединения'
+            )
+        self.stdout.write(
+            f'{connection.alias}: страниц в журнале {log}, '
+            f'перенесено {checkpointed}'
+        )
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import feed_cache
+from yatube import db_router
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-базу в локальные реплики. Между '
+        'запусками реплики отстают от основной базы, что позволяет '
+        'проверить чтение с реплик и read-your-writes без настоящей '
+        'репликации. После копирования сдвигается поколение реплик, и '
+        'кэш, заполненный с отставших копий, больше не отдаётся.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Алиасы реплик; по умолчанию все из SQLITE_REPLICAS',
+        )
+
+    def handle(self, *args, **options):
+        for alias in options['aliases'] or settings.SQLITE_REPLICAS:
+            if alias not in settings.DATABASES:
+                raise CommandError(f'Нет базы {alias} в DATABASES')
+            try:
+                db_router.sync_replica(alias)
+            except ValueError as error:
+                raise CommandError(error)
+            self.stdout.write(f'{alias}: синхронизирована')
+        feed_cache.bump([feed_cache.REPLICA_SCOPE])
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from posts import search
+
+
+def create_search_index(apps, schema_editor):
+    search.install(schema_editor)
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(search.REBUILD_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    search.uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
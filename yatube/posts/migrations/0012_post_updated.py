@@ -0,0 +1,40 @@
+# Generated by Django 2.2.6 on 2026-10-18 05:12
+
+from django.db import migrations, models
+from django.db.models import F
+
+from posts import search
+
+
+def backfill_updated(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=F('pub_date'))
+
+
+def install_search_triggers(apps, schema_editor):
+    # SQLite пересоздаёт posts_post при добавлении и удалении столбца,
+    # и триггеры полнотекстового индекса пропадают вместе со старой
+    # таблицей.
+    search.install(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, install_search_triggers
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(backfill_updated, migrations.RunPython.noop),
+        migrations.RunPython(
+            install_search_triggers, migrations.RunPython.noop
+        ),
+    ]
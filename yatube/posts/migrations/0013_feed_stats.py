@@ -0,0 +1,41 @@
+# Generated by Django 2.2.6 on 2026-10-18 05:26
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_feed_stats(apps, schema_editor):
+    FeedStats = apps.get_model('posts', 'FeedStats')
+    Post = apps.get_model('posts', 'Post')
+    groups = (
+        Post.objects.exclude(group=None)
+        .values('group')
+        .annotate(total=Count('pk'))
+        .values_list('group', 'total')
+        .order_by()
+    )
+    FeedStats.objects.bulk_create(
+        [FeedStats(scope='index', posts_count=Post.objects.count())]
+        + [
+            FeedStats(scope=f'group:{pk}', posts_count=total)
+            for pk, total in groups
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedStats',
+            fields=[
+                ('scope', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Лента')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+            ],
+        ),
+        migrations.RunPython(backfill_feed_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.6 on 2026-10-18 05:38
+
+from django.db import migrations, models
+
+from posts import markup, search
+
+BATCH_SIZE = 1000
+
+
+def backfill_text_html(apps, schema_editor):
+    # Пачками по первичному ключу: ни одна пачка не держит в памяти
+    # больше BATCH_SIZE текстов, и запрос не зависит от OFFSET.
+    for name in ('Post', 'Comment'):
+        model = apps.get_model('posts', name)
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only('pk', 'text')[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            model.objects.bulk_update(markup.fill(batch), ['text_html'])
+            last_pk = batch[-1].pk
+
+
+def install_search_triggers(apps, schema_editor):
+    # SQLite пересоздаёт posts_post при добавлении столбца, и триггеры
+    # полнотекстового индекса пропадают вместе со старой таблицей.
+    search.install(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_feed_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, install_search_triggers
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(default='', editable=False, verbose_name='Комментарий в HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False, verbose_name='Содержание в HTML'),
+        ),
+        migrations.RunPython(backfill_text_html, migrations.RunPython.noop),
+        migrations.RunPython(
+            install_search_triggers, migrations.RunPython.noop
+        ),
+    ]
@@ -34,11 +34,22 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Содержание')
+    text_html = models.TextField(
+        verbose_name='Содержание в HTML', default='', editable=False
+    )
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации', auto_now_add=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения', auto_now=True
+    )
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
@@ -53,16 +64,50 @@ class Post(models.Model):
         null=True,
     )
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    comment_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев', default=0, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # Счётчик комментариев меняют только атомарные UPDATE сигналов
+        # (``counters.change_comment_count``). Правка поста записала бы
+        # значение, прочитанное вместе с постом, и потеряла бы
+        # комментарии, добавленные с тех пор.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comment_count'
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+        ]
 
 
 class Comment(models.Model):
     text = models.TextField(verbose_name='Комментарий')
+    text_html = models.TextField(
+        verbose_name='Комментарий в HTML', default='', editable=False
+    )
     created = models.DateTimeField(
         verbose_name='Дата публикации', auto_now_add=True
     )
@@ -83,6 +128,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx',
+            )
+        ]
 
 
 class Follow(models.Model):
@@ -105,3 +156,79 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_follow_users'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            )
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Читатель',
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            )
+        ]
+
+
+class PulledAuthor(models.Model):
+    author = models.OneToOneField(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='pulled',
+    )
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Записей', default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Подписок', default=0
+    )
+
+
+class FeedStats(models.Model):
+    '''Число постов в ленте: ``index`` или ``group:<id>``.
+
+    Ленты авторов считает ``UserStats.posts_count``.
+    '''
+
+    scope = models.CharField(
+        verbose_name='Лента', max_length=100, primary_key=True
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Записей', default=0
+    )
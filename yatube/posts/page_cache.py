@@ -0,0 +1,161 @@
+'''Кэш целых страниц для анонимных читателей.
+
+Представление помечает ответ суррогатными ключами через ``tag``:
+``post:<id>`` для каждого показанного поста, ``group:<id>`` и
+``user:<id>`` для групп и авторов, чьи данные есть на странице, и
+``feed:<лента>`` для самой ленты. ``PageCacheMiddleware`` сохраняет
+ответ вместе с поколениями его ключей, а сигналы при изменении постов,
+комментариев, групп и подписок увеличивают поколения только затронутых
+ключей (``purge``). Сохранённый ответ отдаётся, пока ни один из его
+ключей не менялся.
+
+Ключи страницы известны только после рендеринга, а запись, которая
+зафиксирована, пока страница рендерилась, успевает сдвинуть их
+поколения до того, как их прочтёт промежуточный слой. Поэтому любой
+``purge`` сдвигает ещё и общее поколение ``ANY_SCOPE``: слой запоминает
+его перед вызовом представления и не сохраняет ответ, если оно
+сдвинулось.
+
+Промежуточный слой стоит сразу за метриками, поэтому попадание
+обслуживается без сессий, CSRF и аутентификации, в том числе ответом
+304 по сохранённым ETag и Last-Modified. Анонимным считается запрос без
+cookie сессии и сообщений.
+'''
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from yatube import metrics
+
+from . import feed_cache
+
+
+def generation_scope(key):
+    # Поколения ключей живут рядом с поколениями лент, но в своём
+    # пространстве имён: ``page:group:1`` и лента ``group:1`` сбрасываются
+    # по разным событиям.
+    return f'page:{key}'
+
+
+ANY_SCOPE = generation_scope('*')
+
+
+def response_key(request):
+    url = request.build_absolute_uri()
+    return 'page:response:' + hashlib.md5(url.encode()).hexdigest()
+
+
+def feed_keys(author_id, *group_ids):
+    '''Ключи лент, в которых появляется или пропадает пост.'''
+    return [
+        f'feed:{scope}'
+        for scope in feed_cache.post_scopes(author_id, *group_ids)
+    ]
+
+
+def tag(response, *keys, posts=()):
+    '''Помечает ответ ключами ``keys`` и ключами постов ``posts``.
+
+    Посты разбираются, только когда ответ действительно кэшируется:
+    ленивая страница ленты не выбирается из БД ради авторизованного
+    читателя.
+    '''
+    response.surrogate_keys = [key for key in keys if key]
+    response.surrogate_posts = posts
+    return response
+
+
+def surrogate_keys(response):
+    keys = set(getattr(response, 'surrogate_keys', ()))
+    for post in getattr(response, 'surrogate_posts', ()):
+        keys.add(f'post:{post.pk}')
+        if post.group_id:
+            keys.add(f'group:{post.group_id}')
+    return keys
+
+
+def purge(*keys):
+    '''Сбрасывает страницы с этими ключами сейчас и после COMMIT.
+
+    Повтор после фиксации, как и у ``feed_cache.invalidate``, не даёт
+    закрепить в кэше страницу, отрисованную до COMMIT.
+    '''
+    scopes = [generation_scope(key) for key in keys if key]
+    scopes.append(ANY_SCOPE)
+    feed_cache.bump(scopes)
+    transaction.on_commit(lambda: feed_cache.bump(scopes))
+
+
+def is_anonymous(request):
+    return (
+        settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def is_storable(response):
+    # Ответ, который ставит cookie (например, CSRF), общий для всех
+    # читателей быть не может.
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+class PageCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            request.method != 'GET'
+            or not settings.PAGE_CACHE_TIMEOUT
+            or not is_anonymous(request)
+        ):
+            return self.get_response(request)
+
+        key = response_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            view, versions, response = entry
+            if feed_cache.generations(versions) == versions:
+                metrics.record_page_cache(view, 'hit')
+                response = get_conditional_response(
+                    request,
+                    etag=response.get('ETag'),
+                    last_modified=parse_http_date_safe(
+                        response.get('Last-Modified')
+                    ),
+                    response=response,
+                )
+                response['X-Cache'] = 'HIT'
+                return response
+
+        before = feed_cache.generations([ANY_SCOPE])
+        response = self.get_response(request)
+        keys = surrogate_keys(response)
+        if not keys or not is_storable(response):
+            return response
+
+        view = request.resolver_match.view_name
+        metrics.record_page_cache(view, 'miss')
+        versions = feed_cache.generations(
+            [*map(generation_scope, keys), ANY_SCOPE]
+        )
+        del response.surrogate_keys, response.surrogate_posts
+        response['X-Cache'] = 'MISS'
+        # Кроме ``ANY_SCOPE`` сравнивается и поколение реплик: страница,
+        # отрисованная во время синхронизации, тоже не сохраняется.
+        moved = any(versions[scope] != before[scope] for scope in before)
+        del versions[ANY_SCOPE]
+        if not moved:
+            cache.set(
+                key, (view, versions, response), settings.PAGE_CACHE_TIMEOUT
+            )
+        return response
@@ -0,0 +1,392 @@
+import base64
+import binascii
+import math
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject, cached_property
+from django.utils.dateparse import parse_datetime
+
+# Сколько соседних страниц показывать с каждой стороны от текущей.
+ON_EACH_SIDE = 2
+
+# Ссылка на страницу навигации; ``query`` — строка запроса без ``?``.
+PageLink = namedtuple('PageLink', 'number query current')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_token(*values):
+    raw = '|'.join(str(value) for value in values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(token)
+
+
+def encode_cursor(post):
+    return encode_token(post.pub_date.isoformat(), post.pk)
+
+
+def decode_cursor(token):
+    try:
+        pub_date, pk = decode_token(token)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except ValueError:
+        raise InvalidCursor(token)
+    if pub_date is None:
+        raise InvalidCursor(token)
+    return pub_date, pk
+
+
+class CursorPage:
+    '''Страница ленты, ограниченная курсорами первого и последнего поста.
+
+    Ведёт себя как ``django.core.paginator.Page`` в шаблонах: её можно
+    итерировать, индексировать и спрашивать о соседних страницах.
+
+    Номер страницы ``number`` курсор не знает: он приходит в ссылке
+    вместе с курсором и нужен только для окна навигации
+    (``page_links``). Вместе с числом страниц паджинатора он
+    приблизителен: пока читатель листает, лента может сдвинуться.
+    '''
+
+    def __init__(self, object_list, has_next, has_previous,
+                 encode=encode_cursor, number=None, paginator=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self._encode = encode
+        if not has_previous:
+            number = 1
+        elif number is not None:
+            # Перед страницей с предыдущей есть хотя бы первая.
+            number = max(number, 2)
+        self.number = number
+        self.paginator = paginator
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __repr__(self):
+        if not self.object_list:
+            return '<CursorPage empty>'
+        first, last = self.object_list[0], self.object_list[-1]
+        return f'<CursorPage {first.pk}..{last.pk}>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self._encode(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self._encode(self.object_list[0])
+
+    @property
+    def num_pages(self):
+        if self.paginator is None:
+            return None
+        return self.paginator.num_pages
+
+    def _query(self, number, **params):
+        if number is not None:
+            params['page'] = number
+        return urlencode(params)
+
+    @property
+    def next_query(self):
+        if not self._has_next:
+            return None
+        number = self.number + 1 if self.number else None
+        return self._query(number, after=self.next_cursor)
+
+    @property
+    def previous_query(self):
+        if not self._has_previous:
+            return None
+        number = self.number - 1 if self.number else None
+        return self._query(number, before=self.previous_cursor)
+
+    def _link(self, number, last):
+        if number == self.number:
+            return PageLink(number, '', True)
+        if number == 1:
+            return PageLink(number, '', False)
+        if number == last:
+            return PageLink(number, 'last=1', False)
+        if number < self.number:
+            skip = self.number - number - 1
+            params = {'before': self.previous_cursor}
+        else:
+            skip = number - self.number - 1
+            params = {'after': self.next_cursor}
+        if skip:
+            params['skip'] = skip
+        return PageLink(number, self._query(number, **params), False)
+
+    def page_links(self):
+        '''Окно навигации: первая, последняя и соседние с текущей страницы.
+
+        ``None`` в списке обозначает пропуск. Соседние страницы
+        открываются курсором текущей и небольшим ``skip``, последняя —
+        по ``last=1``, поэтому ни одна ссылка не требует глубокого
+        OFFSET. Без номера страницы или числа страниц окно пустое.
+        '''
+        if self.number is None or self.num_pages is None:
+            return []
+        if not self._has_next:
+            last = self.number
+        else:
+            last = max(self.num_pages, self.number + 1)
+        start = max(2, self.number - ON_EACH_SIDE)
+        end = min(last - 1, self.number + ON_EACH_SIDE)
+        links = [self._link(1, last)]
+        if start > 2:
+            links.append(None)
+        links.extend(
+            self._link(number, last) for number in range(start, end + 1)
+        )
+        if end < last - 1:
+            links.append(None)
+        if last > 1:
+            links.append(self._link(last, last))
+        return links
+
+
+class CursorPaginator:
+    '''Keyset-паджинатор по ``(дата, id)`` от новых записей к старым.
+
+    В отличие от ``Paginator`` не выполняет ``COUNT(*)`` и не использует
+    ``OFFSET``: каждая страница выбирается по индексу начиная с курсора,
+    поэтому глубокие страницы открываются так же быстро, как первая.
+    '''
+
+    def __init__(self, queryset, per_page, keys=('pub_date', 'id'),
+                 count=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        # Число записей для окна навигации: число или функция, которая
+        # вызывается только при отрисовке окна. Берётся из счётчиков,
+        # а не из COUNT(*); без него окно не показывается.
+        self._count = count
+        # Поля сортировки: дата и id. Лента подписок сортирует по
+        # аннотациям, совпадающим по значению с pub_date и id поста,
+        # комментарии — по created и id.
+        self.date_key, self.id_key = keys
+
+    @cached_property
+    def count(self):
+        if callable(self._count):
+            return self._count()
+        return self._count
+
+    @property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, math.ceil(self.count / self.per_page))
+
+    def _page(self, rows, has_next, has_previous, number=None):
+        # Число записей читается вместе со страницей, а не при отрисовке
+        # окна: так число запросов ленты не зависит от числа страниц.
+        self.count
+        return CursorPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            encode=self.encode,
+            number=number,
+            paginator=self,
+        )
+
+    def encode(self, obj):
+        return encode_token(
+            getattr(obj, self.date_key).isoformat(),
+            getattr(obj, self.id_key),
+        )
+
+    def ordered(self, queryset, descending=True):
+        prefix = '-' if descending else ''
+        return queryset.order_by(
+            prefix + self.date_key, prefix + self.id_key
+        )
+
+    def first_page(self):
+        rows = list(self.ordered(self.queryset)[: self.per_page + 1])
+        return self._page(
+            rows[: self.per_page],
+            has_next=len(rows) > self.per_page,
+            has_previous=False,
+        )
+
+    def page_after(self, token, skip=0, number=None):
+        pub_date, pk = decode_cursor(token)
+        older = Q(**{f'{self.date_key}__lt': pub_date}) | Q(
+            **{self.date_key: pub_date, f'{self.id_key}__lt': pk}
+        )
+        offset = skip * self.per_page
+        rows = list(
+            self.ordered(self.queryset.filter(older))[
+                offset: offset + self.per_page + 1
+            ]
+        )
+        return self._page(
+            rows[: self.per_page],
+            has_next=len(rows) > self.per_page,
+            has_previous=True,
+            number=number,
+        )
+
+    def page_before(self, token, skip=0, number=None):
+        pub_date, pk = decode_cursor(token)
+        newer = Q(**{f'{self.date_key}__gt': pub_date}) | Q(
+            **{self.date_key: pub_date, f'{self.id_key}__gt': pk}
+        )
+        offset = skip * self.per_page
+        rows = list(
+            self.ordered(self.queryset.filter(newer), descending=False)[
+                offset: offset + self.per_page + 1
+            ]
+        )
+        if not rows:
+            return self.first_page()
+        has_previous = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        rows.reverse()
+        return self._page(
+            rows, has_next=True, has_previous=has_previous, number=number
+        )
+
+    def last_page(self):
+        '''Самые старые записи: столько, сколько их на последней странице.'''
+        size = self.per_page
+        if self.count:
+            size = self.count - (self.num_pages - 1) * self.per_page
+        rows = list(
+            self.ordered(self.queryset, descending=False)[: size + 1]
+        )
+        has_previous = len(rows) > size
+        rows = rows[:size]
+        rows.reverse()
+        return self._page(
+            rows,
+            has_next=False,
+            has_previous=has_previous,
+            number=self.num_pages,
+        )
+
+    def page_number(self, number):
+        '''Совместимость со старыми ссылками вида ``?page=N``.'''
+        offset = (number - 1) * self.per_page
+        rows = list(
+            self.ordered(self.queryset)[offset: offset + self.per_page + 1]
+        )
+        if not rows and number > 1:
+            return self.first_page()
+        return self._page(
+            rows[: self.per_page],
+            has_next=len(rows) > self.per_page,
+            has_previous=number > 1,
+            number=number,
+        )
+
+    def get_page(self, after=None, before=None, page=None, skip=None,
+                 last=None):
+        '''Возвращает страницу по параметрам запроса.
+
+        Как и ``Paginator.get_page``, никогда не падает на некорректном
+        вводе: битый курсор или номер страницы дают первую страницу.
+        С курсором ``page`` — только номер для навигации, а ``skip``
+        пропускает не больше ``ON_EACH_SIDE - 1`` страниц от курсора.
+        '''
+        try:
+            number = int(page) if page else None
+            skip = int(skip) if skip else 0
+            if not 0 <= skip < ON_EACH_SIDE:
+                raise ValueError(skip)
+            if last:
+                return self.last_page()
+            if after:
+                return self.page_after(after, skip, number)
+            if before:
+                return self.page_before(before, skip, number)
+            if number and number > 1:
+                return self.page_number(number)
+        except (InvalidCursor, ValueError):
+            pass
+        return self.first_page()
+
+
+class CountedPaginator(Paginator):
+    '''``Paginator``, которому число записей передают, а не считают.
+
+    ``count`` — функция от queryset, например ``counters.estimate_posts``.
+    Подходит для админки: номера страниц и окно навигации у неё свои.
+    '''
+
+    def __init__(self, *args, count, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        return self._count(self.object_list)
+
+
+def paginate(request, queryset, per_page, paginator=CursorPaginator,
+             **kwargs):
+    return get_page(
+        request,
+        paginator(queryset, per_page, **kwargs),
+        skip=request.GET.get('skip'),
+        last=request.GET.get('last'),
+    )
+
+
+def get_page(request, paginator, **params):
+    return paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page=request.GET.get('page'),
+        **params,
+    )
+
+
+def paginate_lazily(request, queryset, per_page, **kwargs):
+    '''Страница, которая выбирается из БД только при первом обращении.
+
+    Нужна лентам с кэшем фрагментов: при попадании в кэш шаблон не
+    трогает страницу, и запрос к постам не выполняется вовсе.
+    '''
+    return SimpleLazyObject(
+        lambda: paginate(request, queryset, per_page, **kwargs)
+    )
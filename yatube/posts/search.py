@@ -0,0 +1,216 @@
+'''Полнотекстовый поиск по постам на SQLite FTS5.
+
+Виртуальная таблица ``posts_post_fts`` хранит только индекс по
+``posts_post.text`` (external content) и синхронизируется триггерами,
+поэтому её не обходят ни ``bulk_create``, ни ``QuerySet.update``.
+Миграции, пересоздающие таблицу ``posts_post``, удаляют триггеры, и
+должны заново выполнить ``TRIGGERS_SQL``.
+'''
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .paginator import CursorPage, InvalidCursor, decode_token, encode_token
+
+FTS_TABLE = 'posts_post_fts'
+
+CREATE_TABLE_SQL = f'''
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    text,
+    content='posts_post',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+'''
+
+TRIGGERS_SQL = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+OPTIMIZE_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+
+WORD_RE = re.compile(r'\w+')
+
+
+def install(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_TABLE_SQL)
+    for sql in TRIGGERS_SQL:
+        schema_editor.execute(sql)
+
+
+def uninstall(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+def rebuild():
+    with connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL)
+        cursor.execute(OPTIMIZE_SQL)
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    '''Превращает пользовательский ввод в безопасный запрос FTS5.
+
+    Каждое слово ищется по префиксу, все слова должны встретиться в
+    тексте. Операторы FTS5 из ввода не интерпретируются.
+    '''
+    words = WORD_RE.findall(query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def filter_posts(queryset, query):
+    '''Оставляет в queryset только посты, подходящие под запрос.'''
+    match = match_expression(query)
+    if not match:
+        return queryset.none()
+    if not is_available():
+        for word in WORD_RE.findall(query):
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+    return queryset.filter(
+        pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match],
+        )
+    )
+
+
+def encode_rank_cursor(post):
+    return encode_token(repr(post.search_rank), post.pk)
+
+
+def decode_rank_cursor(token):
+    try:
+        rank, pk = decode_token(token)
+        return float(rank), int(pk)
+    except ValueError:
+        raise InvalidCursor(token)
+
+
+class SearchPaginator:
+    '''Keyset-паджинатор результатов поиска по ``(bm25, id)``.
+
+    Интерфейс совпадает с ``CursorPaginator``, поэтому страница поиска
+    использует тот же шаблон навигации, что и ленты.
+    '''
+
+    RANK = f'bm25({FTS_TABLE})'
+
+    def __init__(self, query, per_page):
+        self.match = match_expression(query)
+        self.per_page = per_page
+
+    def _select(self, where='', params=(), descending=False, offset=0):
+        direction = 'DESC' if descending else 'ASC'
+        sql = (
+            f'SELECT rowid, {self.RANK} FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s {where} '
+            f'ORDER BY {self.RANK} {direction}, rowid {direction} '
+            f'LIMIT %s OFFSET %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, [self.match, *params, self.per_page + 1, offset]
+            )
+            return cursor.fetchall()
+
+    def _page(self, rows, has_next, has_previous):
+        posts = Post.objects.for_feed().in_bulk([pk for pk, _ in rows])
+        object_list = []
+        for pk, rank in rows:
+            if pk in posts:
+                post = posts[pk]
+                post.search_rank = rank
+                object_list.append(post)
+        return CursorPage(
+            object_list, has_next, has_previous, encode=encode_rank_cursor
+        )
+
+    def first_page(self, offset=0):
+        if not self.match:
+            return CursorPage([], False, False)
+        rows = self._select(offset=offset)
+        return self._page(
+            rows[: self.per_page],
+            has_next=len(rows) > self.per_page,
+            has_previous=offset > 0,
+        )
+
+    def page_after(self, token):
+        rank, pk = decode_rank_cursor(token)
+        rows = self._select(
+            f'AND ({self.RANK} > %s OR ({self.RANK} = %s AND rowid > %s))',
+            [rank, rank, pk],
+        )
+        return self._page(
+            rows[: self.per_page],
+            has_next=len(rows) > self.per_page,
+            has_previous=True,
+        )
+
+    def page_before(self, token):
+        rank, pk = decode_rank_cursor(token)
+        rows = self._select(
+            f'AND ({self.RANK} < %s OR ({self.RANK} = %s AND rowid < %s))',
+            [rank, rank, pk],
+            descending=True,
+        )
+        if not rows:
+            return self.first_page()
+        has_previous = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        rows.reverse()
+        return self._page(rows, has_next=True, has_previous=has_previous)
+
+    def get_page(self, after=None, before=None, page=None):
+        if not self.match:
+            return CursorPage([], False, False)
+        try:
+            if after:
+                return self.page_after(after)
+            if before:
+                return self.page_before(before)
+            if page and int(page) > 1:
+                return self.first_page(offset=(int(page) - 1) * self.per_page)
+        except ValueError:
+            pass
+        return self.first_page()
@@ -1,12 +1,46 @@
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
-from django.http import JsonResponse
 
 from .models import Post
-#  импортируйте в код всё необходимое
 
 
-class PostSerializer(ModelSerializer):
+class SparseFieldsMixin:
+    '''Оставляет только поля из ``?fields=a,b`` запроса.'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = request.query_params.get('fields') if request else None
+        if fields:
+            requested = set(fields.split(','))
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
+class PostSerializer(SparseFieldsMixin, ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True
+    )
+    group = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+
     class Meta:
         model = Post
-        fields = ('text', 'author', 'pub_date')
+        fields = (
+            'id',
+            'text',
+            'author',
+            'group',
+            'pub_date',
+            'image',
+            'comment_count',
+        )
+        read_only_fields = fields
+
+
+class FollowAuthorsSerializer(serializers.Serializer):
+    authors = serializers.ListField(
+        child=serializers.CharField(max_length=150),
+        allow_empty=False,
+        max_length=settings.FOLLOWS_BULK_LIMIT,
+    )
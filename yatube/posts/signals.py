@@ -0,0 +1,260 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import (
+    counters,
+    feed_cache,
+    feed_ids,
+    follows,
+    markup,
+    page_cache,
+    timeline,
+)
+from .models import Comment, FeedStats, Follow, Group, Post, User, UserStats
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def render_text_html(sender, instance, **kwargs):
+    instance.text_html = markup.render(instance.text)
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def count_feed_posts(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created:
+        counters.change_feeds(counters.feed_scopes(instance.group_id), 1)
+    elif previous_group_id != instance.group_id:
+        if previous_group_id:
+            counters.change_feeds([f'group:{previous_group_id}'], -1)
+        if instance.group_id:
+            counters.change_feeds([f'group:{instance.group_id}'], 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_feed_post(sender, instance, **kwargs):
+    counters.change_feeds(counters.feed_scopes(instance.group_id), -1)
+
+
+@receiver(post_delete, sender=Group)
+def forget_group_feed(sender, instance, **kwargs):
+    FeedStats.objects.filter(scope=f'group:{instance.pk}').delete()
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change(instance.author_id, 'followers_count', 1)
+        counters.change(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'followers_count', -1)
+    counters.change(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    timeline.unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # При редактировании пост может уйти из группы: её ленту тоже
+    # нужно сбросить.
+    instance._previous_group_id = None
+    if instance.pk:
+        instance._previous_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, created=False, **kwargs):
+    feed_cache.invalidate(
+        *feed_cache.post_scopes(
+            instance.author_id,
+            instance.group_id,
+            getattr(instance, '_previous_group_id', None),
+        )
+    )
+    # Новый пост сдвигает ленты подписчиков при раскладке.
+    if not created:
+        timeline.touch_followers(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def update_feed_ids(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created:
+        feed_ids.add(instance)
+    elif previous_group_id != instance.group_id:
+        feed_ids.move(instance, previous_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_feed_ids(sender, instance, **kwargs):
+    feed_ids.remove(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_cached_post(sender, instance, **kwargs):
+    feed_ids.forget_objects(Post, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def forget_commented_post(sender, instance, **kwargs):
+    # В посте в кэше объектов хранится число комментариев.
+    feed_ids.forget_objects(Post, instance.post_id)
+
+
+@receiver(post_save, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    feed_ids.forget_objects(User, instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_cached_group(sender, instance, **kwargs):
+    feed_ids.forget_objects(Group, instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def forget_group_posts(sender, instance, **kwargs):
+    # Посты удалённой группы теряют её UPDATE-ом без сигналов, а в кэше
+    # объектов остались бы со ссылкой на несуществующую группу.
+    feed_ids.forget_objects(
+        Post, *instance.posts.values_list('pk', flat=True)
+    )
+    feed_ids.forget(f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, created=False, **kwargs):
+    # Название и адрес группы показаны в карточках её постов в главной,
+    # в ленте группы и в профилях авторов. При удалении посты ещё
+    # связаны с группой только в pre_delete.
+    if created:
+        return
+    authors = list(
+        instance.posts.values_list('author_id', flat=True)
+        .distinct()
+        .order_by()
+    )
+    feed_cache.invalidate(
+        'index',
+        f'group:{instance.pk}',
+        *(f'profile:{author_id}' for author_id in authors),
+    )
+    timeline.touch_followers(*authors)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_feeds(sender, instance, **kwargs):
+    post = (
+        Post.objects.filter(pk=instance.post_id)
+        .values_list('author_id', 'group_id')
+        .first()
+    )
+    if post is not None:
+        feed_cache.invalidate(*feed_cache.post_scopes(*post))
+        timeline.touch_followers(post[0])
+
+
+@receiver(post_save, sender=Post)
+def purge_saved_post_pages(sender, instance, created, **kwargs):
+    keys = [f'post:{instance.pk}']
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created or previous_group_id != instance.group_id:
+        keys += page_cache.feed_keys(
+            instance.author_id, instance.group_id, previous_group_id
+        )
+        keys.append(f'user:{instance.author_id}')
+    page_cache.purge(*keys)
+
+
+@receiver(post_delete, sender=Post)
+def purge_deleted_post_pages(sender, instance, **kwargs):
+    page_cache.purge(
+        f'post:{instance.pk}',
+        f'user:{instance.author_id}',
+        *page_cache.feed_keys(instance.author_id, instance.group_id),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    page_cache.purge(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def purge_group_pages(sender, instance, **kwargs):
+    page_cache.purge(f'group:{instance.pk}', f'feed:group:{instance.pk}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def purge_follow_pages(sender, instance, **kwargs):
+    # Анонимный читатель видит только счётчики подписок в профилях.
+    page_cache.purge(f'user:{instance.author_id}', f'user:{instance.user_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follows(sender, instance, **kwargs):
+    follows.invalidate(instance.user_id)
@@ -0,0 +1,16 @@
+from django import template
+
+from .. import cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    return cards.render_cards(posts)
+
+
+@register.simple_tag
+def post_card(post):
+    [(_, card)] = cards.render_cards([post])
+    return card
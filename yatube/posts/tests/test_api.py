@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import api_views
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Описание группы',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=cls.author, group=cls.group)
+            for number in range(15)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.latest('pk')
+        self.urls = (
+            reverse('api_index'),
+            reverse('api_group', args=[self.group.slug]),
+            reverse('api_author', args=[self.author.username]),
+        )
+
+    def test_feeds_are_paginated_by_cursor(self):
+        """Ленты API листаются курсором без повторов"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                seen = []
+                while url:
+                    data = self.client.get(url).json()
+                    seen.extend(post['id'] for post in data['results'])
+                    url = data['next']
+                self.assertEqual(len(seen), 15)
+                self.assertEqual(len(set(seen)), 15)
+
+    def test_feed_page_query_count(self):
+        """Страница ленты не делает запросов на каждый пост"""
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api_index'))
+
+    def test_follow_feed(self):
+        """Лента подписок доступна только авторизованным"""
+        url = reverse('api_follow')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.reader)
+        data = self.client.get(url).json()
+        self.assertEqual(data['results'][0]['id'], self.post.id)
+
+    def test_sparse_fieldsets(self):
+        """Параметр fields оставляет в ответе только нужные поля"""
+        data = self.client.get(reverse('api_index'), {'fields': 'id,text'})
+        self.assertEqual(set(data.json()['results'][0]), {'id', 'text'})
+        post = self.client.get(
+            reverse('api_post', args=[self.post.id]), {'fields': 'author'}
+        )
+        self.assertEqual(post.json(), {'author': self.author.username})
+
+    def test_unchanged_feed_returns_304(self):
+        """Повторный запрос с If-None-Match получает 304"""
+        for url in self.urls + (reverse('api_post', args=[self.post.id]),):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_content(self):
+        """Комментарий к посту меняет ETag всех его лент"""
+        self.client.force_login(self.reader)
+        urls = self.urls + (
+            reverse('api_follow'),
+            reverse('api_post', args=[self.post.id]),
+        )
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=self.post
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_page(self):
+        """Разные страницы и наборы полей имеют разные ETag"""
+        url = reverse('api_index')
+        first = self.client.get(url)
+        second = self.client.get(first.json()['next'])
+        sparse = self.client.get(url, {'fields': 'id'})
+        self.assertEqual(
+            len({first['ETag'], second['ETag'], sparse['ETag']}), 3
+        )
+
+    def test_etag_view_must_define_scopes(self):
+        """Представление с ETag без get_etag_scopes не создаётся"""
+        class NoScopesView(api_views.PostListView):
+            pass
+
+        with self.assertRaises(TypeError):
+            NoScopesView()
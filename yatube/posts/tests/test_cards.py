@@ -0,0 +1,118 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+CARD_TEMPLATE = 'posts/post_card.html'
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Тестовый пост', author=self.author, group=self.group
+        )
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.index = reverse('index')
+        self.profile = reverse('profile', args=[self.author.username])
+
+    def test_cards_are_shared_between_feeds_and_viewers(self):
+        """Карточка рендерится один раз для всех лент и читателей"""
+        response = self.author_client.get(self.index)
+        self.assertTemplateUsed(response, CARD_TEMPLATE)
+        post_page = reverse('post', args=['Author', self.post.pk])
+        for client, url in (
+            (self.reader_client, self.index),
+            (self.author_client, self.profile),
+            (self.reader_client, post_page),
+        ):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTemplateNotUsed(response, CARD_TEMPLATE)
+
+    def test_edit_button_is_rendered_per_viewer(self):
+        """Кнопку редактирования видит только автор, хоть карточка общая"""
+        edit_url = reverse('post_edit', args=['Author', self.post.pk])
+        self.assertContains(self.author_client.get(self.index), edit_url)
+        self.assertNotContains(self.reader_client.get(self.index), edit_url)
+        self.assertContains(self.author_client.get(self.profile), edit_url)
+
+    def test_new_version_is_rendered(self):
+        """Правка, комментарий и переименование группы обновляют карточку"""
+        self.reader_client.get(self.index)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        response = self.reader_client.get(self.profile)
+        self.assertContains(response, 'Новый текст')
+
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        response = self.author_client.get(self.profile)
+        self.assertContains(response, 'Комментариев: 1')
+
+        Group.objects.filter(pk=self.group.pk).update(title='Новая группа')
+        response = self.author_client.get(
+            reverse('post', args=['Author', self.post.pk])
+        )
+        self.assertContains(response, 'Группа #Новая группа')
+
+    def test_group_slug_change_updates_link(self):
+        """Новый адрес группы меняет ссылку в закэшированной карточке"""
+        post_page = reverse('post', args=['Author', self.post.pk])
+        self.reader_client.get(post_page)
+        Group.objects.filter(pk=self.group.pk).update(slug='new-slug')
+        response = self.reader_client.get(post_page)
+        self.assertContains(response, '/group/new-slug/')
+        self.assertNotContains(response, '/group/test-group/')
+
+    def test_updated_moves_on_save(self):
+        """Post.updated меняется при каждом сохранении"""
+        updated = self.post.updated
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated, updated)
+
+    def test_page_of_cards_is_fetched_at_once(self):
+        """Карточки страницы берутся из кэша одним get_many"""
+        Post.objects.create(text='Второй пост', author=self.author)
+        self.reader_client.get(self.index)
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many:
+            self.author_client.get(self.profile)
+        card_calls = [
+            call for call in get_many.call_args_list
+            if all(key.startswith('post:card:') for key in call.args[0])
+        ]
+        self.assertEqual(len(card_calls), 1)
+        self.assertEqual(len(card_calls[0].args[0]), 2)
+
+    def test_card_without_thumbnail_is_not_cached(self):
+        """Карточку без готовой миниатюры рендерят заново"""
+        with mock.patch('posts.thumbnails.is_ready', return_value=False):
+            self.reader_client.get(self.index)
+        response = self.author_client.get(self.index)
+        self.assertTemplateUsed(response, CARD_TEMPLATE)
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=20)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.post = Post.objects.create(text='Вирусный пост', author=cls.author)
+        for number in range(45):
+            commenter = User.objects.create_user(username=f'commenter{number}')
+            Comment.objects.create(
+                text=f'Комментарий {number}', author=commenter, post=cls.post
+            )
+        cls.url = reverse('post', args=[cls.author.username, cls.post.id])
+        cls.fragment_url = reverse(
+            'post_comments', args=[cls.author.username, cls.post.id]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def texts(self, page):
+        return [comment.text for comment in page]
+
+    def test_first_page_is_bounded(self):
+        """На странице поста только первая страница новых комментариев"""
+        response = self.client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(
+            self.texts(comments),
+            [f'Комментарий {number}' for number in range(44, 24, -1)],
+        )
+        self.assertContains(response, comments.next_cursor)
+        self.assertContains(response, self.fragment_url)
+
+    def test_fragment_loads_following_pages(self):
+        """Фрагмент отдаёт следующие страницы без дублей и пропусков"""
+        cursor = self.client.get(self.url).context['comments'].next_cursor
+        seen = []
+        while cursor:
+            response = self.client.get(self.fragment_url, {'after': cursor})
+            self.assertTemplateUsed(response, 'posts/comment_list.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            page = response.context['comments']
+            seen.extend(self.texts(page))
+            cursor = page.next_cursor
+        self.assertEqual(
+            seen, [f'Комментарий {number}' for number in range(24, -1, -1)]
+        )
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_queries_do_not_grow_with_comments(self):
+        """Комментарии авторов выбираются одним запросом"""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.fragment_url)
+        comment_queries = [
+            query for query in context.captured_queries
+            if 'posts_comment' in query['sql']
+        ]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertIn('auth_user', comment_queries[0]['sql'])
+
+    def test_missing_post_returns_404(self):
+        """Фрагмент комментариев несуществующего поста — 404"""
+        response = self.client.get(
+            reverse('post_comments', args=[self.author.username, 999])
+        )
+        self.assertEqual(response.status_code, 404)
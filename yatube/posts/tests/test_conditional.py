@@ -0,0 +1,230 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import feed_cache, follows
+from ..models import Comment, Follow, Group, Post, PulledAuthor
+from ..page_cache import generation_scope
+
+User = get_user_model()
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Тестовый пост', author=self.author, group=self.group
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.post_page = reverse('post', args=['Author', self.post.pk])
+        self.urls = (
+            reverse('index'),
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.author.username]),
+            self.post_page,
+        )
+        self.reader_client = self.client_class()
+        self.reader_client.force_login(self.reader)
+
+    @staticmethod
+    def later(seconds=1):
+        """Часы feed_cache, ушедшие вперёд на ``seconds`` секунд
+
+        Поколения, которых ещё нет в кэше, создаются с текущим временем,
+        поэтому до сдвига часов страницу нужно запросить.
+        """
+        now = time.time_ns
+        return mock.patch(
+            'posts.feed_cache.time.time_ns',
+            side_effect=lambda: now() + seconds * 1_000_000_000,
+        )
+
+    def revalidate(self, url, client=None, etag=None):
+        client = client or self.client
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return client.get(
+            url, HTTP_IF_NONE_MATCH=etag or response['ETag']
+        )
+
+    def test_matching_etag_returns_not_modified(self):
+        """Совпавший If-None-Match даёт 304 без выборки постов"""
+        for url in self.urls:
+            self.client.get(url)
+            with self.subTest(url=url), self.later():
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                # Не больше одного запроса: строка группы, автора или
+                # поста по индексу.
+                with self.assertNumQueries(int(url != self.urls[0])):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.content)
+
+    def test_if_modified_since_returns_not_modified(self):
+        """If-Modified-Since не раньше Last-Modified даёт 304"""
+        for url in self.urls:
+            self.client.get(url)
+            with self.subTest(url=url), self.later():
+                response = self.client.get(url)
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_change_in_same_second_is_not_hidden(self):
+        """Изменение в секунду прошлой выборки не даёт 304 по дате"""
+        url = reverse('index')
+        self.client.get(url)
+        with self.later():
+            last_modified = self.client.get(url)['Last-Modified']
+            Post.objects.create(text='Новый пост', author=self.author)
+            response = self.client.get(url)
+            self.assertFalse(response.has_header('Last-Modified'))
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+            self.assertContains(response, 'Новый пост')
+
+    def test_follow_index_supports_etag(self):
+        """Лента подписок отвечает 304 и сбрасывается при подписке"""
+        url = reverse('follow_index')
+        response = self.revalidate(url, client=self.reader_client)
+        self.assertEqual(response.status_code, 304)
+        etag = response['ETag']
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=self.reader, author=other)
+        response = self.revalidate(url, self.reader_client, etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_index_reads_scopes_once(self):
+        """Лента подписок читает одно поколение при любом числе подписок"""
+        for number in range(3):
+            author = User.objects.create_user(username=f'Author{number}')
+            Follow.objects.create(user=self.reader, author=author)
+        with mock.patch(
+            'posts.conditional.feed_cache.generations',
+            wraps=feed_cache.generations,
+        ) as generations, mock.patch(
+            'posts.follows.authors', wraps=follows.authors
+        ) as authors:
+            self.reader_client.get(reverse('follow_index'))
+        generations.assert_called_once_with([
+            generation_scope(f'user:{self.reader.pk}'),
+            f'timeline:{self.reader.pk}',
+        ])
+        authors.assert_not_called()
+
+    def test_followed_author_post_changes_follow_etag(self):
+        """Новый пост автора из подписок меняет ETag ленты подписок"""
+        url = reverse('follow_index')
+        etag = self.reader_client.get(url)['ETag']
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новый пост')
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_pulled_author_post_changes_follow_etag(self):
+        """Пост автора без раскладки тоже меняет ETag ленты подписок"""
+        PulledAuthor.objects.create(author=self.author)
+        url = reverse('follow_index')
+        etag = self.reader_client.get(url)['ETag']
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новый пост')
+
+    def test_followed_author_edit_changes_follow_etag(self):
+        """Правка поста и комментарий меняют ETag ленты подписок"""
+        url = reverse('follow_index')
+        etag = self.reader_client.get(url)['ETag']
+        self.post.text = 'Изменённый текст'
+        self.post.save()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Изменённый текст')
+        etag = response['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_unfollow_changes_follow_etag(self):
+        """Отписка меняет ETag ленты подписок"""
+        url = reverse('follow_index')
+        etag = self.reader_client.get(url)['ETag']
+        follows.unfollow(self.reader.pk, self.author.pk)
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotContains(response, 'Тестовый пост')
+
+    def test_changes_invalidate_validators(self):
+        """Правка поста и новый комментарий меняют ETag"""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Изменённый текст'
+        self.post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertContains(response, 'Изменённый текст')
+        etag = self.client.get(self.post_page)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        response = self.client.get(self.post_page, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Комментарий')
+
+    def test_etag_depends_on_viewer(self):
+        """У разных читателей разные ETag одной страницы"""
+        anonymous = self.client.get(self.post_page)['ETag']
+        response = self.reader_client.get(
+            self.post_page, HTTP_IF_NONE_MATCH=anonymous
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_objects_still_return_404(self):
+        """Для несуществующих объектов по-прежнему 404"""
+        urls = (
+            reverse('group_posts', args=['missing']),
+            reverse('profile', args=['missing']),
+            reverse('post', args=['Author', 10 ** 6]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class PageCacheConditionalTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_cache_hit_answers_not_modified(self):
+        """Попадание в кэш страниц тоже отвечает 304 по ETag"""
+        url = reverse('index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Cache'], 'HIT')
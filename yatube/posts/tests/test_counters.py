@@ -0,0 +1,111 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import counters
+from ..models import Comment, FeedStats, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении записей"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.authorized_client.get(
+            reverse('profile_follow', args=[self.author.username])
+        )
+        self.authorized_client.post(
+            reverse('add_comment', args=[self.author.username, post.id]),
+            {'text': 'Комментарий'},
+        )
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(counters.feed_count('index'), 1)
+
+        Comment.objects.all().delete()
+        Follow.objects.all().delete()
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_post_edit_keeps_new_comments(self):
+        """Правка поста не затирает комментарии, добавленные после загрузки"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        loaded = Post.objects.get(pk=post.pk)
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=post
+        )
+        loaded.text = 'Исправленный пост'
+        loaded.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Исправленный пост')
+        self.assertEqual(post.comment_count, 1)
+
+    def test_feed_counters_follow_posts(self):
+        """Счётчики лент меняются при создании, переносе и удалении поста"""
+        first = Group.objects.create(title='Первая', slug='first')
+        second = Group.objects.create(title='Вторая', slug='second')
+        post = Post.objects.create(text='Пост', author=self.author)
+        Post.objects.create(text='Пост', author=self.author, group=first)
+        post.group = first
+        post.save()
+        self.assertEqual(counters.feed_count('index'), 2)
+        self.assertEqual(counters.feed_count(f'group:{first.pk}'), 2)
+
+        post.group = second
+        post.save()
+        self.assertEqual(counters.feed_count(f'group:{first.pk}'), 1)
+        self.assertEqual(counters.feed_count(f'group:{second.pk}'), 1)
+        post.delete()
+        self.assertEqual(counters.feed_count('index'), 1)
+        self.assertEqual(counters.feed_count(f'group:{second.pk}'), 0)
+        second.delete()
+        self.assertFalse(FeedStats.objects.filter(scope=f'group:{second.pk}'))
+
+    def test_profile_reads_counters(self):
+        """Профиль показывает значения из UserStats"""
+        Post.objects.create(text='Пост', author=self.author)
+        response = self.client.get(
+            reverse('profile', args=[self.author.username])
+        )
+        self.assertEqual(response.context['stats'].posts_count, 1)
+
+    def test_reconcile_fixes_drift(self):
+        """Команда reconcile_counters исправляет расхождения"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=post
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.update(posts_count=7, followers_count=0)
+        Post.objects.update(comment_count=0)
+        FeedStats.objects.update(posts_count=7)
+
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(counters.feed_count('index'), 1)
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import feed_cache
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Описание группы',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-group',
+            description='Описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Исходный текст', author=self.user, group=self.group
+        )
+        self.urls = (
+            reverse('index'),
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.user.username]),
+        )
+
+    def test_feeds_are_served_from_cache(self):
+        """Ленты отдаются из кэша, пока данные не менялись"""
+        for url in self.urls:
+            self.client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Исходный текст')
+
+    def test_post_save_invalidates_feeds(self):
+        """Сохранение поста сразу сбрасывает кэш лент"""
+        for url in self.urls:
+            self.client.get(url)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Новый текст')
+
+    def test_comment_invalidates_feeds(self):
+        """Новый комментарий обновляет счётчик в закэшированных лентах"""
+        for url in self.urls:
+            self.client.get(url)
+        Comment.objects.create(
+            text='Комментарий', author=self.user, post=self.post
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Комментариев: 1')
+
+    def test_moving_post_invalidates_previous_group(self):
+        """Перенос поста в другую группу сбрасывает ленту старой группы"""
+        url = reverse('group_posts', args=[self.group.slug])
+        self.client.get(url)
+        self.post.group = self.other_group
+        self.post.save()
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Исходный текст')
+
+    def test_group_rename_invalidates_feeds(self):
+        """Новые название и адрес группы видны во всех лентах сразу"""
+        for url in self.urls:
+            self.client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Переименованная группа'
+        group.slug = 'renamed-group'
+        group.save()
+        urls = (
+            reverse('index'),
+            reverse('group_posts', args=['renamed-group']),
+            reverse('profile', args=[self.user.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Группа #Переименованная')
+                self.assertContains(response, '/group/renamed-group/')
+                self.assertNotContains(response, '/group/test-group/')
+
+    def test_group_delete_invalidates_feeds(self):
+        """Удалённая группа пропадает из закэшированных лент"""
+        urls = (reverse('index'), reverse('profile', args=['TestUser']))
+        for url in urls:
+            self.client.get(url)
+        Group.objects.get(pk=self.group.pk).delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotContains(response, 'Тестовая группа')
+
+    def test_warm_renders_first_page(self):
+        """Прогрев кладёт в кэш первую страницу ленты для гостя"""
+        feed_cache.warm('index')
+        key = make_template_fragment_key(
+            feed_cache.FRAGMENT_NAME, [feed_cache.vary_on('index')]
+        )
+        self.assertIn('Исходный текст', cache.get(key))
+
+    def test_cold_generations_cost_one_read_and_one_write(self):
+        """Недостающие поколения создаются одним set_many"""
+        scopes = [f'profile:{pk}' for pk in range(100)]
+        calls = {
+            name: mock.Mock(wraps=getattr(cache, name))
+            for name in ('get', 'get_many', 'add', 'set', 'set_many')
+        }
+        with mock.patch.multiple(cache, **calls):
+            first = feed_cache.generations(scopes)
+            second = feed_cache.generations(scopes)
+        self.assertEqual(first, second)
+        self.assertEqual(calls['get_many'].call_count, 2)
+        self.assertEqual(calls['set_many'].call_count, 1)
+        for name in ('get', 'add', 'set'):
+            self.assertFalse(calls[name].called, name)
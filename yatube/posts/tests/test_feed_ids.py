@@ -0,0 +1,179 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feed_ids
+from ..feed_cache import scope_queryset
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def entry_ids(scope):
+    entries, _ = cache.get(feed_ids.list_key(scope))
+    return [pk for _, pk, _, _ in entries]
+
+
+class FeedIdsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(title='Первая', slug='first')
+        cls.other = Group.objects.create(title='Вторая', slug='second')
+        Post.objects.bulk_create(
+            Post(text=f'Пост №{i}', author=cls.author, group=cls.group)
+            for i in range(12)
+        )
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self, scope='index', per_page=5, count=None):
+        return feed_ids.FeedPaginator(
+            scope_queryset(scope),
+            per_page,
+            feed_ids.list_key(scope),
+            count=count,
+        )
+
+    def test_cached_page_needs_no_queries(self):
+        """Повторная страница собирается из кэша без запросов к БД"""
+        first = self.paginator().first_page()
+        with self.assertNumQueries(0):
+            again = self.paginator().first_page()
+            self.assertEqual(again.object_list, self.ordered[:5])
+            self.assertEqual(again[0].author.username, 'Author')
+            self.assertEqual(again[0].group.slug, 'first')
+        self.assertEqual(first.object_list, again.object_list)
+
+    def test_misses_are_loaded_with_one_query_per_model(self):
+        """Промахи кэша объектов — один in_bulk на пост, автора, группу"""
+        self.paginator().first_page()
+        cache.delete_many(
+            [feed_ids.object_key(Post, post.pk) for post in self.ordered]
+            + [feed_ids.object_key(User, self.author.pk)]
+        )
+        with self.assertNumQueries(2):
+            page = self.paginator().first_page()
+        self.assertEqual(page.object_list, self.ordered[:5])
+
+    def test_lists_follow_post_create_move_and_delete(self):
+        """Списки правятся на месте при создании, переносе и удалении"""
+        scopes = ('index', f'group:{self.group.pk}', f'group:{self.other.pk}')
+        for scope in scopes:
+            self.paginator(scope).first_page()
+        post = Post.objects.create(
+            text='Новый', author=self.author, group=self.group
+        )
+        self.assertEqual(entry_ids('index')[0], post.pk)
+        self.assertEqual(entry_ids(f'group:{self.group.pk}')[0], post.pk)
+
+        post.group = self.other
+        post.save()
+        self.assertNotIn(post.pk, entry_ids(f'group:{self.group.pk}'))
+        self.assertEqual(entry_ids(f'group:{self.other.pk}'), [post.pk])
+        self.assertEqual(entry_ids('index').count(post.pk), 1)
+
+        post.delete()
+        for scope in scopes:
+            with self.subTest(scope=scope):
+                self.assertNotIn(post.pk, entry_ids(scope))
+
+    def test_list_read_before_update_is_not_served(self):
+        """Список, выбранный до нового поста и записанный после, скрыт"""
+        reader = self.paginator()
+        created = []
+        add = cache.add
+
+        def add_after_post(key, *args, **kwargs):
+            # Запрос читателя уже выполнен, пост появляется до записи
+            # его списка в кэш.
+            if key == reader.ids_key and not created:
+                created.append(Post.objects.create(
+                    text='Новый', author=self.author, group=self.group
+                ))
+            return add(key, *args, **kwargs)
+
+        with mock.patch.object(cache, 'add', add_after_post):
+            reader.first_page()
+        self.assertTrue(created)
+        self.assertEqual(self.paginator().first_page()[0], created[0])
+
+    def test_changes_invalidate_cached_objects(self):
+        """Правка поста, комментарий и переименование группы видны сразу"""
+        self.paginator().first_page()
+        post = self.ordered[0]
+        post = Post.objects.get(pk=post.pk)
+        post.text = 'Исправленный'
+        post.save()
+        Comment.objects.create(text='Ответ', author=self.reader, post=post)
+        self.group.title = 'Переименованная'
+        self.group.save()
+        first = self.paginator().first_page()[0]
+        self.assertEqual(first.text, 'Исправленный')
+        self.assertEqual(first.comment_count, 1)
+        self.assertEqual(first.group.title, 'Переименованная')
+
+    def test_deleted_group_leaves_posts_without_group(self):
+        """Посты удалённой группы в кэше теряют группу"""
+        self.paginator().first_page()
+        group = Group.objects.create(title='Временная', slug='temporary')
+        post = Post.objects.create(
+            text='В группе', author=self.author, group=group
+        )
+        self.paginator().first_page()
+        group.delete()
+        first = self.paginator().first_page()[0]
+        self.assertEqual(first.pk, post.pk)
+        self.assertIsNone(first.group)
+
+    @override_settings(FEED_IDS_LENGTH=4)
+    def test_pages_beyond_list_read_the_database(self):
+        """За концом обрезанного списка страницы читаются из БД"""
+        paginator = self.paginator(per_page=3)
+        page = paginator.first_page()
+        seen = list(page)
+        while page.has_next():
+            page = self.paginator(per_page=3).page_after(page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, self.ordered)
+        back = self.paginator(per_page=3).page_before(page.previous_cursor)
+        self.assertEqual(back.object_list, self.ordered[6:9])
+        self.assertEqual(
+            self.paginator(per_page=3).last_page().object_list,
+            self.ordered[9:],
+        )
+        self.assertEqual(
+            self.paginator(per_page=3).page_number(2).object_list,
+            self.ordered[3:6],
+        )
+
+    def test_complete_list_serves_every_page(self):
+        """Полный список отдаёт и последнюю, и предыдущие страницы"""
+        self.paginator().first_page()
+        # Запрос только за постами последней страницы, которых нет в
+        # кэше объектов; список не перечитывается.
+        with self.assertNumQueries(1):
+            last = self.paginator(count=12).last_page()
+        with self.assertNumQueries(0):
+            back = self.paginator().page_before(last.previous_cursor, skip=1)
+        self.assertEqual(last.object_list, self.ordered[10:])
+        self.assertEqual(back.object_list, self.ordered[:5])
+        self.assertFalse(back.has_previous())
+
+    def test_follow_feed_list_tracks_authors(self):
+        """Список ленты подписок строится заново после поста автора"""
+        client = Client()
+        client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = client.get(reverse('follow_index'))
+        self.assertEqual(len(response.context['page']), 10)
+        post = Post.objects.create(text='Свежий', author=self.author)
+        response = client.get(reverse('follow_index'))
+        self.assertEqual(response.context['page'][0], post)
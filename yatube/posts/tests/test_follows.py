@@ -0,0 +1,208 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters, follows
+from ..models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class FollowsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(text='Пост автора', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def stats(self, user):
+        return counters.stats_for(User.objects.get(pk=user.pk))
+
+    def follow_queries(self, operation):
+        with CaptureQueriesContext(connection) as context:
+            operation()
+        table = Follow._meta.db_table
+        return [
+            query['sql'] for query in context.captured_queries
+            if table in query['sql']
+        ]
+
+    def test_following_set_is_cached(self):
+        """Проверка подписки после первой загрузки не ходит в базу"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(follows.is_following(self.reader, self.author.pk))
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                follows.is_following(self.reader, self.author.pk)
+            )
+            self.assertFalse(
+                follows.is_following(self.reader, self.reader.pk)
+            )
+            self.assertFalse(
+                follows.is_following(AnonymousUser(), self.author.pk)
+            )
+
+    def test_orm_changes_invalidate_set(self):
+        """Подписка и отписка через ORM сбрасывают множество"""
+        self.assertFalse(follows.is_following(self.reader, self.author.pk))
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(follows.is_following(self.reader, self.author.pk))
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertFalse(follows.is_following(self.reader, self.author.pk))
+
+    def test_follow_is_idempotent_single_statement(self):
+        """Повторная подписка — один INSERT без ошибки и без пересчёта"""
+        self.assertTrue(follows.follow(self.reader.pk, self.author.pk))
+        queries = self.follow_queries(
+            lambda: self.assertFalse(
+                follows.follow(self.reader.pk, self.author.pk)
+            )
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith('INSERT OR IGNORE'))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=self.post
+            ).exists()
+        )
+        self.assertFalse(follows.follow(self.reader.pk, self.reader.pk))
+
+    def test_unfollow_is_idempotent_single_statement(self):
+        """Повторная отписка — один DELETE и счётчики не уходят в минус"""
+        follows.follow(self.reader.pk, self.author.pk)
+        self.assertTrue(follows.unfollow(self.reader.pk, self.author.pk))
+        queries = self.follow_queries(
+            lambda: self.assertFalse(
+                follows.unfollow(self.reader.pk, self.author.pk)
+            )
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith('DELETE'))
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+
+    def test_profile_uses_cached_set(self):
+        """Профиль берёт состояние подписки из множества в кэше"""
+        profile = reverse('profile', args=['Author'])
+        self.client.get(reverse('profile_follow', args=['Author']))
+        self.client.get(reverse('profile_follow', args=['Author']))
+        self.assertEqual(Follow.objects.count(), 1)
+        follows.authors(self.reader.pk)
+        queries = self.follow_queries(lambda: self.client.get(profile))
+        self.assertEqual(queries, [])
+        self.assertContains(
+            self.client.get(profile),
+            reverse('profile_unfollow', args=['Author']),
+        )
+        self.client.get(reverse('profile_unfollow', args=['Author']))
+        self.assertContains(
+            self.client.get(profile),
+            reverse('profile_follow', args=['Author']),
+        )
+
+
+class BulkFollowsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = User.objects.bulk_create(
+            User(username=f'Author{i}') for i in range(1000)
+        )
+        cls.author_ids = list(
+            User.objects.exclude(pk=cls.reader.pk).values_list(
+                'pk', flat=True
+            )
+        )
+        # bulk_create минует сигналы, создающие UserStats.
+        UserStats.objects.bulk_create(
+            UserStats(user_id=pk) for pk in cls.author_ids
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {pk}', author_id=pk) for pk in cls.author_ids
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bulk_follow_and_unfollow(self):
+        """Массовая подписка и отписка меняют тысячу подписок сразу"""
+        Follow.objects.create(user=self.reader, author_id=self.author_ids[0])
+        missing = max(self.author_ids) + 1
+        followed = follows.bulk_follow(
+            self.reader.pk, self.author_ids + [missing, self.reader.pk]
+        )
+        self.assertEqual(followed, 999)
+        self.assertEqual(
+            follows.authors(self.reader.pk), frozenset(self.author_ids)
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1000
+        )
+        self.assertEqual(
+            UserStats.objects.filter(followers_count=1).count(), 1000
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 1000
+        )
+        self.assertEqual(follows.bulk_follow(self.reader.pk, [missing]), 0)
+
+        removed = self.author_ids[:600]
+        self.assertEqual(follows.bulk_unfollow(self.reader.pk, removed), 600)
+        self.assertEqual(len(follows.authors(self.reader.pk)), 400)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 400
+        )
+        self.assertEqual(
+            UserStats.objects.filter(followers_count=1).count(), 400
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                user=self.reader, post__author_id__in=removed
+            )
+        )
+
+    def test_api_follows_by_username(self):
+        """API подписывает по списку имён и отписывает тем же списком"""
+        url = reverse('api_follow_authors')
+        data = {'authors': ['Author1', 'Author2', 'Nobody']}
+        self.assertEqual(
+            self.client.post(url, data, content_type='application/json')
+            .status_code,
+            403,
+        )
+        self.client.force_login(self.reader)
+        response = self.client.post(
+            url, data, content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'followed': 2})
+        self.assertEqual(
+            set(
+                Follow.objects.filter(user=self.reader).values_list(
+                    'author__username', flat=True
+                )
+            ),
+            {'Author1', 'Author2'},
+        )
+        response = self.client.delete(
+            url, data, content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'unfollowed': 2})
+        response = self.client.post(
+            url, {'authors': []}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
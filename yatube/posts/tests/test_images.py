@@ -0,0 +1,135 @@
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def jpeg(size, orientation=None):
+    image = Image.new('RGB', size, (200, 100, 50))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    content = io.BytesIO()
+    image.save(content, 'JPEG', quality=90, exif=exif.tobytes())
+    return content.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_MAX_SIDE=800,
+    POST_IMAGE_FORMAT='WEBP',
+)
+class UploadProcessingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, content, name='photo.jpg'):
+        self.authorized_client.post(
+            reverse('new_post'),
+            {
+                'text': 'Пост с фото',
+                'image': SimpleUploadedFile(name, content, 'image/jpeg'),
+            },
+        )
+        post = Post.objects.latest('pk')
+        return Image.open(post.image.path), post.image.name
+
+    def test_large_photo_is_downscaled_and_reencoded(self):
+        """Большое фото уменьшается и перекодируется в WEBP"""
+        image, name = self.upload(jpeg((4000, 3000)))
+        self.assertEqual(image.format, 'WEBP')
+        self.assertEqual(image.size, (800, 600))
+        self.assertTrue(name.endswith('.webp'))
+
+    def test_exif_orientation_is_applied(self):
+        """Поворот из EXIF применяется к пикселям"""
+        image, _ = self.upload(jpeg((400, 200), orientation=6))
+        self.assertEqual(image.size, (200, 400))
+        self.assertEqual(image.getexif().get(0x0112, 1), 1)
+
+    def test_broken_image_is_rejected(self):
+        """Повреждённый файл не принимается"""
+        posts_count = Post.objects.count()
+        response = self.authorized_client.post(
+            reverse('new_post'),
+            {
+                'text': 'Пост с фото',
+                'image': SimpleUploadedFile(
+                    'photo.jpg', jpeg((100, 100))[:200], 'image/jpeg'
+                ),
+            },
+        )
+        self.assertTrue(response.context['form'].errors)
+        self.assertEqual(Post.objects.count(), posts_count)
+
+
+@unittest.skipUnless(
+    os.path.exists('/proc/self/status'), 'нужен /proc (Linux)'
+)
+class UploadMemoryTests(unittest.TestCase):
+    # Полное декодирование 40 Мп занимает больше 160 МБ.
+    MEMORY_CEILING_MB = 48
+    # VmHWM, в отличие от ru_maxrss, не наследуется от родителя через exec.
+    MEASURE = textwrap.dedent('''
+        import io, sys
+        from PIL import Image
+        from posts import images
+
+        def peak():
+            with open('/proc/self/status') as status:
+                for line in status:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) // 1024
+
+        # Прогрев: кодеки и плагины Pillow не должны попасть в замер.
+        warmup = io.BytesIO()
+        Image.new('RGB', (64, 64)).save(warmup, 'JPEG')
+        images.downscale(warmup, 16, 'WEBP', 82, 30_000_000)
+
+        before = peak()
+        with open(sys.argv[1], 'rb') as source:
+            images.downscale(source, 1600, 'WEBP', 82, 30_000_000)
+        print(peak() - before)
+    ''')
+
+    def test_peak_memory_is_bounded(self):
+        """Обработка фото на 40 Мп укладывается в потолок памяти"""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as source:
+            source.write(jpeg((8000, 5000)))
+            source.flush()
+            result = subprocess.run(
+                [sys.executable, '-c', self.MEASURE, source.name],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+        self.assertLess(int(result.stdout), self.MEMORY_CEILING_MB)
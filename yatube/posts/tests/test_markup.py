@@ -0,0 +1,95 @@
+import importlib
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+migration = importlib.import_module('posts.migrations.0014_text_html')
+
+TEXT = 'Первая <b>строка</b>\nвторая & последняя'
+HTML = 'Первая &lt;b&gt;строка&lt;/b&gt;<br>вторая &amp; последняя'
+
+
+class TextHtmlTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_html_is_rendered_on_save(self):
+        """Форма поста и комментария сохраняет экранированный HTML"""
+        self.client.post(reverse('new_post'), {'text': TEXT})
+        post = Post.objects.get()
+        self.assertEqual(post.text_html, HTML)
+        self.client.post(
+            reverse('add_comment', args=['Author', post.pk]), {'text': TEXT}
+        )
+        self.assertEqual(Comment.objects.get().text_html, HTML)
+        self.client.post(
+            reverse('post_edit', args=['Author', post.pk]),
+            {'text': 'Новый\nтекст'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'Новый<br>текст')
+
+    def test_templates_output_stored_html(self):
+        """Лента и комментарии выводят сохранённый HTML как есть"""
+        post = Post.objects.create(text=TEXT, author=self.author)
+        Comment.objects.create(text=TEXT, author=self.author, post=post)
+        self.assertContains(self.client.get(reverse('index')), HTML)
+        Post.objects.filter(pk=post.pk).update(text_html='<i>готово</i>')
+        Comment.objects.update(text_html='<i>ответ</i>')
+        cache.clear()
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, '<i>готово</i>')
+        response = self.client.get(reverse('post', args=['Author', post.pk]))
+        self.assertContains(response, '<i>ответ</i>')
+
+    def test_migration_backfills_in_batches(self):
+        """Миграция заполняет HTML существующих строк пачками"""
+        Post.objects.bulk_create(
+            Post(text=f'{TEXT} {i}', author=self.author) for i in range(5)
+        )
+        self.assertEqual(Post.objects.filter(text_html='').count(), 5)
+        with mock.patch.object(migration, 'BATCH_SIZE', 2):
+            migration.backfill_text_html(apps, None)
+        self.assertFalse(Post.objects.filter(text_html=''))
+        self.assertEqual(
+            Post.objects.order_by('pk').first().text_html, f'{HTML} 0'
+        )
+
+    def test_bench_render_writes_json(self):
+        """Бенчмарк рендеринга сравнивает linebreaksbr и готовый HTML"""
+        with tempfile.TemporaryDirectory(dir=settings.BASE_DIR) as path:
+            output = os.path.join(path, 'bench_render.json')
+            call_command(
+                'bench_render',
+                '--repeat=3',
+                '--words=50',
+                f'--output={output}',
+                stdout=io.StringIO(),
+            )
+            with open(output, encoding='utf-8') as file:
+                result = json.load(file)
+        self.assertEqual(
+            set(result['variants']), {'linebreaksbr', 'text_html'}
+        )
+        self.assertGreater(result['speedup_p50'], 0)
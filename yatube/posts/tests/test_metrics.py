@@ -0,0 +1,145 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from yatube import metrics
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_url_name(self):
+        """Метрики раскладываются по имени URL"""
+        self.client.get(reverse('index'))
+        self.client.get(reverse('post', args=['TestUser', self.post.id]))
+        text = self.scrape()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="index"} 1', text
+        )
+        self.assertIn(
+            'yatube_requests_total{view="post",status="200"} 1', text
+        )
+        self.assertIn('yatube_request_db_queries_count{view="post"} 1', text)
+        self.assertIn('yatube_db_seconds_total{view="post"}', text)
+        self.assertIn('yatube_template_seconds_total{view="post"}', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Бакеты гистограммы накопительные и заканчиваются +Inf"""
+        for _ in range(3):
+            self.client.get(reverse('index'))
+        text = self.scrape()
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="index",le="+Inf"} 3',
+            text,
+        )
+
+    def test_template_and_db_time_are_measured(self):
+        """Время шаблонов и БД попадает в метрики запроса"""
+        self.client.get(reverse('post', args=['TestUser', self.post.id]))
+        labels = ('post',)
+        self.assertGreater(metrics.TEMPLATE_TIME.values[labels], 0)
+        self.assertGreater(metrics.DB_TIME.values[labels], 0)
+        counts, _, requests = metrics.QUERIES.values[labels]
+        self.assertEqual(requests, 1)
+
+    @override_settings(METRICS_SLOW_QUERY_MS=0)
+    def test_slow_queries_are_logged_with_fingerprint(self):
+        """Медленные запросы пишутся в лог с отпечатком SQL"""
+        with self.assertLogs('yatube.slow_queries', 'WARNING') as logs:
+            self.client.get(reverse('profile', args=['TestUser']))
+        self.assertIn('view=profile', logs.output[0])
+        self.assertIn('fingerprint=', logs.output[0])
+        self.assertIn(
+            'yatube_slow_queries_total{view="profile"}', self.scrape()
+        )
+
+    def test_fingerprint_ignores_parameters(self):
+        """Отпечаток не зависит от параметров и длины IN-списка"""
+        first, normalized = metrics.fingerprint(
+            "SELECT * FROM t WHERE a = 1 AND b IN (%s, %s) AND c = 'x'"
+        )
+        second, _ = metrics.fingerprint(
+            "SELECT * FROM t WHERE a = 25 AND b IN (%s, %s, %s) AND c = 'y'"
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(
+            normalized, 'SELECT * FROM t WHERE a = ? AND b IN (?) AND c = ?'
+        )
+
+    def test_metrics_endpoint_is_private(self):
+        """Метрики недоступны с посторонних адресов"""
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='203.0.113.7'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='secret')
+    def test_metrics_behind_proxy_need_token(self):
+        """Без разрешённых адресов метрики отдаются только по токену"""
+        url = reverse('metrics')
+        for header, status in (
+            (None, 404),
+            ('Bearer wrong', 404),
+            ('Bearer secret', 200),
+        ):
+            with self.subTest(header=header):
+                extra = {'HTTP_AUTHORIZATION': header} if header else {}
+                response = self.client.get(url, **extra)
+                self.assertEqual(response.status_code, status)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='')
+    def test_empty_token_is_rejected(self):
+        """Пустой токен не открывает метрики"""
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer '
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_overhead_per_request(self):
+        """Накладные расходы middleware меньше 50 мкс на запрос"""
+        request = RequestFactory().get(reverse('index'))
+        request.resolver_match = resolve(request.path)
+        response = HttpResponse()
+
+        def view(request):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return response
+
+        rounds = 2000
+        # Без обёртки execute, чтобы учесть и её стоимость.
+        if metrics.execute_wrapper in connection.execute_wrappers:
+            connection.execute_wrappers.remove(metrics.execute_wrapper)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            view(request)
+        bare = time.perf_counter() - started
+        middleware = metrics.MetricsMiddleware(view)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            middleware(request)
+        instrumented = time.perf_counter() - started
+        self.assertLess((instrumented - bare) / rounds, 50e-6)
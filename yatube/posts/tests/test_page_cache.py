@@ -0,0 +1,159 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from yatube import metrics
+
+from .. import page_cache
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.post = Post.objects.create(
+            text='Исходный текст', author=self.user, group=self.group
+        )
+        self.other = Post.objects.create(text='Другой пост', author=self.user)
+        self.index = reverse('index')
+        self.group_page = reverse('group_posts', args=[self.group.slug])
+        self.profile = reverse('profile', args=[self.user.username])
+        self.post_page = reverse('post', args=['TestUser', self.post.pk])
+        self.other_page = reverse('post', args=['TestUser', self.other.pk])
+
+    def warm(self, *urls):
+        for url in urls:
+            self.client.get(url)
+
+    def assertCached(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        return response
+
+    def assertPurged(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        return response
+
+    def test_anonymous_hit_skips_views_and_database(self):
+        """Повторный анонимный запрос отдаётся из кэша без запросов к БД"""
+        urls = (self.index, self.group_page, self.profile, self.post_page)
+        self.warm(*urls)
+        for url in urls:
+            with self.subTest(url=url), self.assertNumQueries(0):
+                response = self.assertCached(url)
+                self.assertContains(response, 'Исходный текст')
+
+    def test_authenticated_requests_are_not_cached(self):
+        """Страницы авторизованного читателя в кэш не попадают"""
+        self.client.force_login(self.reader)
+        self.warm(self.index)
+        response = self.client.get(self.index)
+        self.assertNotIn('X-Cache', response)
+
+    def test_post_edit_purges_only_pages_with_the_post(self):
+        """Правка поста сбрасывает только страницы, где он показан"""
+        self.warm(self.index, self.post_page, self.other_page)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertContains(self.assertPurged(self.index), 'Новый текст')
+        self.assertContains(self.assertPurged(self.post_page), 'Новый текст')
+        self.assertCached(self.other_page)
+
+    def test_new_post_purges_its_feeds(self):
+        """Новый пост сбрасывает главную, ленту группы и профиль автора"""
+        self.warm(self.index, self.group_page, self.profile, self.other_page)
+        Post.objects.create(
+            text='Свежий пост', author=self.user, group=self.group
+        )
+        for url in (self.index, self.group_page, self.profile):
+            with self.subTest(url=url):
+                self.assertContains(self.assertPurged(url), 'Свежий пост')
+
+    def test_moving_post_purges_both_groups(self):
+        """Перенос поста в другую группу сбрасывает обе ленты групп"""
+        other_group = Group.objects.create(
+            title='Другая группа', slug='other-group', description='-'
+        )
+        other_page = reverse('group_posts', args=[other_group.slug])
+        self.warm(self.group_page, other_page)
+        self.post.group = other_group
+        self.post.save()
+        self.assertNotContains(self.assertPurged(self.group_page), 'Исходный')
+        self.assertContains(self.assertPurged(other_page), 'Исходный')
+
+    def test_comment_purges_post_page(self):
+        """Комментарий сбрасывает страницу своего поста, но не чужого"""
+        self.warm(self.post_page, self.other_page)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Первый комментарий'
+        )
+        response = self.assertPurged(self.post_page)
+        self.assertContains(response, 'Первый комментарий')
+        self.assertCached(self.other_page)
+
+    def test_group_edit_purges_group_pages(self):
+        """Правка группы сбрасывает её ленту и страницы её постов"""
+        self.warm(self.group_page, self.post_page, self.other_page)
+        self.group.title = 'Новое название'
+        self.group.save()
+        for url in (self.group_page, self.post_page):
+            with self.subTest(url=url):
+                self.assertContains(self.assertPurged(url), 'Новое название')
+        self.assertCached(self.other_page)
+
+    def test_follow_purges_profiles(self):
+        """Подписка сбрасывает профили автора и подписчика"""
+        reader_profile = reverse('profile', args=[self.reader.username])
+        self.warm(self.profile, reader_profile)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertContains(self.assertPurged(self.profile), 'Подписчиков: 1')
+        self.assertContains(self.assertPurged(reader_profile), 'Подписан: 1')
+
+    def test_hit_ratio_is_reported(self):
+        """Попадания и промахи видны в метриках по имени URL"""
+        self.warm(self.index, self.index, self.index)
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'yatube_page_cache_requests_total{view="index",result="hit"} 2',
+            text,
+        )
+        self.assertIn(
+            'yatube_page_cache_requests_total{view="index",result="miss"} 1',
+            text,
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="index"} 3', text
+        )
+
+    def test_page_purged_while_rendering_is_not_stored(self):
+        """Страницу, сброшенную во время рендеринга, кэш не сохраняет"""
+        keys = page_cache.surrogate_keys
+
+        def purge_then_keys(response):
+            # Запись зафиксирована после чтения данных страницы, но до
+            # того, как промежуточный слой прочёл поколения ключей.
+            page_cache.purge(f'post:{self.post.pk}')
+            return keys(response)
+
+        with mock.patch.object(page_cache, 'surrogate_keys', purge_then_keys):
+            self.warm(self.index)
+        self.assertPurged(self.index)
+        self.assertCached(self.index)
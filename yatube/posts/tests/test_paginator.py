@@ -0,0 +1,179 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import FeedStats, Post
+
+User = get_user_model()
+
+
+class CursorPaginatorViewsTest(TestCase):
+    '''Тестирование keyset-паджинатора на главной странице'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        posts = (Post(text=f'Пост №{i}', author=cls.user) for i in range(25))
+        Post.objects.bulk_create(posts)
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, **params):
+        response = self.client.get(reverse('index'), params)
+        return response.context['page']
+
+    def test_after_cursor_walks_the_feed(self):
+        """Курсор ?after= открывает следующие страницы без пропусков"""
+        seen = []
+        page = self.get_page()
+        seen.extend(page.object_list)
+        while page.has_next():
+            page = self.get_page(after=page.next_cursor)
+            seen.extend(page.object_list)
+        self.assertEqual(seen, self.ordered)
+
+    def test_before_cursor_returns_previous_page(self):
+        """Курсор ?before= возвращает на предыдущую страницу"""
+        first = self.get_page()
+        second = self.get_page(after=first.next_cursor)
+        back = self.get_page(before=second.previous_cursor)
+        self.assertEqual(back.object_list, first.object_list)
+        self.assertFalse(back.has_previous())
+
+    def test_legacy_page_number(self):
+        """Старые ссылки ?page=N продолжают работать"""
+        page = self.get_page(page=3)
+        self.assertEqual(page.object_list, self.ordered[20:])
+        self.assertTrue(page.has_previous())
+        self.assertFalse(page.has_next())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор открывает первую страницу"""
+        for params in ({'after': 'garbage'}, {'before': '!!'}, {'page': 'x'}):
+            with self.subTest(params=params):
+                page = self.get_page(**params)
+                self.assertEqual(page.object_list, self.ordered[:10])
+
+
+class WindowedNavigationTest(TestCase):
+    '''Окно навигации по страницам ленты с числом постов из счётчика'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        posts = (Post(text=f'Пост №{i}', author=cls.user) for i in range(55))
+        Post.objects.bulk_create(posts)
+        FeedStats.objects.filter(scope='index').update(posts_count=55)
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, query=''):
+        response = self.client.get(reverse('index') + '?' + query)
+        return response.context['page']
+
+    def numbers(self, page):
+        return [link and link.number for link in page.page_links()]
+
+    def test_window_around_current_page(self):
+        """Окно: первая, соседние с текущей и последняя страницы"""
+        page = self.get_page()
+        self.assertEqual(self.numbers(page), [1, 2, 3, None, 6])
+        third = page.page_links()[2]
+        page = self.get_page(third.query)
+        self.assertEqual(page.object_list, self.ordered[20:30])
+        self.assertEqual(page.number, 3)
+        self.assertEqual(self.numbers(page), [1, 2, 3, 4, 5, 6])
+        second = page.page_links()[1]
+        page = self.get_page(second.query)
+        self.assertEqual(page.object_list, self.ordered[10:20])
+        self.assertEqual(page.number, 2)
+
+    def test_last_page(self):
+        """Последняя страница открывается без OFFSET и выровнена по счётчику"""
+        page = self.get_page()
+        page = self.get_page(page.page_links()[-1].query)
+        self.assertEqual(page.object_list, self.ordered[50:])
+        self.assertEqual(page.number, 6)
+        self.assertFalse(page.has_next())
+        page = self.get_page(page.previous_query)
+        self.assertEqual(page.object_list, self.ordered[40:50])
+        self.assertEqual(page.number, 5)
+
+    def test_skip_is_bounded(self):
+        """Далёкий skip не превращается в глубокий OFFSET"""
+        page = self.get_page()
+        cursor = page.next_cursor
+        page = self.get_page(f'after={cursor}&skip=40')
+        self.assertEqual(page.object_list, self.ordered[:10])
+
+    def test_total_comes_from_counter(self):
+        """Число страниц берётся из FeedStats, без COUNT(*) по постам"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('index'))
+        self.assertContains(response, '?last=1')
+        self.assertFalse(
+            [
+                query for query in context.captured_queries
+                if 'COUNT(' in query['sql']
+                and 'posts_post' in query['sql']
+            ]
+        )
+
+    def test_page_links_are_rendered(self):
+        """Навигация содержит окно ссылок, а не все страницы подряд"""
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, '&hellip;')
+        self.assertContains(response, "?last=1'>6</a>")
+        self.assertNotContains(response, '>4</a>')
+
+
+class AdminCountTest(TestCase):
+    '''Список постов в админке не считает всю таблицу'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='Admin', email='admin@example.com', password='pass'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост №{i}', author=cls.admin) for i in range(5)
+        )
+        FeedStats.objects.filter(scope='index').update(posts_count=5)
+
+    def count_queries(self, params):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), params
+            )
+        self.assertEqual(response.status_code, 200)
+        return response, [
+            query['sql'] for query in context.captured_queries
+            if 'COUNT(' in query['sql'] and 'posts_post' in query['sql']
+        ]
+
+    def test_changelist_uses_counter(self):
+        """Без фильтров число постов берётся из FeedStats"""
+        response, counts = self.count_queries({})
+        self.assertEqual(counts, [])
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    def test_filtered_changelist_count_is_exact(self):
+        """С фильтром посты считаются точно, без обрезки LIMIT"""
+        year = Post.objects.values_list('pub_date__year', flat=True)[0]
+        response, counts = self.count_queries({'pub_date__year': year})
+        self.assertEqual(len(counts), 1)
+        self.assertNotIn('LIMIT', counts[0])
+        self.assertEqual(response.context['cl'].result_count, 5)
+        response, counts = self.count_queries({'pub_date__year': 2000})
+        self.assertEqual(response.context['cl'].result_count, 0)
@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueryCountTests(TestCase):
+    '''Количество запросов к БД не должно зависеть от размера страницы'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Описание группы',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'Пост №{i}', author=self.author, group=self.group
+            )
+            Comment.objects.create(
+                text='Комментарий', author=self.reader, post=post
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.get(url)
+        return len(response.context['page']), len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        """Тестирование отсутствия N+1 запросов в лентах постов"""
+        urls = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': self.group.slug}),
+            reverse('profile', kwargs={'username': self.author.username}),
+            reverse('follow_index'),
+        )
+        self.add_posts(2)
+        small = {url: self.count_queries(url) for url in urls}
+        self.add_posts(10)
+        for url in urls:
+            with self.subTest(url=url):
+                small_size, small_queries = small[url]
+                large_size, large_queries = self.count_queries(url)
+                self.assertLess(small_size, large_size)
+                self.assertEqual(small_queries, large_queries)
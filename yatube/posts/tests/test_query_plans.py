@@ -0,0 +1,106 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..paginator import encode_cursor
+
+User = get_user_model()
+
+# «SCAN t» без индекса — полный проход таблицы; «SCAN t USING INDEX»
+# обходит индекс по порядку и с LIMIT останавливается на странице.
+FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+TEMP_BTREE = 'USE TEMP B-TREE'
+
+
+class QueryPlanTests(TestCase):
+    '''Запросы страниц не сортируют во временном B-дереве и не читают
+    таблицы целиком.'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Описание группы',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(3):
+            cls.post = Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+            Comment.objects.create(
+                text='Комментарий', author=cls.reader, post=cls.post
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_plans_use_indexes(self, url):
+        # Иначе страницы по курсору собирались бы из списка id,
+        # закэшированного предыдущим запросом, без запросов к ленте.
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in context.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            for step in self.plan(query['sql']):
+                with self.subTest(url=url, sql=query['sql'], step=step):
+                    self.assertNotIn(TEMP_BTREE, step)
+                    self.assertIsNone(FULL_SCAN_RE.match(step))
+        return [query['sql'] for query in context.captured_queries]
+
+    def test_feed_query_plans(self):
+        """Тестирование планов запросов лент и страницы поста"""
+        urls = (
+            reverse('index'),
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.author.username]),
+            reverse('follow_index'),
+            reverse('post', args=[self.author.username, self.post.id]),
+        )
+        cursor = encode_cursor(self.post)
+        for url in urls:
+            self.assert_plans_use_indexes(url)
+            self.assert_plans_use_indexes(f'{url}?after={cursor}')
+            self.assert_plans_use_indexes(f'{url}?before={cursor}')
+
+    @override_settings(FEED_IDS_LENGTH=1)
+    def test_pages_past_cached_list_use_indexes(self):
+        """Страницы за концом списка id читаются из БД по индексу"""
+        posts = Post.objects.order_by('-pub_date', '-id')
+        after = encode_cursor(posts.first())
+        before = encode_cursor(posts.last())
+        urls = (
+            reverse('index'),
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.author.username]),
+            reverse('follow_index'),
+        )
+        for url in urls:
+            for query, operator in (
+                (f'after={after}', '"pub_date" < '),
+                (f'before={before}', '"pub_date" > '),
+            ):
+                captured = self.assert_plans_use_indexes(f'{url}?{query}')
+                with self.subTest(url=url, query=query):
+                    # Запрос страницы по курсору действительно выполнен.
+                    self.assertTrue(
+                        any(operator in sql for sql in captured)
+                    )
@@ -0,0 +1,143 @@
+import io
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica1'],
+    PRIMARY_STICKINESS_SECONDS=30,
+    PAGE_CACHE_TIMEOUT=0,
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    '''Реплика — копия основной базы, которая отстаёт до sync_replica.'''
+
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+        self.post = Post.objects.create(text='Старый пост', author=self.author)
+        self.sync()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def sync(self):
+        call_command('sync_replicas', 'replica1', stdout=io.StringIO())
+
+    def lagging_post(self, text='Свежий пост'):
+        '''Пост, который есть в основной базе, но ещё не на реплике.'''
+        post = Post.objects.create(text=text, author=self.author)
+        # После COMMIT ленты прогреваются из основной базы.
+        cache.clear()
+        return post
+
+    def test_get_reads_from_replica(self):
+        """GET читает с реплики и не видит несинхронизированных данных"""
+        post = self.lagging_post()
+        url = reverse('post', args=['Author', post.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.sync()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_writer_reads_own_writes(self):
+        """После записи пользователь читает из основной базы"""
+        self.author_client.post(reverse('new_post'), {'text': 'Свежий пост'})
+        post = Post.objects.get(text='Свежий пост')
+        url = reverse('post', args=['Author', post.pk])
+        self.assertEqual(self.author_client.get(url).status_code, 200)
+        self.assertEqual(self.reader_client.get(url).status_code, 404)
+
+    def test_stickiness_expires(self):
+        """По истечении окна писавший снова читает с реплики"""
+        self.author_client.post(reverse('new_post'), {'text': 'Свежий пост'})
+        post = Post.objects.get(text='Свежий пост')
+        later = time.time() + 31
+        with mock.patch('yatube.db_router.time.time', return_value=later):
+            response = self.author_client.get(
+                reverse('post', args=['Author', post.pk])
+            )
+        self.assertEqual(response.status_code, 404)
+
+    def test_feeds_read_lists_from_primary(self):
+        """Списки лент, которые живут в кэше, строятся по основной базе"""
+        self.lagging_post()
+        response = self.reader_client.get(reverse('index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_post_requests_read_primary(self):
+        """POST находит объекты, которых ещё нет на реплике"""
+        post = self.lagging_post()
+        response = self.reader_client.post(
+            reverse('add_comment', args=['Author', post.pk]),
+            {'text': 'Комментарий'},
+        )
+        self.assertRedirects(
+            response,
+            reverse('post', args=['Author', post.pk]),
+            fetch_redirect_response=False,
+        )
+        self.assertTrue(post.comments.exists())
+
+    def test_follow_reads_primary(self):
+        """Подписка проверяет существующую подписку в основной базе"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(
+            reverse('profile_follow', args=['Author'])
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 1
+        )
+
+    def test_follow_pins_session(self):
+        """Подписка включает чтение своих записей"""
+        self.lagging_post()
+        self.reader_client.get(reverse('profile_follow', args=['Author']))
+        response = self.reader_client.get(reverse('follow_index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_reads_outside_requests_use_primary(self):
+        """Вне запроса чтение идёт в основную базу"""
+        self.lagging_post()
+        self.assertTrue(Post.objects.filter(text='Свежий пост').exists())
+        self.assertEqual(Post.objects.all().db, 'default')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=600)
+    def test_sync_invalidates_caches_filled_from_replica(self):
+        """Синхронизация сбрасывает кэш и ETag, полученные с реплики"""
+        Comment.objects.create(
+            text='Свежий комментарий', author=self.reader, post=self.post
+        )
+        url = reverse('post', args=['Author', self.post.pk])
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Свежий комментарий')
+        etag = response['ETag']
+        self.sync()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Свежий комментарий')
+        response = Client().get(url)
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_sync_refreshes_reader_feed(self):
+        """После синхронизации читатель видит пост без сброса кэша"""
+        Post.objects.create(text='Свежий пост', author=self.author)
+        response = self.reader_client.get(reverse('index'))
+        etag = response['ETag']
+        self.sync()
+        response = self.reader_client.get(
+            reverse('index'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertContains(response, 'Свежий пост')
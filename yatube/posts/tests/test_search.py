@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.python = Post.objects.create(
+            text='Пишем сервер на Питоне', author=cls.user
+        )
+        cls.python_twice = Post.objects.create(
+            text='Питон, питон и ещё раз питон', author=cls.user
+        )
+        cls.other = Post.objects.create(
+            text='Погода на выходные', author=cls.user
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, **params):
+        response = self.guest_client.get(reverse('search'), params)
+        return list(response.context['page'])
+
+    def test_search_is_ranked_by_bm25(self):
+        """Поиск находит посты по префиксу и ранжирует их по bm25"""
+        self.assertEqual(
+            self.search(q='пито'), [self.python_twice, self.python]
+        )
+
+    def test_search_follows_writes(self):
+        """Индекс обновляется при создании, правке и удалении постов"""
+        post = Post.objects.create(text='Свежий выпуск', author=self.user)
+        self.assertEqual(self.search(q='свежий'), [post])
+
+        Post.objects.filter(pk=post.pk).update(text='Старый выпуск')
+        self.assertEqual(self.search(q='свежий'), [])
+        self.assertEqual(self.search(q='старый'), [post])
+
+        post.delete()
+        self.assertEqual(self.search(q='старый'), [])
+
+    def test_search_paginates_with_cursor(self):
+        """Результаты поиска листаются курсором, как ленты"""
+        Post.objects.bulk_create(
+            Post(text=f'Заметка номер {i}', author=self.user)
+            for i in range(15)
+        )
+        response = self.guest_client.get(reverse('search'), {'q': 'заметка'})
+        first = response.context['page']
+        second = self.search(q='заметка', after=first.next_cursor)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 5)
+        self.assertFalse(set(first) & set(second))
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 в запросе не ломают поиск"""
+        for query in ('"', 'NOT', 'пит* OR', '(', ''):
+            with self.subTest(query=query):
+                response = self.guest_client.get(
+                    reverse('search'), {'q': query}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке использует полнотекстовый индекс"""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'ПОГОДА'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.other]
+        )
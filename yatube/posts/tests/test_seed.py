@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import counters
+from ..models import Comment, Follow, Group, Post, PulledAuthor
+
+User = get_user_model()
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=15)
+class SeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_yatube',
+            '--users=40',
+            '--posts=400',
+            '--groups=5',
+            '--follows-per-user=5',
+            '--comments-per-post=1.5',
+            stdout=io.StringIO(),
+        )
+
+    def test_row_counts(self):
+        """Тестирование количества созданных строк"""
+        self.assertEqual(User.objects.count(), 40)
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 400)
+        self.assertEqual(Comment.objects.count(), 600)
+        self.assertLessEqual(Follow.objects.count(), 40 * 5)
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+
+    def test_seed_invalidates_cached_feeds(self):
+        """После генерации анонимная главная рендерится заново"""
+        cache.clear()
+        self.client.get(reverse('index'))
+        call_command(
+            'seed_yatube', '--users=3', '--posts=5', '--groups=1',
+            '--prefix=more', stdout=io.StringIO(),
+        )
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_authors_are_skewed(self):
+        """Немногие авторы пишут большую часть постов"""
+        totals = sorted(
+            User.objects.annotate(total=Count('posts')).values_list(
+                'total', flat=True
+            ),
+            reverse=True,
+        )
+        self.assertGreater(sum(totals[:4]), sum(totals) / 3)
+
+    def test_denormalized_data_is_consistent(self):
+        """Счётчики и ленты подписок пересчитаны после вставки"""
+        for user in User.objects.all():
+            with self.subTest(user=user.username):
+                stats = user.stats
+                fresh = counters.recount(user.pk)
+                self.assertEqual(stats.posts_count, fresh.posts_count)
+                self.assertEqual(
+                    stats.followers_count, fresh.followers_count
+                )
+        post = Post.objects.annotate(total=Count('comments')).first()
+        self.assertEqual(post.comment_count, post.total)
+        popular = set(
+            Follow.objects.values('author')
+            .annotate(total=Count('pk'))
+            .filter(total__gte=15)
+            .values_list('author', flat=True)
+        )
+        self.assertEqual(
+            set(PulledAuthor.objects.values_list('author', flat=True)),
+            popular,
+        )
+
+    def test_bench_views_writes_json(self):
+        """Бенчмарк представлений пишет результат в JSON"""
+        with tempfile.NamedTemporaryFile(
+            suffix='.json', dir=settings.BASE_DIR, delete=False
+        ) as output:
+            path = output.name
+        try:
+            call_command(
+                'bench_views',
+                '--requests=5',
+                '--warmup=1',
+                '--cold',
+                f'--output={path}',
+                stdout=io.StringIO(),
+            )
+            with open(path, encoding='utf-8') as file:
+                result = json.load(file)
+        finally:
+            os.remove(path)
+        self.assertEqual(result['meta']['posts'], 400)
+        for view in ('index', 'group_posts', 'profile', 'post'):
+            with self.subTest(view=view):
+                summary = result['views'][view]
+                self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+                self.assertGreater(summary['queries_max'], 0)
+                self.assertEqual(summary['page_cache_hit_ratio'], 0)
@@ -0,0 +1,159 @@
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from yatube.backends.sqlite_cache import SQLiteCache
+
+
+def increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    '''Общий кэш в файле SQLite.'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        """get/set, get_many/set_many, add, incr, touch и delete"""
+        self.cache.set_many({'number': 1, 'data': {'posts': [1, 2]}})
+        self.assertEqual(
+            self.cache.get_many(['number', 'data', 'missing']),
+            {'number': 1, 'data': {'posts': [1, 2]}},
+        )
+        self.assertEqual(self.cache.incr('number', 4), 5)
+        self.assertEqual(self.cache.decr('number'), 4)
+        self.cache.set('huge', 2 ** 70)
+        self.assertEqual(self.cache.incr('huge'), 2 ** 70 + 1)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.assertFalse(self.cache.add('number', 10))
+        self.assertTrue(self.cache.add('new', 10))
+        self.assertTrue(self.cache.touch('new', 100))
+        self.cache.delete('new')
+        self.assertIsNone(self.cache.get('new'))
+        self.cache.delete_many(['number', 'data'])
+        self.assertFalse(self.cache.has_key('number'))
+
+    def test_expired_values_are_not_returned(self):
+        """Истёкшая запись не читается, и на её место работает add"""
+        self.cache.set('key', 'value', timeout=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get_many(['key']), {})
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_lru_eviction_under_byte_budget(self):
+        """При превышении бюджета вытесняются давно не читанные записи"""
+        cache = self.make_cache(MAX_BYTES=50 * 1024, TOUCH_INTERVAL=0)
+        cache.set('hot', b'x' * 1024)
+        for number in range(100):
+            cache.get('hot')
+            cache.set(f'cold:{number}', b'x' * 1024)
+        total = cache.connection.execute(
+            'SELECT total FROM cache_size'
+        ).fetchone()[0]
+        self.assertLessEqual(total, 50 * 1024)
+        self.assertIsNotNone(cache.get('hot'))
+        self.assertIsNone(cache.get('cold:0'))
+        self.assertIsNotNone(cache.get('cold:99'))
+
+    def test_incr_without_returning(self):
+        """На SQLite старше 3.35 incr обходится без RETURNING"""
+        statements = []
+        self.cache.connection.set_trace_callback(statements.append)
+        self.cache.set('number', 1)
+        with mock.patch.object(
+            sqlite3, 'sqlite_version_info', (3, 34, 1)
+        ):
+            self.assertEqual(self.cache.incr('number', 4), 5)
+            self.assertEqual(self.cache.decr('number'), 4)
+            with self.assertRaises(ValueError):
+                self.cache.incr('missing')
+            # Чтение и запись под BEGIN IMMEDIATE тоже атомарны.
+            self.cache.set('counter', 0)
+            context = multiprocessing.get_context('fork')
+            workers = [
+                context.Process(
+                    target=increment, args=(self.location, 100)
+                )
+                for _ in range(4)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            self.assertEqual(self.cache.get('counter'), 400)
+        self.assertFalse(
+            [sql for sql in statements if 'RETURNING' in sql]
+        )
+        self.assertEqual(
+            self.cache.connection.execute(
+                'SELECT typeof(value) FROM cache WHERE key = ?',
+                [self.cache.make_key('number')],
+            ).fetchone(),
+            ('integer',),
+        )
+
+    def test_processes_share_values_and_invalidations(self):
+        """Процессы видят записи и удаления друг друга, incr атомарен"""
+        context = multiprocessing.get_context('fork')
+        self.cache.set('counter', 0)
+        self.cache.set('generation', 1)
+        workers = [
+            context.Process(target=increment, args=(self.location, 200))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 800)
+
+        worker = context.Process(
+            target=SQLiteCache(self.location, {}).delete,
+            args=('generation',),
+        )
+        worker.start()
+        worker.join()
+        self.assertIsNone(self.cache.get('generation'))
+
+    def test_bench_cache_writes_json(self):
+        """Бенчмарк сравнивает бэкенды на нагрузке лент"""
+        path = os.path.join(self.directory, 'bench_cache.json')
+        call_command(
+            'bench_cache',
+            '--processes=2',
+            '--seconds=0.3',
+            '--backends=locmem,sqlite',
+            f'--output={path}',
+            stdout=io.StringIO(),
+        )
+        with open(path, encoding='utf-8') as file:
+            result = json.load(file)
+        self.assertEqual(set(result['backends']), {'locmem', 'sqlite'})
+        sqlite = result['backends']['sqlite']
+        self.assertGreater(sqlite['requests'], 0)
+        self.assertLess(sqlite['stale_ratio'], 0.01)
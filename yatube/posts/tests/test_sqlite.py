@@ -0,0 +1,125 @@
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import SimpleTestCase, TransactionTestCase
+
+from ..models import Post
+
+User = get_user_model()
+
+ALIAS = 'sqlite_profile_test'
+
+
+class ProductionProfileTests(SimpleTestCase):
+    '''Продакшен-профиль на отдельной файловой базе.'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+        connections.databases[ALIAS] = {
+            'ENGINE': 'yatube.backends.sqlite3',
+            'NAME': self.path,
+            'OPTIONS': settings.SQLITE_OPTIONS,
+            'CONN_MAX_AGE': 600,
+        }
+        self.connection = connections[ALIAS]
+
+    def tearDown(self):
+        self.connection.close()
+        delattr(connections._connections, ALIAS)
+        del connections.databases[ALIAS]
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        """Новое соединение включает WAL и остальные PRAGMA профиля"""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+        self.assertEqual(self.pragma('foreign_keys'), 1)
+
+    def test_atomic_takes_write_lock_immediately(self):
+        """atomic начинается с BEGIN IMMEDIATE"""
+        self.connection.ensure_connection()
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        try:
+            with transaction.atomic(using=ALIAS):
+                with self.assertRaisesMessage(
+                    sqlite3.OperationalError, 'locked'
+                ):
+                    other.execute('BEGIN IMMEDIATE')
+            other.execute('BEGIN IMMEDIATE')
+            other.execute('ROLLBACK')
+        finally:
+            other.close()
+
+    def test_connection_is_reused_and_maintained(self):
+        """Соединение живёт между запросами и периодически обслуживается"""
+        self.connection.ensure_connection()
+        raw = self.connection.connection
+        self.connection.close_if_unusable_or_obsolete()
+        self.assertIs(self.connection.connection, raw)
+
+        self.connection.maintained_at -= (
+            settings.SQLITE_OPTIONS['maintenance_interval'] + 1
+        )
+        stale = self.connection.maintained_at
+        self.connection.close_if_unusable_or_obsolete()
+        self.assertGreater(self.connection.maintained_at, stale)
+
+    def test_maintenance_command_truncates_wal(self):
+        """sqlite_maintenance переносит журнал в базу и обрезает его"""
+        with self.connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE numbers (value INTEGER)')
+            cursor.executemany(
+                'INSERT INTO numbers VALUES (%s)', [(i,) for i in range(500)]
+            )
+        self.assertGreater(os.path.getsize(f'{self.path}-wal'), 0)
+        out = io.StringIO()
+        call_command('sqlite_maintenance', database=ALIAS, stdout=out)
+        self.assertIn(ALIAS, out.getvalue())
+        self.assertEqual(os.path.getsize(f'{self.path}-wal'), 0)
+
+
+class BenchSqliteTests(TransactionTestCase):
+    def test_bench_sqlite_writes_json(self):
+        """Бенчмарк конкурентной нагрузки сравнивает оба профиля"""
+        user = User.objects.create_user(username='TestUser')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=user) for i in range(20)
+        )
+        with tempfile.NamedTemporaryFile(
+            suffix='.json', dir=settings.BASE_DIR, delete=False
+        ) as output:
+            path = output.name
+        try:
+            call_command(
+                'bench_sqlite',
+                '--readers=2',
+                '--writers=2',
+                '--seconds=0.3',
+                f'--output={path}',
+                stdout=io.StringIO(),
+            )
+            with open(path, encoding='utf-8') as file:
+                result = json.load(file)
+        finally:
+            os.remove(path)
+        self.assertEqual(set(result['profiles']), {'baseline', 'production'})
+        production = result['profiles']['production']
+        self.assertGreater(production['read']['ops'], 0)
+        self.assertGreater(production['write']['ops'], 0)
+        self.assertEqual(production['write']['errors'], 0)
@@ -0,0 +1,82 @@
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail.models import KVStore
+
+from .. import thumbnail_worker, thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+THUMBNAIL_TAG_RE = re.compile(r"{%\s*thumbnail\s+\S+\s+'([^']+)'(.*?)%}")
+OPTION_RE = re.compile(r"(\w+)=('[^']*'|\w+)")
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    SMALL_GIF = (
+        b'\x47\x49\x46\x38\x39\x61\x02\x00'
+        b'\x01\x00\x80\x00\x00\x00\x00\x00'
+        b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+        b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+        b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+        b'\x0A\x00\x3B'
+    )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='TestUser')
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.user,
+            image=SimpleUploadedFile(
+                'small.gif', self.SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        self.url = reverse('post', args=[self.user.username, self.post.id])
+
+    def test_templates_use_registered_geometries(self):
+        """Все геометрии из шаблонов генерируются заранее"""
+        registered = {
+            (geometry, tuple(sorted(options.items())))
+            for geometry, options in thumbnails.GEOMETRIES
+        }
+        for path in Path(settings.TEMPLATES_DIR).rglob('*.html'):
+            for geometry, raw in THUMBNAIL_TAG_RE.findall(path.read_text()):
+                options = {
+                    key: value.strip("'") if value.startswith("'")
+                    else value == 'True'
+                    for key, value in OPTION_RE.findall(raw)
+                }
+                with self.subTest(template=path.name, geometry=geometry):
+                    self.assertIn(
+                        (geometry, tuple(sorted(options.items()))),
+                        registered,
+                    )
+
+    def test_missing_thumbnail_falls_back_to_original(self):
+        """Без готовой миниатюры страница показывает оригинал"""
+        response = self.client.get(self.url)
+        self.assertContains(response, self.post.image.url)
+        self.assertFalse(KVStore.objects.exists())
+
+    def test_generated_thumbnail_is_used(self):
+        """После генерации страница показывает миниатюру"""
+        thumbnail_worker.generate(self.post.image.name)
+        response = self.client.get(self.url)
+        self.assertNotContains(response, self.post.image.url)
+        self.assertContains(response, f'{settings.MEDIA_URL}cache/')
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feed_cache, timeline
+from ..models import Follow, Post, PulledAuthor, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.authorized_client.get(reverse('follow_index'))
+        return list(response.context['page'])
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков автора"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_backfills_and_unfollow_cleans(self):
+        """Подписка заполняет ленту старыми постами, отписка очищает"""
+        post = Post.objects.create(text='Старый пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), [post])
+
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(self.feed(), [])
+
+    def test_changes_bump_reader_generation(self):
+        """Раскладка, обрезка и отписка сдвигают поколение ленты читателя"""
+        scope = timeline.scope(self.reader.pk)
+
+        def generation():
+            return feed_cache.generations([scope])[scope]
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        changes = (
+            lambda: Post.objects.create(text='Пост', author=self.author),
+            lambda: timeline.trim(self.reader.pk),
+            lambda: timeline.unfollow(self.reader.pk, self.author.pk),
+        )
+        for change in changes:
+            before = generation()
+            change()
+            with self.subTest(change=change):
+                self.assertGreater(generation(), before)
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_timeline_is_trimmed(self):
+        """Лента обрезается до TIMELINE_LENGTH записей"""
+        posts = [
+            Post.objects.create(text=f'Пост №{i}', author=self.author)
+            for i in range(5)
+        ]
+        Follow.objects.create(user=self.reader, author=self.author)
+        entries = TimelineEntry.objects.filter(user=self.reader)
+        self.assertEqual(
+            [entry.post for entry in entries], posts[:1:-1]
+        )
+
+    @override_settings(TIMELINE_LENGTH=3, TIMELINE_TRIM_EVERY=1)
+    def test_fan_out_trims_followers(self):
+        """Раскладка поста обрезает ленты подписчиков"""
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        posts = [
+            Post.objects.create(text=f'Пост №{i}', author=self.author)
+            for i in range(5)
+        ]
+        for user in (self.reader, other):
+            with self.subTest(user=user.username):
+                entries = TimelineEntry.objects.filter(user=user)
+                self.assertEqual(
+                    [entry.post for entry in entries], posts[:1:-1]
+                )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_pulled_author_is_merged_on_read(self):
+        """Посты автора с огромной аудиторией подмешиваются при чтении"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(PulledAuthor.objects.filter(author=self.author))
+
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        self.assertEqual(self.feed(), [post])
+
+    def test_rebuild_restores_timeline(self):
+        """Перестроение ленты восстанавливает записи из подписок"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        TimelineEntry.objects.all().delete()
+        timeline.rebuild(self.reader.pk)
+        self.assertEqual(self.feed(), [post])
@@ -0,0 +1,138 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import transfer
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.path = os.path.join(self.directory, 'dump.jsonl.gz')
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Описание группы',
+        )
+        self.published = timezone.now() - timedelta(days=30)
+        for number in range(7):
+            post = Post.objects.create(
+                text=f'Пост {number}', author=self.author, group=self.group
+            )
+            Comment.objects.create(
+                text=f'Комментарий {number}', author=self.reader, post=post
+            )
+        Post.objects.update(pub_date=self.published)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self):
+        call_command('export_yatube', self.path, stderr=io.StringIO())
+
+    def wipe(self):
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка в пустую базу сохраняют данные и связи"""
+        self.export()
+        self.wipe()
+        output = io.StringIO()
+        call_command(
+            'import_yatube', self.path, '--batch-size=3', stdout=output
+        )
+        self.assertIn('строк/с', output.getvalue())
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertEqual(Comment.objects.count(), 7)
+        author = User.objects.get(username='Author')
+        reader = User.objects.get(username='Reader')
+        post = author.posts.get(text='Пост 3')
+        self.assertEqual(post.pub_date, self.published)
+        self.assertEqual(post.group.slug, 'test-group')
+        self.assertEqual(post.comments.get().author, reader)
+        self.assertEqual(post.comment_count, 1)
+        self.assertTrue(
+            Follow.objects.filter(user=reader, author=author).exists()
+        )
+        self.assertEqual(author.stats.followers_count, 1)
+        self.assertEqual(TimelineEntry.objects.filter(user=reader).count(), 7)
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_existing_users_and_groups_are_reused(self):
+        """Существующие пользователи и группы не дублируются"""
+        self.export()
+        call_command('import_yatube', self.path, stdout=io.StringIO())
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(self.author.posts.count(), 14)
+        self.assertEqual(self.group.posts.count(), 14)
+        self.assertEqual(Follow.objects.count(), 1)
+        for post in Post.objects.all():
+            self.assertEqual(post.comments.count(), 1)
+
+    def test_import_purges_cached_pages(self):
+        """После импорта анонимные страницы лент рендерятся заново"""
+        self.export()
+        urls = (
+            reverse('index'),
+            reverse('group_posts', args=['test-group']),
+            reverse('profile', args=['Author']),
+        )
+        for url in urls:
+            self.client.get(url)
+        call_command('import_yatube', self.path, stdout=io.StringIO())
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_interrupted_import_resumes(self):
+        """Прерванный импорт продолжается без дублей"""
+        self.export()
+        self.wipe()
+        original = transfer.Importer.insert
+        calls = []
+
+        def crash_on_fifth_batch(importer, label, batch):
+            calls.append(label)
+            if len(calls) == 5:
+                raise RuntimeError('сбой')
+            return original(importer, label, batch)
+
+        with mock.patch.object(
+            transfer.Importer, 'insert', crash_on_fifth_batch
+        ):
+            with self.assertRaises(RuntimeError):
+                call_command(
+                    'import_yatube', self.path, '--batch-size=2',
+                    stdout=io.StringIO(),
+                )
+        self.assertTrue(os.path.exists(f'{self.path}.checkpoint'))
+        output = io.StringIO()
+        call_command(
+            'import_yatube', self.path, '--batch-size=2', stdout=output
+        )
+        self.assertIn('Продолжение со строки', output.getvalue())
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertEqual(Comment.objects.count(), 7)
+        self.assertEqual(Follow.objects.count(), 1)
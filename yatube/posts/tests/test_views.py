@@ -245,6 +245,9 @@ class PaginatorViewsTest(TestCase):
         posts = (Post(text=f'Пост №{i}', author=cls.user) for i in range(13))
         Post.objects.bulk_create(posts, 13)
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_contains_ten_records(self):
         response = self.client.get(reverse('index'))
         self.assertEqual(len(response.context.get('page').object_list), 10)
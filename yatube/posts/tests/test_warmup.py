@@ -0,0 +1,100 @@
+import importlib
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.urls import get_resolver
+
+from yatube import warmup
+
+from .. import feed_cache
+from ..models import Post
+
+User = get_user_model()
+
+production = importlib.import_module('yatube.settings_production')
+
+
+class WarmUpTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='Author')
+        Post.objects.create(text='Прогретый пост', author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_production_profile_drops_dev_tools(self):
+        """Продакшен-профиль без debug_toolbar и с кэшем шаблонов"""
+        self.assertFalse(production.DEBUG)
+        self.assertTrue(production.WARM_UP)
+        self.assertNotIn('debug_toolbar', production.INSTALLED_APPS)
+        self.assertFalse(
+            [name for name in production.MIDDLEWARE if 'debug' in name]
+        )
+        options = production.TEMPLATES[0]['OPTIONS']
+        self.assertEqual(
+            options['loaders'][0][0], 'django.template.loaders.cached.Loader'
+        )
+        self.assertNotIn(
+            'django.template.context_processors.debug',
+            options['context_processors'],
+        )
+        self.assertFalse(settings.WARM_UP)
+
+    @override_settings(TEMPLATES=production.TEMPLATES)
+    def test_run_compiles_templates_resolves_urls_and_warms_index(self):
+        """Прогрев компилирует шаблоны, строит URL и рисует главную"""
+        timings = warmup.run()
+        self.assertEqual(set(timings), {'templates', 'urls', 'caches'})
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertLessEqual(
+            set(warmup.templates()), set(loader.get_template_cache)
+        )
+        self.assertIn('posts/post_card.html', warmup.templates())
+        self.assertTrue(get_resolver()._populated)
+        html = cache.get(
+            make_template_fragment_key(
+                feed_cache.FRAGMENT_NAME, [feed_cache.vary_on('index')]
+            )
+        )
+        self.assertIn('Прогретый пост', html)
+
+    def test_failed_step_does_not_stop_worker(self):
+        """Ошибка шага прогрева пишется в лог, остальные шаги идут"""
+        def broken():
+            raise RuntimeError('нет базы')
+
+        steps = (('broken', broken),) + warmup.STEPS
+        with self.assertLogs('yatube.warmup', 'ERROR'):
+            with mock.patch.object(warmup, 'STEPS', steps):
+                timings = warmup.run()
+        self.assertIn('caches', timings)
+
+    def test_bench_startup_writes_json(self):
+        """Бенчмарк старта запускает воркер в отдельном процессе"""
+        with tempfile.TemporaryDirectory(dir=settings.BASE_DIR) as path:
+            output = os.path.join(path, 'bench_startup.json')
+            call_command(
+                'bench_startup',
+                '--runs=1',
+                '--variants=warm',
+                '--paths=/about/author/',
+                f'--output={output}',
+                stdout=io.StringIO(),
+            )
+            with open(output, encoding='utf-8') as file:
+                result = json.load(file)
+        warm = result['variants']['warm']
+        self.assertEqual(warm['requests']['/about/author/']['status'], 200)
+        self.assertGreater(warm['import_ms'], 0)
@@ -0,0 +1,25 @@
+'''Точка входа процессов пула миниатюр.
+
+Процессы пула запускаются методом spawn и импортируют этот модуль до
+``django.setup()``, поэтому Django и sorl импортируются внутри функций.
+'''
+import os
+
+
+def init():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    import django
+
+    django.setup()
+
+
+def generate(name):
+    '''Строит все миниатюры изображения из ``thumbnails.GEOMETRIES``.'''
+    from sorl.thumbnail.base import ThumbnailBackend
+
+    from .thumbnails import GEOMETRIES
+
+    backend = ThumbnailBackend()
+    for geometry, options in GEOMETRIES:
+        backend.get_thumbnail(name, geometry, **options)
+    return name
@@ -0,0 +1,132 @@
+'''Генерация миниатюр вне запроса.
+
+Шаблоны по-прежнему используют ``{% thumbnail %}``, но бэкенд
+``QueuedThumbnailBackend`` только ищет готовую миниатюру и, если её нет,
+отдаёт исходное изображение. Сами миниатюры строятся в пуле процессов
+после сохранения поста или командой ``generate_thumbnails``.
+'''
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores import cached_db_kvstore
+
+from . import thumbnail_worker
+
+logger = logging.getLogger(__name__)
+
+# Все геометрии, с которыми шаблоны вызывают {% thumbnail %}.
+GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    '''KVStore sorl без кэширования промахов.
+
+    Стандартный cached_db запоминает отсутствие миниатюры на годы, и
+    сгенерированная воркером миниатюра так и не появилась бы на сайте.
+    '''
+
+    def _get_raw(self, key):
+        value = self.cache.get(key)
+        if value is not None and value != cached_db_kvstore.EMPTY_VALUE:
+            return value
+        try:
+            value = cached_db_kvstore.KVStoreModel.objects.get(key=key).value
+        except cached_db_kvstore.KVStoreModel.DoesNotExist:
+            return None
+        self.cache.set(key, value, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        return value
+
+
+class QueuedThumbnailBackend(ThumbnailBackend):
+    '''Возвращает готовую миниатюру или исходный файл, но не рендерит.'''
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        cached = default.kvstore.get(ImageFile(name, default.storage))
+        return cached or source
+
+
+def is_ready(image):
+    '''Построены ли все миниатюры из ``GEOMETRIES`` для ``image``.'''
+    if not image:
+        return True
+    return all(
+        default.backend.get_thumbnail(image, geometry, **options).name
+        != image.name
+        for geometry, options in GEOMETRIES
+    )
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=thumbnail_worker.init,
+            )
+        return _executor
+
+
+def _done(future):
+    _pending.discard(future.name)
+    if future.exception() is not None:
+        logger.error(
+            'Не удалось построить миниатюры для %s',
+            future.name,
+            exc_info=future.exception(),
+        )
+
+
+def enqueue(name):
+    if not name or name in _pending:
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        thumbnail_worker.generate(name)
+        return
+    _pending.add(name)
+    future = _get_executor().submit(thumbnail_worker.generate, name)
+    future.name = name
+    future.add_done_callback(_done)
+
+
+def schedule(image):
+    '''Ставит генерацию миниатюр в очередь после фиксации транзакции.'''
+    if image:
+        name = image.name
+        transaction.on_commit(lambda: enqueue(name))
+
+
+def wait():
+    '''Дожидается всех поставленных задач и останавливает пул.'''
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -0,0 +1,236 @@
+'''Материализованная лента подписок (fan-out on write).
+
+Каждый новый пост раскладывается в ``TimelineEntry`` всем подписчикам
+автора, поэтому ``follow_index`` читает готовый список вместо соединения
+``Post`` с ``Follow``. Посты авторов с очень большим числом подписчиков
+(``PulledAuthor``) не раскладываются, а подмешиваются при чтении.
+
+Каждый ``TIMELINE_TRIM_EVERY``-й пост при раскладке обрезает ленты
+всех подписчиков автора до ``TIMELINE_LENGTH``, по одному DELETE на
+пачку. Поэтому лента активного читателя не растёт без предела между
+запусками ``rebuild_timelines --trim-only``.
+
+У ленты каждого читателя одно поколение ``timeline:<id>`` (см.
+``feed_cache``), по которому ``follow_index`` проверяет ETag и ключ
+списка id. Его сдвигают раскладка и обрезка, подписка и отписка, а
+посты PulledAuthor и правки постов, комментариев и групп — через
+``touch_followers``. Поэтому читатель проверяет одно поколение, сколько
+бы авторов он ни читал.
+'''
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+
+from . import counters, feed_cache
+from .models import Follow, Post, PulledAuthor, TimelineEntry, User
+
+BATCH_SIZE = 500
+
+# Ключи сортировки для CursorPaginator, см. posts_for().
+FEED_KEYS = ('feed_date', 'feed_post')
+
+
+def scope(user_id):
+    return f'timeline:{user_id}'
+
+
+def touch(user_ids):
+    '''Сдвигает поколения лент ``user_ids`` сейчас и после COMMIT.
+
+    Как ``feed_cache.invalidate``, но без прогрева: ленты подписок у
+    каждого читателя свои.
+    '''
+    scopes = [scope(user_id) for user_id in user_ids]
+    if not scopes:
+        return
+    feed_cache.bump(scopes)
+    transaction.on_commit(lambda: feed_cache.bump(scopes))
+
+
+def _followers(*author_ids):
+    # Пачками по BATCH_SIZE id, без подписок в памяти целиком.
+    followers = Follow.objects.filter(author_id__in=author_ids).values_list(
+        'user_id', flat=True
+    )
+    batch = []
+    for user_id in followers.iterator():
+        batch.append(user_id)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def touch_followers(*author_ids):
+    '''Сдвигает ленты всех подписчиков ``author_ids``.'''
+    for batch in _followers(*author_ids):
+        touch(batch)
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def _fan_out_batch(post, user_ids, trim):
+    _insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in user_ids
+    )
+    if trim:
+        trim_many(user_ids)
+    else:
+        touch(user_ids)
+
+
+def is_pulled(author_id):
+    return PulledAuthor.objects.filter(author_id=author_id).exists()
+
+
+def fan_out(post):
+    if is_pulled(post.author_id):
+        # Пост подмешивается при чтении, но ленты подписчиков всё равно
+        # изменились.
+        touch_followers(post.author_id)
+        return
+    trim = post.pk % settings.TIMELINE_TRIM_EVERY == 0
+    for batch in _followers(post.author_id):
+        _fan_out_batch(post, batch, trim)
+
+
+def follow(user_id, author_id):
+    followers = counters.stats_for(User(pk=author_id)).followers_count
+    if followers >= settings.TIMELINE_FANOUT_LIMIT:
+        PulledAuthor.objects.get_or_create(author_id=author_id)
+    if is_pulled(author_id):
+        touch([user_id])
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    )[: settings.TIMELINE_LENGTH]
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.values_list('pk', 'pub_date')
+    )
+    trim(user_id)
+
+
+def mark_pulled(author_ids=None):
+    '''Помечает PulledAuthor всех авторов сверх TIMELINE_FANOUT_LIMIT.
+
+    Нужна после массовой загрузки подписок, минующей ``follow()``.
+    ``author_ids`` ограничивает проверку этими авторами.
+    '''
+    follows = Follow.objects.all()
+    if author_ids is not None:
+        follows = follows.filter(author_id__in=author_ids)
+    authors = (
+        follows.exclude(author__pulled__isnull=False)
+        .values('author_id')
+        .annotate(followers=Count('pk'))
+        .filter(followers__gte=settings.TIMELINE_FANOUT_LIMIT)
+        .values_list('author_id', flat=True)
+        .order_by()
+    )
+    created = PulledAuthor.objects.bulk_create(
+        PulledAuthor(author_id=author_id) for author_id in authors
+    )
+    return len(created)
+
+
+def unfollow(user_id, *author_ids):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id__in=author_ids
+    ).delete()
+    touch([user_id])
+
+
+def trim(user_id):
+    entries = TimelineEntry.objects.filter(user_id=user_id).order_by(
+        '-pub_date', '-post_id'
+    )
+    boundary = entries.values_list('pub_date', 'post_id')[
+        settings.TIMELINE_LENGTH: settings.TIMELINE_LENGTH + 1
+    ]
+    for pub_date, post_id in boundary:
+        entries.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, post_id__lte=post_id)
+        ).delete()
+    touch([user_id])
+
+
+def trim_many(user_ids):
+    '''Обрезает ленты ``user_ids`` до TIMELINE_LENGTH одним DELETE.
+
+    Порядок тот же, что у ``trim``; позиция записи в ленте считается
+    оконной функцией по индексу ``timeline_user_pub_date_idx``.
+    '''
+    if not user_ids:
+        return
+    quote = connection.ops.quote_name
+    table = quote(TimelineEntry._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {quote("id")} IN ('
+            f'SELECT {quote("id")} FROM ('
+            f'SELECT {quote("id")}, ROW_NUMBER() OVER ('
+            f'PARTITION BY {quote("user_id")} ORDER BY '
+            f'{quote("pub_date")} DESC, {quote("post_id")} DESC'
+            f') AS position FROM {table} '
+            f'WHERE {quote("user_id")} IN ({placeholders})'
+            f') AS ranked WHERE position > %s)',
+            (*user_ids, settings.TIMELINE_LENGTH),
+        )
+    touch(user_ids)
+
+
+@transaction.atomic
+def rebuild(user_id):
+    # В одной транзакции читатель не увидит ленту пустой. Записи
+    # вставляются одним INSERT ... SELECT, без моделей в памяти.
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(user_id=user_id).exclude(
+        author__pulled__isnull=False
+    )
+    posts = Post.objects.filter(author__in=authors.values('author')).order_by(
+        '-pub_date', '-id'
+    )[: settings.TIMELINE_LENGTH]
+    query = posts.values_list('pk', 'pub_date').query
+    select, params = query.sql_with_params()
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(TimelineEntry._meta.db_table)} '
+            f'({quote("user_id")}, {quote("post_id")}, {quote("pub_date")}) '
+            f'SELECT %s, * FROM ({select}) AS latest',
+            (user_id, *params),
+        )
+    touch([user_id])
+
+
+def posts_for(user):
+    '''Посты ленты подписок: разложенные записи плюс посты PulledAuthor.
+
+    Посты аннотированы ``feed_date`` и ``feed_post`` (это их pub_date и
+    id), и сортировать ленту нужно по ним (``FEED_KEYS``). Пока читатель
+    не подписан на PulledAuthor, аннотации берутся из ``TimelineEntry``,
+    и страница читается по индексу ``timeline_user_pub_date_idx`` без
+    сортировки. Иначе выборка объединяет два источника через OR и
+    сортируется по полям поста.
+    '''
+    pulled = PulledAuthor.objects.filter(
+        author__following__user=user
+    ).values('author_id')
+    if not pulled.exists():
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post'),
+        )
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author__in=pulled)
+    ).annotate(feed_date=F('pub_date'), feed_post=F('id'))
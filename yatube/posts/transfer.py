@@ -0,0 +1,300 @@
+'''Потоковый перенос данных между окружениями в формате JSONL.
+
+Каждая строка файла — ``{"model": ..., "pk": ..., "fields": {...}}``.
+Модели идут в порядке зависимостей: пользователи, группы, посты,
+комментарии, подписки. В отличие от ``dumpdata``/``loaddata`` ни экспорт,
+ни импорт не держат в памяти больше одной пачки строк.
+
+Импорт назначает строкам первичные ключи ``старый pk + смещение``, где
+смещение — максимальный pk таблицы на момент начала импорта. Поэтому
+внешние ключи пересчитываются арифметикой, а не словарём на миллионы
+записей, а повтор пачки после сбоя ничего не дублирует. Пользователи и
+группы, уже существующие в базе (по username и slug), не создаются
+заново: на них ссылаются через небольшой словарь соответствий.
+'''
+import contextlib
+import datetime
+import gzip
+import json
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from . import feed_cache, feed_ids, markup, page_cache
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class Spec:
+    def __init__(self, model, fields, foreign_keys=None, natural_key=None,
+                 prepare=None):
+        self.model = model
+        self.fields = fields
+        self.foreign_keys = foreign_keys or {}
+        self.natural_key = natural_key
+        # Заполняет поля, которые не переносятся, а вычисляются при
+        # записи: bulk_create минует сигналы.
+        self.prepare = prepare
+
+
+SPECS = {
+    'user': Spec(
+        User,
+        (
+            'username', 'first_name', 'last_name', 'email', 'password',
+            'is_staff', 'is_active', 'is_superuser', 'last_login',
+            'date_joined',
+        ),
+        natural_key='username',
+    ),
+    'group': Spec(
+        Group, ('title', 'slug', 'description'), natural_key='slug'
+    ),
+    'post': Spec(
+        Post,
+        ('text', 'pub_date', 'author_id', 'group_id', 'image',
+         'comment_count'),
+        foreign_keys={'author_id': 'user', 'group_id': 'group'},
+        prepare=markup.fill,
+    ),
+    'comment': Spec(
+        Comment,
+        ('text', 'created', 'author_id', 'post_id'),
+        foreign_keys={'author_id': 'user', 'post_id': 'post'},
+        prepare=markup.fill,
+    ),
+    'follow': Spec(
+        Follow,
+        ('user_id', 'author_id'),
+        foreign_keys={'user_id': 'user', 'author_id': 'user'},
+    ),
+}
+
+
+def open_file(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def encode(value):
+    # DjangoJSONEncoder обрезает время до миллисекунд.
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def rate(rows, seconds):
+    per_second = rows / seconds if seconds else 0
+    return f'{rows} строк за {seconds:.1f} с ({per_second:.0f} строк/с)'
+
+
+def export(stream, chunk_size, report):
+    '''Пишет все модели в ``stream`` и сообщает скорость через ``report``.'''
+    total, started = 0, time.perf_counter()
+    for label, spec in SPECS.items():
+        rows, model_started = 0, time.perf_counter()
+        queryset = (
+            spec.model.objects.order_by('pk')
+            .values_list('pk', *spec.fields)
+            .iterator(chunk_size=chunk_size)
+        )
+        for pk, *values in queryset:
+            record = {
+                'model': label,
+                'pk': pk,
+                'fields': dict(zip(spec.fields, values)),
+            }
+            stream.write(
+                json.dumps(record, default=encode, ensure_ascii=False) + '\n'
+            )
+            rows += 1
+        report(f'{label}: {rate(rows, time.perf_counter() - model_started)}')
+        total += rows
+    report(f'Всего: {rate(total, time.perf_counter() - started)}')
+
+
+@contextlib.contextmanager
+def keep_auto_now():
+    '''Не даёт auto_now_add затереть даты, пришедшие из файла.'''
+    fields = [
+        field
+        for spec in SPECS.values()
+        for field in spec.model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def invalidate_feeds(author_ids):
+    '''Сбрасывает кэш лент после загрузки в обход сигналов.
+
+    ``bulk_create`` сигналов не вызывает, поэтому главная, ленты всех
+    групп и профили ``author_ids`` сбрасываются разом: фрагменты, списки
+    id и целые страницы анонимных читателей.
+    '''
+    groups = Group.objects.values_list('pk', flat=True)
+    scopes = [
+        'index',
+        *(f'group:{pk}' for pk in groups),
+        *(f'profile:{pk}' for pk in author_ids),
+    ]
+    feed_cache.invalidate(*scopes)
+    feed_ids.forget(*scopes)
+    page_cache.purge(
+        *(f'feed:{scope}' for scope in scopes),
+        *(f'user:{pk}' for pk in author_ids),
+    )
+
+
+class Importer:
+    '''Импорт JSONL пачками с контрольной точкой после каждой пачки.
+
+    Контрольная точка — JSON рядом с входным файлом: номер следующей
+    строки, смещения первичных ключей и словари соответствий для уже
+    существовавших пользователей и групп. Её удаляют после успешного
+    завершения.
+    '''
+
+    def __init__(
+        self, path, batch_size, checkpoint=None, restart=False, report=print
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint or f'{path}.checkpoint'
+        self.report = report
+        if restart and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        self.state = self.load_state()
+        self.rows = {}
+
+    def load_state(self):
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint, encoding='utf-8') as file:
+                return json.load(file)
+        return {
+            'line': 0,
+            'offsets': {
+                label: self.max_pk(spec.model)
+                for label, spec in SPECS.items()
+            },
+            'remap': {label: {} for label in SPECS},
+        }
+
+    @staticmethod
+    def max_pk(model):
+        last = model.objects.order_by('-pk').values_list('pk', flat=True)
+        return last.first() or 0
+
+    @property
+    def resumed_from(self):
+        return self.state['line']
+
+    def merged(self, label):
+        '''Первичные ключи существовавших строк, к которым шёл импорт.'''
+        return set(self.state['remap'][label].values())
+
+    def save_state(self):
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.state, file)
+        os.replace(temporary, self.checkpoint)
+
+    def new_pk(self, label, old_pk):
+        remapped = self.state['remap'][label].get(str(old_pk))
+        if remapped is not None:
+            return remapped
+        return old_pk + self.state['offsets'][label]
+
+    def run(self):
+        started = time.perf_counter()
+        label, batch, line = None, [], 0
+        with keep_auto_now(), open_file(self.path, 'r') as file:
+            for line, raw in enumerate(file, start=1):
+                if line <= self.state['line']:
+                    continue
+                record = json.loads(raw)
+                if record['model'] != label:
+                    self.flush(label, batch, line - 1)
+                    self.model_done(label)
+                    label, batch = record['model'], []
+                    self.rows[label] = (0, time.perf_counter())
+                elif len(batch) >= self.batch_size:
+                    self.flush(label, batch, line - 1)
+                    batch = []
+                batch.append(record)
+            self.flush(label, batch, line)
+            self.model_done(label)
+        self.finish()
+        total = sum(rows for rows, _ in self.rows.values())
+        self.report(f'Всего: {rate(total, time.perf_counter() - started)}')
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def model_done(self, label):
+        if label is not None:
+            rows, model_started = self.rows[label]
+            self.report(
+                f'{label}: {rate(rows, time.perf_counter() - model_started)}'
+            )
+
+    def flush(self, label, batch, line):
+        if not batch:
+            return
+        with transaction.atomic():
+            self.insert(label, batch)
+        rows, model_started = self.rows[label]
+        self.rows[label] = (rows + len(batch), model_started)
+        self.state['line'] = line
+        self.save_state()
+
+    def insert(self, label, batch):
+        spec = SPECS[label]
+        if spec.natural_key:
+            batch = self.skip_existing(label, spec, batch)
+        objects = []
+        for record in batch:
+            fields = record['fields']
+            for field, target in spec.foreign_keys.items():
+                if fields.get(field) is not None:
+                    fields[field] = self.new_pk(target, fields[field])
+            objects.append(
+                spec.model(pk=self.new_pk(label, record['pk']), **fields)
+            )
+        if spec.prepare:
+            spec.prepare(objects)
+        spec.model.objects.bulk_create(objects, ignore_conflicts=True)
+
+    def skip_existing(self, label, spec, batch):
+        keys = [record['fields'][spec.natural_key] for record in batch]
+        existing = dict(
+            spec.model.objects.filter(
+                **{f'{spec.natural_key}__in': keys}
+            ).values_list(spec.natural_key, 'pk')
+        )
+        fresh = []
+        for record in batch:
+            pk = existing.get(record['fields'][spec.natural_key])
+            if pk is None:
+                fresh.append(record)
+            elif pk != self.new_pk(label, record['pk']):
+                self.state['remap'][label][str(record['pk'])] = pk
+        return fresh
+
+    def finish(self):
+        models = [spec.model for spec in SPECS.values()]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
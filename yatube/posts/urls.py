@@ -6,6 +6,7 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('new/', views.new_post, name='new_post'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search_posts, name='search'),
     path(
         '<str:username>/follow/', views.profile_follow, name='profile_follow'
     ),
@@ -16,6 +17,11 @@ urlpatterns = [
     ),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path(
+        '<str:username>/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path(
         '<str:username>/<int:post_id>/edit/', views.post_edit, name='post_edit'
     ),
@@ -1,46 +1,83 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_http_methods, require_GET
 
+from yatube import db_router
+
+from . import (
+    conditional,
+    counters,
+    feed_cache,
+    feed_ids,
+    follows,
+    page_cache,
+    search,
+    thumbnails,
+    timeline,
+)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Group, Post, User
+from .paginator import (
+    CursorPaginator,
+    get_page,
+    paginate,
+    paginate_lazily,
+)
 
 
 @require_GET
+@conditional.condition(conditional.group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
 
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate_lazily(
+        request,
+        posts,
+        settings.POSTS_PER_PAGE,
+        paginator=feed_ids.FeedPaginator,
+        ids_key=feed_ids.list_key(f'group:{group.pk}'),
+        count=lambda: counters.feed_count(f'group:{group.pk}'),
+    )
 
-    return render(
+    response = render(
         request,
         'posts/group.html',
         {
             'group': group,
             'page': page,
+            'feed': feed_cache.Fragment(request, f'group:{group.pk}'),
         },
     )
+    return page_cache.tag(
+        response, f'feed:group:{group.pk}', f'group:{group.pk}', posts=page
+    )
 
 
 @require_GET
+@conditional.condition(conditional.index_scopes)
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_feed()
 
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate_lazily(
+        request,
+        post_list,
+        settings.POSTS_PER_PAGE,
+        paginator=feed_ids.FeedPaginator,
+        ids_key=feed_ids.list_key('index'),
+        count=lambda: counters.feed_count('index'),
+    )
 
-    return render(
+    response = render(
         request,
         'index.html',
         {
             'page': page,
+            'feed': feed_cache.Fragment(request, 'index'),
         },
     )
+    return page_cache.tag(response, 'feed:index', posts=page)
 
 
 @require_http_methods(['GET', 'POST'])
@@ -60,42 +97,51 @@ def new_post(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    thumbnails.schedule(post.image)
     return redirect('index')
 
 
 @require_GET
+@conditional.condition(conditional.profile_scopes)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.filter(author=author)
+    posts = author.posts.for_feed()
 
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    count_post = posts.count()
+    stats = counters.stats_for(author)
+    page = paginate_lazily(
+        request,
+        posts,
+        settings.POSTS_PER_PAGE,
+        paginator=feed_ids.FeedPaginator,
+        ids_key=feed_ids.list_key(f'profile:{author.pk}'),
+        count=stats.posts_count,
+    )
 
-    if request.user.is_authenticated:
-        following = request.user.follower.filter(author=author).exists()
-    else:
-        following = False
+    following = follows.is_following(request.user, author.pk)
 
-    return render(
+    response = render(
         request,
         'profile.html',
         {
             'page': page,
             'author': author,
-            'count_post': count_post,
+            'stats': stats,
             'following': following,
+            'feed': feed_cache.Fragment(request, f'profile:{author.pk}'),
         },
     )
+    return page_cache.tag(
+        response, f'feed:profile:{author.pk}', f'user:{author.pk}', posts=page
+    )
 
 
 @require_GET
+@conditional.condition(conditional.post_scopes)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    comments = get_page(request, comment_paginator(post_id))
     author = post.author
-    post_count = author.posts.count()
+    post_count = counters.stats_for(author).posts_count
     form = CommentForm(request.POST or None)
 
     context = {
@@ -106,7 +152,29 @@ def post_view(request, username, post_id):
         'post_id': post_id,
         'form': form,
     }
-    return render(request, 'posts/post_view.html', context)
+    response = render(request, 'posts/post_view.html', context)
+    return page_cache.tag(response, f'user:{author.pk}', posts=[post])
+
+
+@require_GET
+def post_comments(request, username, post_id):
+    '''Следующая страница комментариев HTML-фрагментом для подгрузки.'''
+    post = get_object_or_404(Post.objects.select_related('author'), pk=post_id)
+    comments = get_page(request, comment_paginator(post_id))
+    response = render(
+        request,
+        'posts/comment_list.html',
+        {'post': post, 'comments': comments},
+    )
+    return page_cache.tag(response, f'post:{post.pk}')
+
+
+def comment_paginator(post_id):
+    return CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        keys=('created', 'id'),
+    )
 
 
 @require_http_methods(['GET', 'POST'])
@@ -134,7 +202,9 @@ def post_edit(request, username, post_id):
             },
         )
 
-    form.save()
+    post = form.save()
+    if 'image' in form.changed_data:
+        thumbnails.schedule(post.image)
     return redirect('post', username, post_id)
 
 
@@ -157,12 +227,18 @@ def add_comment(request, username, post_id):
 
 @require_GET
 @login_required
+@conditional.condition(conditional.follow_scopes)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = timeline.posts_for(request.user).for_feed()
 
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(
+        request,
+        post_list,
+        settings.POSTS_PER_PAGE,
+        paginator=feed_ids.FeedPaginator,
+        ids_key=feed_ids.follow_key(request.user.pk, request.generations),
+        keys=timeline.FEED_KEYS,
+    )
 
     return render(
         request,
@@ -173,28 +249,43 @@ def follow_index(request):
     )
 
 
+@db_router.use_primary
 @require_GET
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-
-    if request.user != author:
-        try:
-            Follow.objects.get(
-                user=request.user, author=author
-            )
-        except Follow.DoesNotExist:
-            Follow.objects.create(user=request.user, author=author)
+    follows.follow(request.user.pk, author.pk)
 
     return redirect('profile', username=username)
 
 
+@db_router.use_primary
 @require_GET
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(
-        user=request.user, author=author
-    ).delete()
+    follows.unfollow(request.user.pk, author.pk)
 
     return redirect('profile', username=username)
+
+
+@require_GET
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    if search.is_available():
+        paginator = search.SearchPaginator(query, settings.POSTS_PER_PAGE)
+    else:
+        paginator = CursorPaginator(
+            search.filter_posts(Post.objects.for_feed(), query),
+            settings.POSTS_PER_PAGE,
+        )
+    page = get_page(request, paginator)
+
+    return render(
+        request,
+        'posts/search.html',
+        {
+            'page': page,
+            'query': query,
+        },
+    )
@@ -0,0 +1,74 @@
+'''SQLite-бэкенд с настройками для продакшена.
+
+Отличия от ``django.db.backends.sqlite3``:
+
+* каждое новое соединение выполняет ``PRAGMA`` из ``OPTIONS['pragmas']``
+  (WAL, synchronous=NORMAL, busy_timeout, mmap_size, cache_size);
+* ``transaction.atomic`` начинает транзакцию с ``BEGIN IMMEDIATE``
+  (``OPTIONS['transaction_mode']``). Отложенная транзакция, которая
+  сначала читает, а потом пишет, при конкурирующей записи получает
+  «database is locked» сразу, не дожидаясь busy_timeout;
+* не чаще раза в ``OPTIONS['maintenance_interval']`` секунд соединение
+  после запроса выполняет ``PRAGMA optimize`` и пассивный checkpoint
+  WAL. Полный checkpoint с обрезкой журнала делает команда
+  ``sqlite_maintenance``.
+'''
+import time
+
+from django.db.backends.sqlite3 import base
+
+BACKEND_OPTIONS = ('pragmas', 'transaction_mode', 'maintenance_interval')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.maintained_at = time.monotonic()
+
+    @property
+    def backend_options(self):
+        options = self.settings_dict['OPTIONS']
+        return {
+            'pragmas': options.get('pragmas', {}),
+            'transaction_mode': options.get('transaction_mode', 'DEFERRED'),
+            'maintenance_interval': options.get('maintenance_interval'),
+        }
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in BACKEND_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.backend_options['pragmas'].items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.backend_options['transaction_mode']
+        self.cursor().execute(f'BEGIN {mode}')
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        interval = self.backend_options['maintenance_interval']
+        if (
+            interval is not None
+            and self.connection is not None
+            and not self.in_atomic_block
+            and time.monotonic() - self.maintained_at >= interval
+        ):
+            self.maintain()
+
+    def maintain(self, checkpoint='PASSIVE'):
+        '''``PRAGMA optimize`` и checkpoint WAL.
+
+        Возвращает результат checkpoint: флаг занятости, число страниц
+        в журнале и число перенесённых в базу страниц.
+        '''
+        self.maintained_at = time.monotonic()
+        with self.cursor() as cursor:
+            cursor.execute('PRAGMA optimize')
+            cursor.execute(f'PRAGMA wal_checkpoint({checkpoint})')
+            return cursor.fetchone()
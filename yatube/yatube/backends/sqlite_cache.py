@@ -0,0 +1,338 @@
+'''Кэш в файле SQLite, общий для всех процессов на сервере.
+
+В отличие от ``LocMemCache`` у воркеров gunicorn один кэш на всех:
+поколение ленты, сброшенное в одном процессе, сразу видят остальные,
+и данные не дублируются в памяти каждого воркера. Файл открыт в режиме
+WAL, поэтому чтения не ждут записей.
+
+* Целые числа хранятся как INTEGER, а не в pickle, и ``incr`` — один
+  атомарный ``UPDATE ... RETURNING``. ``RETURNING`` появился в SQLite
+  3.35; в более старых версиях ``incr`` читает и записывает значение
+  под блокировкой ``BEGIN IMMEDIATE``, что тоже атомарно, но дольше.
+* ``get_many`` и ``set_many`` — один запрос и одна транзакция на пачку
+  ключей.
+* Объём ограничен ``OPTIONS['MAX_BYTES']``: при превышении удаляются
+  истёкшие записи, а затем давно не читанные (LRU), пока кэш не
+  уменьшится до ``CULL_TARGET`` от бюджета. Время чтения обновляется не
+  чаще раза в ``OPTIONS['TOUCH_INTERVAL']`` секунд, чтобы горячие ключи
+  не превращали каждое чтение в запись.
+
+``MAX_ENTRIES`` и ``CULL_FREQUENCY`` не используются. Нужен SQLite не
+старше 3.25 (``ON CONFLICT ... DO UPDATE`` и оконные функции).
+'''
+import contextlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT NOT NULL UNIQUE,
+    value BLOB NOT NULL,
+    expires REAL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    total INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_size VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_inserted AFTER INSERT ON cache BEGIN
+    UPDATE cache_size SET total = total + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_deleted AFTER DELETE ON cache BEGIN
+    UPDATE cache_size SET total = total - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_resized AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE cache_size SET total = total - old.size + new.size;
+END;
+'''
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 64 * 1024 * 1024,
+}
+
+UPSERT = (
+    'INSERT INTO cache (key, value, expires, size, accessed) '
+    'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, expires = excluded.expires, '
+    'size = excluded.size, accessed = excluded.accessed'
+)
+
+# Пачка ключей в одном IN (...): меньше лимита переменных SQLite.
+BATCH_SIZE = 500
+
+# До какой доли MAX_BYTES кэш сжимается при вытеснении.
+CULL_TARGET = 0.9
+
+# Примерный размер служебных полей строки, в байтах.
+ROW_OVERHEAD = 32
+
+INT_RANGE = range(-2 ** 63, 2 ** 63)
+
+# Первая версия SQLite с UPDATE ... RETURNING.
+RETURNING_VERSION = (3, 35, 0)
+
+
+def encode(value):
+    if type(value) is int and value in INT_RANGE:
+        return value, 8
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return data, len(data)
+
+
+def decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+def chunks(values):
+    for start in range(0, len(values), BATCH_SIZE):
+        yield values[start: start + BATCH_SIZE]
+
+
+def placeholders(values):
+    return ', '.join('?' * len(values))
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.max_bytes = options.get('MAX_BYTES', 64 * 1024 * 1024)
+        self.touch_interval = options.get('TOUCH_INTERVAL', 30)
+        self.busy_timeout = options.get('BUSY_TIMEOUT', 5)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        # Соединение своё у каждого потока; после fork процесс-потомок
+        # открывает новое, а не делит соединение родителя.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = self.connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    def connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        for name, value in PRAGMAS.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        connection.executescript(SCHEMA)
+        return connection
+
+    @contextlib.contextmanager
+    def transaction(self):
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _touch(self, rows, now):
+        # Приближённый LRU: время чтения обновляется, только если оно
+        # устарело больше чем на touch_interval.
+        stale = [
+            key for key, accessed in rows
+            if accessed < now - self.touch_interval
+        ]
+        if stale:
+            self.connection.execute(
+                f'UPDATE cache SET accessed = ? '
+                f'WHERE key IN ({placeholders(stale)})',
+                [now, *stale],
+            )
+
+    def _fetch(self, keys):
+        now = time.time()
+        found = {}
+        for chunk in chunks(keys):
+            rows = self.connection.execute(
+                f'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({placeholders(chunk)})',
+                chunk,
+            ).fetchall()
+            fresh = [
+                row for row in rows if row[2] is None or row[2] > now
+            ]
+            found.update((key, value) for key, value, _, _ in fresh)
+            self._touch([(row[0], row[3]) for row in fresh], now)
+        return found
+
+    def _store(self, connection, items, timeout):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = []
+        for key, value in items:
+            data, size = encode(value)
+            rows.append(
+                (key, data, expires, size + len(key) + ROW_OVERHEAD, now)
+            )
+        connection.executemany(UPSERT, rows)
+        self._cull(connection, now)
+
+    def _cull(self, connection, now):
+        total = self._total(connection)
+        if total <= self.max_bytes:
+            return
+        connection.execute('DELETE FROM cache WHERE expires <= ?', [now])
+        excess = self._total(connection) - self.max_bytes * CULL_TARGET
+        if excess <= 0:
+            return
+        # Самые давно читанные записи, пока их суммарный размер не
+        # покроет превышение: одним запросом по индексу cache_accessed.
+        connection.execute(
+            'DELETE FROM cache WHERE rowid IN ('
+            'SELECT rowid FROM (SELECT rowid, size, SUM(size) OVER '
+            '(ORDER BY accessed, rowid) AS running FROM cache) '
+            'WHERE running - size < ?)',
+            [excess],
+        )
+
+    @staticmethod
+    def _total(connection):
+        return connection.execute(
+            'SELECT total FROM cache_size'
+        ).fetchone()[0]
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        found = self._fetch([key])
+        if key not in found:
+            return default
+        return decode(found[key])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(keys))
+        return {keys[key]: decode(value) for key, value in found.items()}
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return key in self._fetch([key])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self.transaction() as connection:
+            self._store(connection, [(key, value)], timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [
+            (self._key(key, version), value) for key, value in data.items()
+        ]
+        with self.transaction() as connection:
+            self._store(connection, items, timeout)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        data, size = encode(value)
+        now = time.time()
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                UPSERT + ' WHERE cache.expires <= ?',
+                [
+                    key,
+                    data,
+                    self.get_backend_timeout(timeout),
+                    size + len(key) + ROW_OVERHEAD,
+                    now,
+                    now,
+                ],
+            )
+            added = cursor.rowcount > 0
+            if added:
+                self._cull(connection, now)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        if sqlite3.sqlite_version_info >= RETURNING_VERSION:
+            # fetchall, а не fetchone: оператор с RETURNING должен
+            # завершиться, иначе он держит блокировку записи.
+            rows = self.connection.execute(
+                'UPDATE cache SET value = value + ? '
+                'WHERE key = ? AND typeof(value) = \'integer\' '
+                'AND (expires IS NULL OR expires > ?) RETURNING value',
+                [delta, key, now],
+            ).fetchall()
+            if rows:
+                return rows[0][0]
+        # Старый SQLite или значение не INTEGER (например, огромное
+        # число в pickle): под блокировкой записи читаем, складываем и
+        # записываем.
+        with self.transaction() as connection:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                [key, now],
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = decode(row[0]) + delta
+            data, size = encode(value)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                [data, size + len(key) + ROW_OVERHEAD, key],
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self.connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), key, time.time()],
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        cursor = self.connection.execute(
+            'DELETE FROM cache WHERE key = ?', [self._key(key, version)]
+        )
+        return cursor.rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self.transaction() as connection:
+            for chunk in chunks(keys):
+                connection.execute(
+                    f'DELETE FROM cache WHERE key IN ({placeholders(chunk)})',
+                    chunk,
+                )
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Django закрывает кэши после каждого запроса; соединение с
+        # файлом дешевле держать открытым, как CONN_MAX_AGE у базы.
+        pass
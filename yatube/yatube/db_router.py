@@ -0,0 +1,126 @@
+'''Чтение с реплик и запись в основную базу с read-your-writes.
+
+``ReplicaMiddleware`` выбирает для запроса реплику из
+``DATABASE_REPLICAS``, и ``ReplicaRouter`` отправляет на неё чтения.
+Запись всегда идёт в ``default``. На основную базу читают, если:
+
+* метод запроса не GET/HEAD;
+* представление помечено ``use_primary`` (GET-представления, которые
+  пишут, например подписка);
+* в этом запросе уже была запись;
+* пользователь писал в последние ``PRIMARY_STICKINESS_SECONDS`` секунд.
+  Отметка хранится в сессии, поэтому сессии всегда читают из основной
+  базы.
+
+Вне запросов (команды, воркеры) все чтения идут в ``default``.
+Локальные реплики — копии SQLite-базы, которые обновляет
+``sync_replica`` (команда ``sync_replicas``). Между синхронизациями они
+отстают от основной базы так же, как настоящие реплики, а команда после
+синхронизации сдвигает поколение реплик ``feed_cache.REPLICA_SCOPE``:
+кэш, заполненный с отставшей копии, перестаёт отдаваться.
+'''
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_SESSION_KEY = '_primary_until'
+
+# Приложения, которые читают только из основной базы.
+PRIMARY_APPS = ('sessions',)
+
+_state = threading.local()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if getattr(_state, 'wrote', False):
+            return DEFAULT_DB_ALIAS
+        return getattr(_state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def use_primary(view):
+    '''Помечает представление, которое читает только из основной базы.'''
+    view.use_primary = True
+    return view
+
+
+def is_pinned(request):
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    return session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+def pin(request):
+    request.session[PIN_SESSION_KEY] = (
+        time.time() + settings.PRIMARY_STICKINESS_SECONDS
+    )
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replica = self.choose_replica(request)
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.replica = None
+            _state.wrote = False
+        user = getattr(request, 'user', None)
+        if wrote and user is not None and user.is_authenticated:
+            pin(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'use_primary', False):
+            _state.replica = None
+
+    @staticmethod
+    def choose_replica(request):
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method not in ('GET', 'HEAD')
+            or is_pinned(request)
+        ):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+
+def sync_replica(alias):
+    '''Копирует основную SQLite-базу в реплику ``alias``.
+
+    Используется онлайн-бэкап SQLite: копия согласована, даже если в
+    основную базу в это время пишут.
+    '''
+    primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+    for connection in (primary, replica):
+        if connection.vendor != 'sqlite':
+            raise ValueError(
+                f'{connection.alias}: копирование поддерживается только '
+                f'для SQLite'
+            )
+        connection.ensure_connection()
+    primary.connection.backup(replica.connection)
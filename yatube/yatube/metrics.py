@@ -0,0 +1,270 @@
+'''Лёгкая инструментация запросов в формате Prometheus.
+
+``MetricsMiddleware`` измеряет время ответа, число запросов к БД, время
+в БД и время рендеринга шаблонов и раскладывает их по имени URL
+(``index``, ``profile``, ``post``…). Время в БД собирает обёртка
+``execute_wrappers``, время шаблонов — бэкенд ``DjangoTemplates``.
+Кэш страниц считает попадания и промахи в ``PAGE_CACHE``.
+Запросы дольше ``METRICS_SLOW_QUERY_MS`` пишутся в логгер
+``yatube.slow_queries`` вместе с отпечатком SQL.
+
+Метрики хранятся в памяти процесса; каждый воркер отдаёт свои, а
+суммирует их сервер Prometheus.
+'''
+import bisect
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+from django.template.exceptions import TemplateDoesNotExist
+
+slow_query_logger = logging.getLogger('yatube.slow_queries')
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_lock = threading.Lock()
+_state = threading.local()
+
+
+def _format_labels(names, values):
+    pairs = (
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'),
+        )
+        for name, value in zip(names, values)
+    )
+    return ','.join(pairs)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield self.name, _format_labels(self.labels, labels), value
+
+
+class Histogram(Counter):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels, buckets):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [
+                    [0] * (len(self.buckets) + 1), 0, 0
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        bounds = [*map(str, self.buckets), '+Inf']
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            label_text = _format_labels(self.labels, labels)
+            cumulative = 0
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                yield (
+                    f'{self.name}_bucket',
+                    ','.join(filter(None, (label_text, f'le="{bound}"'))),
+                    cumulative,
+                )
+            yield f'{self.name}_sum', label_text, total
+            yield f'{self.name}_count', label_text, count
+
+
+REQUESTS = Counter(
+    'yatube_requests_total', 'Обработанные запросы', ('view', 'status')
+)
+LATENCY = Histogram(
+    'yatube_request_duration_seconds',
+    'Время ответа',
+    ('view',),
+    LATENCY_BUCKETS,
+)
+QUERIES = Histogram(
+    'yatube_request_db_queries',
+    'Запросов к БД на один ответ',
+    ('view',),
+    QUERY_BUCKETS,
+)
+DB_TIME = Counter(
+    'yatube_db_seconds_total', 'Время выполнения SQL', ('view',)
+)
+TEMPLATE_TIME = Counter(
+    'yatube_template_seconds_total', 'Время рендеринга шаблонов', ('view',)
+)
+SLOW_QUERIES = Counter(
+    'yatube_slow_queries_total', 'Запросы дольше порога', ('view',)
+)
+PAGE_CACHE = Counter(
+    'yatube_page_cache_requests_total',
+    'Обращения к кэшу страниц: hit или miss',
+    ('view', 'result'),
+)
+METRICS = (
+    REQUESTS, LATENCY, QUERIES, DB_TIME, TEMPLATE_TIME, SLOW_QUERIES,
+    PAGE_CACHE,
+)
+
+
+def expose():
+    '''Все метрики в текстовом формате Prometheus 0.0.4.'''
+    lines = []
+    with _lock:
+        for metric in METRICS:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                if labels:
+                    name = f'{name}{{{labels}}}'
+                lines.append(f'{name} {value}')
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def reset():
+    with _lock:
+        for metric in METRICS:
+            metric.values.clear()
+
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+
+
+def fingerprint(sql):
+    '''Нормализованный SQL и короткий хеш для группировки запросов.
+
+    Литералы и списки ``IN (%s, %s, ...)`` любой длины сворачиваются,
+    поэтому запросы, отличающиеся только параметрами, совпадают.
+    '''
+    normalized = _LITERAL_RE.sub('?', sql)
+    normalized = _PLACEHOLDERS_RE.sub('(?)', normalized.replace('%s', '?'))
+    normalized = ' '.join(normalized.split())
+    digest = hashlib.md5(normalized.encode()).hexdigest()[:12]
+    return digest, normalized
+
+
+def _view():
+    return getattr(_state, 'view', None)
+
+
+def record_page_cache(view, result):
+    # Попадание в кэш страниц не доходит до разрешения URL, поэтому имя
+    # представления для остальных метрик берётся из сохранённой записи.
+    _state.view = view
+    PAGE_CACHE.inc((view, result))
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        if getattr(_state, 'active', False):
+            _state.queries += 1
+            _state.db_time += elapsed
+        if elapsed * 1000 >= settings.METRICS_SLOW_QUERY_MS:
+            digest, normalized = fingerprint(sql)
+            view = _view() or '-'
+            SLOW_QUERIES.inc((view,))
+            slow_query_logger.warning(
+                'slow query %.1f ms view=%s fingerprint=%s %s',
+                elapsed * 1000,
+                view,
+                digest,
+                normalized,
+            )
+
+
+def install(connection, **kwargs):
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        if not getattr(_state, 'active', False):
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            _state.template_time += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    '''Стандартный бэкенд шаблонов, который учитывает время рендеринга.'''
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        connection_created.connect(install, dispatch_uid='yatube.metrics')
+        for connection in connections.all():
+            install(connection)
+
+    def __call__(self, request):
+        _state.active = True
+        _state.view = None
+        _state.queries = 0
+        _state.db_time = 0.0
+        _state.template_time = 0.0
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.active = False
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = (match.view_name if match else _view()) or 'unresolved'
+        labels = (view,)
+        REQUESTS.inc((view, response.status_code))
+        LATENCY.observe(labels, elapsed)
+        QUERIES.observe(labels, _state.queries)
+        DB_TIME.inc(labels, _state.db_time)
+        TEMPLATE_TIME.inc(labels, _state.template_time)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Имя URL известно только после разрешения адреса, а медленные
+        # запросы из представления должны логироваться уже с ним.
+        _state.view = request.resolver_match.view_name
@@ -46,12 +46,16 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
+    'rest_framework',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
+    'posts.page_cache.PageCacheMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'yatube.db_router.ReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -69,7 +73,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -86,16 +90,60 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Прогревать ли воркер при загрузке yatube.wsgi (см. yatube.warmup);
+# включается в yatube.settings_production
+WARM_UP = False
+
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Продакшен-профиль SQLite (см. yatube/backends/sqlite3): WAL, чтобы
+# читатели не ждали писателей, BEGIN IMMEDIATE вместо «database is
+# locked» при встречной записи и периодические PRAGMA optimize и
+# checkpoint WAL. Соединения живут CONN_MAX_AGE секунд
+SQLITE_OPTIONS = {
+    'pragmas': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+    },
+    'transaction_mode': 'IMMEDIATE',
+    'maintenance_interval': 300,
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': SQLITE_OPTIONS,
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Реплики только для чтения. Локально это копии db.sqlite3, которые
+# обновляет команда sync_replicas; между синхронизациями они отстают от
+# основной базы, как настоящие реплики. Чтение идёт на реплики из
+# DATABASE_REPLICAS, а писавший пользователь PRIMARY_STICKINESS_SECONDS
+# секунд читает из основной базы
+SQLITE_REPLICAS = ('replica1', 'replica2')
+for alias in SQLITE_REPLICAS:
+    DATABASES[alias] = {
+        'ENGINE': 'yatube.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db-{alias}.sqlite3'),
+        'OPTIONS': SQLITE_OPTIONS,
+        'CONN_MAX_AGE': 600,
+    }
+
+DATABASE_REPLICAS = [
+    alias
+    for alias in os.environ.get('YATUBE_DB_REPLICAS', '').split(',')
+    if alias
+]
+DATABASE_ROUTERS = ['yatube.db_router.ReplicaRouter']
+PRIMARY_STICKINESS_SECONDS = 10
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -145,8 +193,74 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Кэш общий для всех воркеров на сервере: файл SQLite, а не память
+# процесса, поэтому сбросы поколений и страниц из одного воркера сразу
+# видны остальным
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube.backends.sqlite_cache.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_BYTES': 256 * 1024 * 1024,
+        },
     }
 }
+
+# Тесты работают со своим файлом кэша, см. yatube.test_runner
+TEST_RUNNER = 'yatube.test_runner.DiscoverRunner'
+
+# Лента подписок: сколько последних постов хранить каждому читателю,
+# с какого числа подписчиков посты автора подмешиваются при чтении и
+# каждый какой пост при раскладке обрезает ленты подписчиков
+TIMELINE_LENGTH = 1000
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_TRIM_EVERY = 50
+
+# Множества подписок читателей сбрасываются при каждой подписке и отписке
+FOLLOWS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько авторов можно передать в одном запросе массовой подписки
+FOLLOWS_BULK_LIMIT = 10000
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+# Фрагменты лент сбрасываются сигналами, поэтому могут жить долго
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Списки id лент правятся сигналами, посты, авторы и группы в кэше
+# объектов сбрасываются ими же (posts.feed_ids)
+FEED_IDS_LENGTH = 1000
+FEED_IDS_CACHE_TIMEOUT = 60 * 60
+OBJECT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Карточки постов версионируются по Post.updated и тоже живут долго
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Страницы для анонимных читателей целиком; сбрасываются по суррогатным
+# ключам, 0 отключает кэш страниц
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Миниатюры строятся в пуле процессов, а не во время рендеринга страницы;
+# при THUMBNAIL_WORKERS = 0 — сразу в текущем процессе
+THUMBNAIL_BACKEND = 'posts.thumbnails.QueuedThumbnailBackend'
+THUMBNAIL_KVSTORE = 'posts.thumbnails.KVStore'
+THUMBNAIL_WORKERS = 2
+
+# Загружаемые изображения уменьшаются до POST_IMAGE_MAX_SIDE по большей
+# стороне и перекодируются; не-JPEG больше POST_IMAGE_MAX_PIXELS
+# отклоняются, чтобы не декодировать их в память целиком
+POST_IMAGE_MAX_SIDE = 1600
+POST_IMAGE_FORMAT = 'WEBP'
+POST_IMAGE_QUALITY = 82
+POST_IMAGE_MAX_PIXELS = 30_000_000
+
+# Метрики запросов для Prometheus: /metrics/ отдаётся запросам с
+# METRICS_ALLOWED_IPS или с заголовком «Authorization: Bearer
+# <METRICS_TOKEN>» (пустой токен не принимается);
+# SQL дольше METRICS_SLOW_QUERY_MS пишется в логгер yatube.slow_queries
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+METRICS_SLOW_QUERY_MS = 100
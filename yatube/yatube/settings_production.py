@@ -0,0 +1,58 @@
+'''Настройки для воркеров gunicorn в продакшене.
+
+Отличаются от ``settings`` тем, что нужно только для разработки и
+только замедляет холодный старт воркера: выключен DEBUG, нет
+debug_toolbar с его промежуточным слоем, шаблоны компилируются один
+раз на процесс кэширующим загрузчиком. ``yatube.wsgi`` с этими
+настройками прогревает воркер (``yatube.warmup``) до первого запроса.
+Метрики за обратным прокси отдаются только по токену.
+
+    DJANGO_SETTINGS_MODULE=yatube.settings_production gunicorn yatube.wsgi
+'''
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, SECRET_KEY, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('YATUBE_SECRET_KEY', SECRET_KEY)
+
+DEV_APPS = ('debug_toolbar',)
+DEV_MIDDLEWARE = ('debug_toolbar.middleware.DebugToolbarMiddleware',)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEV_APPS]
+MIDDLEWARE = [name for name in MIDDLEWARE if name not in DEV_MIDDLEWARE]
+
+# Кэширующий загрузчик держит скомпилированные шаблоны в памяти процесса;
+# с ним APP_DIRS нельзя включать, поэтому загрузчики перечислены явно
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'context_processors': [
+                name
+                for name in TEMPLATES[0]['OPTIONS']['context_processors']
+                if name != 'django.template.context_processors.debug'
+            ],
+            'loaders': [
+                (
+                    'django.template.loaders.cached.Loader',
+                    [
+                        'django.template.loaders.filesystem.Loader',
+                        'django.template.loaders.app_directories.Loader',
+                    ],
+                ),
+            ],
+        },
+    }
+]
+
+# За локальным обратным прокси все клиенты приходят с 127.0.0.1, поэтому
+# метрики отдаются только по токену из YATUBE_METRICS_TOKEN
+METRICS_ALLOWED_IPS = []
+
+# Прогрев воркера при загрузке yatube.wsgi; YATUBE_WARM_UP=0 отключает
+WARM_UP = os.environ.get('YATUBE_WARM_UP', '1') != '0'
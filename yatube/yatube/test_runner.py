@@ -0,0 +1,35 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner as BaseDiscoverRunner
+
+
+class DiscoverRunner(BaseDiscoverRunner):
+    '''Запускает тесты с общим кэшем во временном файле.
+
+    Файловый кэш переживает процесс: без подмены тесты видели бы записи
+    прошлых прогонов и кэш запущенного рядом сервера.
+    '''
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_directory = tempfile.mkdtemp(prefix='yatube_cache_')
+        caches = {
+            alias: dict(
+                config,
+                LOCATION=os.path.join(
+                    self.cache_directory, f'{alias}.sqlite3'
+                ),
+            )
+            for alias, config in settings.CACHES.items()
+        }
+        self.cache_settings = override_settings(CACHES=caches)
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
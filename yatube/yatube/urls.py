@@ -4,6 +4,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from . import views
+
 handler404 = 'yatube.views.page_not_found'  # noqa
 handler500 = 'yatube.views.server_error'  # noqa
 
@@ -11,6 +13,8 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('admin/', admin.site.urls),
+    path('api/v1/', include('posts.api_urls')),
+    path('metrics/', views.metrics, name='metrics'),
     path('', include('posts.urls')),
     path('about/', include('about.urls', namespace='about')),
 ]
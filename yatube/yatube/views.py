@@ -1,7 +1,12 @@
+import hmac
 from http import HTTPStatus
 
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics as request_metrics
+
 
 def page_not_found(request, exception):
     return render(
@@ -16,3 +21,23 @@ def server_error(request):
     return render(
         request, 'misc/500.html', status=HTTPStatus.INTERNAL_SERVER_ERROR
     )
+
+
+def has_metrics_token(request):
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(
+        header.encode(), f'Bearer {token}'.encode()
+    )
+
+
+def metrics(request):
+    if not (
+        has_metrics_token(request)
+        or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    ):
+        raise Http404
+    return HttpResponse(
+        request_metrics.expose(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
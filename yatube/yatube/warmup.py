@@ -0,0 +1,99 @@
+'''Прогрев воркера до первого запроса.
+
+Без него первые запросы каждого нового воркера платят за компиляцию
+шаблонов, построение таблиц URL, импорт модулей представлений и
+открытие соединений с базой и кэшем. ``run`` делает всё это заранее:
+
+* компилирует каждый шаблон из ``TEMPLATES_DIR`` (кэширующий загрузчик
+  ``settings_production`` оставляет их в памяти, а ``{% load %}``
+  заодно импортирует библиотеки тегов вроде ``sorl.thumbnail``);
+* строит таблицы разрешения и обращения URL для всех пространств имён;
+* открывает соединение с кэшем и перерисовывает первую страницу
+  главной ленты, если её нет в кэше.
+
+Ошибка на любом шаге пишется в лог и не мешает воркеру стартовать.
+В конце соединения с базой закрываются: при ``gunicorn --preload``
+прогрев идёт в мастере, и потомки не должны делить его соединения.
+'''
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connections
+from django.template import engines
+from django.urls import URLResolver, get_resolver
+
+from posts import feed_cache
+
+logger = logging.getLogger(__name__)
+
+
+def templates():
+    '''Имена всех шаблонов из ``TEMPLATES_DIR``.'''
+    names = []
+    for root, _, files in os.walk(settings.TEMPLATES_DIR):
+        for file in files:
+            if file.endswith('.html'):
+                path = os.path.join(root, file)
+                names.append(
+                    os.path.relpath(path, settings.TEMPLATES_DIR).replace(
+                        os.sep, '/'
+                    )
+                )
+    return sorted(names)
+
+
+def compile_templates():
+    names = templates()
+    for engine in engines.all():
+        for name in names:
+            engine.get_template(name)
+    return len(names)
+
+
+def resolve_urls(resolver=None):
+    '''Заполняет таблицы URL ``resolver`` и всех вложенных в него.'''
+    resolver = resolver or get_resolver()
+    # reverse_dict строит таблицы обращения и регулярные выражения
+    # всех шаблонов этого уровня.
+    resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            count += resolve_urls(pattern)
+        else:
+            pattern.pattern.regex
+            count += 1
+    return count
+
+
+def prime_caches():
+    key = make_template_fragment_key(
+        feed_cache.FRAGMENT_NAME, [feed_cache.vary_on('index')]
+    )
+    if cache.get(key) is None:
+        feed_cache.warm('index')
+
+
+STEPS = (
+    ('templates', compile_templates),
+    ('urls', resolve_urls),
+    ('caches', prime_caches),
+)
+
+
+def run():
+    '''Прогревает процесс; возвращает время шагов в секундах.'''
+    timings = {}
+    for name, step in STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Прогрев воркера: шаг %s не удался', name)
+        timings[name] = time.perf_counter() - started
+    connections.close_all()
+    return timings